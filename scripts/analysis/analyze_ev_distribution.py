@@ -1,14 +1,16 @@
 import argparse
-import pandas as pd
-import matplotlib.pyplot as plt
 import glob
 from pathlib import Path
 
+from scripts.utils.lazy import lazy_import
+from scripts.utils.table_io import read_table, write_table
 from scripts.utils.normalize_columns import normalize_columns
 from scripts.utils.logger import log_info, log_success, log_warning, log_error
 from scripts.utils.cli_utils import should_run, add_common_flags, assert_file_exists
 from scripts.utils.constants import DEFAULT_EV_THRESHOLD, DEFAULT_MAX_ODDS
 
+pd = lazy_import("pandas")
+
 
 def main():
     parser = argparse.ArgumentParser(description="Analyze and plot EV distribution from value bet files.")
@@ -29,7 +31,7 @@ def main():
     for file in files:
         try:
             assert_file_exists(file, "value_bets_csv")
-            df = pd.read_csv(file)
+            df = read_table(file)
             df = normalize_columns(df)
             df = df[(df["expected_value"] >= args.ev_threshold) & (df["odds"] <= args.max_odds)]
             dfs.append(df)
@@ -46,8 +48,7 @@ def main():
     if args.output_csv:
         output_path = Path(args.output_csv)
         if should_run(output_path, args.overwrite, args.dry_run):
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            all_bets.to_csv(output_path, index=False)
+            write_table(all_bets, output_path)
             log_success(f"✅ Saved filtered bets to {output_path}")
 
     # Plotting
@@ -55,6 +56,8 @@ def main():
         log_warning("⚠️ No data available for plotting.")
         return
 
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(10, 5))
     plt.hist(all_bets["expected_value"], bins=25, color="blue", edgecolor="black")
     plt.title("EV Distribution (Filtered)")
@@ -1,8 +1,7 @@
 import argparse
-import pandas as pd
-import matplotlib.pyplot as plt
 from pathlib import Path
 
+from scripts.utils.table_io import read_table
 from scripts.utils.logger import log_info, log_success, log_warning
 from scripts.utils.cli_utils import add_common_flags, should_run, assert_file_exists
 
@@ -18,7 +17,7 @@ def main():
     args = parser.parse_args()
 
     assert_file_exists(args.input_csv, "input_csv")
-    df = pd.read_csv(args.input_csv)
+    df = read_table(args.input_csv)
 
     if args.sort_by not in df.columns:
         raise ValueError(f"❌ Missing column to sort by: {args.sort_by}")
@@ -30,6 +29,8 @@ def main():
         log_warning("⚠️ No data to plot after filtering.")
         return
 
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(12, 6))
     bars = plt.barh(df["tournament"], df[args.sort_by], color="skyblue", edgecolor="black")
     plt.xlabel(args.sort_by.upper())
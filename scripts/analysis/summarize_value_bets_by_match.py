@@ -1,14 +1,17 @@
 import argparse
-import pandas as pd
 import glob
 from pathlib import Path
 
+from scripts.utils.lazy import lazy_import
+from scripts.utils.table_io import read_table, write_table
 from scripts.utils.cli_utils import (
     assert_file_exists, add_common_flags, should_run, assert_columns_exist
 )
 from scripts.utils.normalize_columns import normalize_columns, patch_winner_column
 from scripts.utils.logger import log_info, log_success, log_warning, log_error
 
+pd = lazy_import("pandas")
+
 
 def main():
     parser = argparse.ArgumentParser(description="Summarize value bets by match.")
@@ -30,7 +33,7 @@ def main():
     for file in files:
         try:
             assert_file_exists(file, "value_bets_csv")
-            df = pd.read_csv(file)
+            df = read_table(file)
             df = normalize_columns(df)
             df = patch_winner_column(df)
 
@@ -69,8 +72,7 @@ def main():
         log_info("\n📊 Top Matches by Profit:")
         log_info(preview[["match_id", "player_1", "player_2", "num_bets", "avg_ev", "total_profit"]].to_string(index=False))
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    summary.to_csv(output_path, index=False)
+    write_table(summary, output_path)
     log_success(f"✅ Saved match-level summary to {output_path}")
 
 
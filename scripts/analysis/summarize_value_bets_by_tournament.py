@@ -1,11 +1,14 @@
 import argparse
-import pandas as pd
 import glob
 from pathlib import Path
 
+from scripts.utils.lazy import lazy_import
+from scripts.utils.table_io import read_table, write_table
 from scripts.utils.logger import log_info, log_success, log_warning
 from scripts.utils.cli_utils import add_common_flags, should_run, assert_file_exists
 
+pd = lazy_import("pandas")
+
 
 def main():
     parser = argparse.ArgumentParser(description="Summarize value bets by tournament.")
@@ -26,7 +29,7 @@ def main():
     for f in files:
         try:
             assert_file_exists(f, "match_summary_csv")
-            df = pd.read_csv(f)
+            df = read_table(f)
             required_cols = {"match_id", "total_profit", "avg_ev", "num_bets"}
             if not required_cols.issubset(df.columns):
                 log_warning(f"⚠️ Skipping {f} — missing one of: {required_cols}")
@@ -58,8 +61,7 @@ def main():
     df_out = pd.DataFrame(rows)
     df_out = df_out.sort_values(by="roi", ascending=False)
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    df_out.to_csv(output_path, index=False)
+    write_table(df_out, output_path)
     log_success(f"✅ Saved tournament-level summary to {output_path}")
 
     log_info("\n📊 Top 5 by ROI:")
@@ -7,6 +7,8 @@ import time
 import os
 
 from scripts.utils.paths import get_pipeline_paths, get_snapshot_csv_path
+from scripts.utils.table_io import TABLE_FORMATS
+from scripts.utils.snapshot_tables import snapshots_exist, assert_snapshots_exist
 from scripts.utils.cli_utils import (
     assert_file_exists, add_common_flags, merge_with_defaults, should_run
 )
@@ -20,60 +22,88 @@ BETFAIR_DATA_DIR = "data/BASIC"
 
 
 def parse_snapshots_if_needed(conf: dict, overwrite: bool, dry_run: bool) -> str:
-    label = conf["label"]
-
-    # ✅ Use provided snapshots_csv if available
-    if "snapshots_csv" in conf and Path(conf["snapshots_csv"]).exists() and not overwrite:
-        log_info(f"📄 Using pre-parsed snapshots: {conf['snapshots_csv']}")
-        return conf["snapshots_csv"]
-
-    snapshot_csv = conf.get("snapshots_csv") or get_snapshot_csv_path(label)
-    conf["snapshots_csv"] = snapshot_csv
-
-    start = conf.get("start_date", "2023-01-01")
-    end = conf.get("end_date", "2023-12-31")
-
-    if Path(snapshot_csv).exists() and not overwrite:
-        log_info(f"🟢 Snapshots already exist: {snapshot_csv}")
-        return snapshot_csv
-
-    if dry_run:
-        log_info(f"🧪 Dry run: would generate snapshots for {label} → {snapshot_csv}")
-        return snapshot_csv
-
-    log_info(f"📦 Generating snapshots for: {label}")
-    cmd = [
-        PYTHON, SNAPSHOT_SCRIPT,
-        "--input_dir", BETFAIR_DATA_DIR,
-        "--output_csv", snapshot_csv,
-        "--start_date", start,
-        "--end_date", end,
-        "--mode", "full",
-        "--overwrite"
-    ]
+    return parse_all_snapshots_if_needed([conf], overwrite, dry_run)[0]
+
+
+def parse_all_snapshots_if_needed(
+    confs: list[dict], overwrite: bool, dry_run: bool, extra_env: dict | None = None
+) -> list[str]:
+    """
+    Snapshot path per tournament, parsing the missing ones together.
+    Tournaments sharing a layout are parsed in one run of the snapshot script, so
+    files in overlapping date windows (e.g. the ATP and WTA draws of one event)
+    are decompressed once and routed to every matching tournament.
+    extra_env is added to the snapshot script's environment.
+    """
+    snapshot_paths = []
+    todo = {}
+    for conf in confs:
+        label = conf["label"]
 
-    try:
-        t0 = time.perf_counter()
-        subprocess.run(
-            cmd,
-            check=True,
-            env={**os.environ, "PYTHONPATH": "."},
-            stdout=sys.stdout,
-            stderr=sys.stderr
-        )
-        t1 = time.perf_counter()
-        log_success(f"✅ Parsed snapshots to {snapshot_csv} in {t1 - t0:.2f} seconds")
-    except subprocess.CalledProcessError:
-        log_error(f"❌ Snapshot parsing failed for {label}")
-        log_error(f"    Command: {' '.join(cmd)}")
-        raise
-
-    return snapshot_csv
+        # ✅ Use provided snapshots_csv if available
+        if "snapshots_csv" in conf and snapshots_exist(conf["snapshots_csv"]) and not overwrite:
+            log_info(f"📄 Using pre-parsed snapshots: {conf['snapshots_csv']}")
+            snapshot_paths.append(conf["snapshots_csv"])
+            continue
+
+        # Same format setting as the other tables, so the pipeline's snapshot_csv path matches
+        snapshot_csv = conf.get("snapshots_csv") or get_snapshot_csv_path(label, conf.get("format"))
+        conf["snapshots_csv"] = snapshot_csv
+        snapshot_paths.append(snapshot_csv)
+
+        if snapshots_exist(snapshot_csv) and not overwrite:
+            log_info(f"🟢 Snapshots already exist: {snapshot_csv}")
+            continue
+        todo.setdefault((conf.get("snapshot_layout", "rows"), bool(conf.get("use_catalog"))), []).append(conf)
+
+    for (layout, use_catalog), group in todo.items():
+        labels = ", ".join(c["label"] for c in group)
+        if dry_run:
+            for c in group:
+                log_info(f"🧪 Dry run: would generate snapshots for {c['label']} → {c['snapshots_csv']}")
+            continue
+
+        log_info(f"📦 Generating snapshots for: {labels}")
+        cmd = [
+            PYTHON, SNAPSHOT_SCRIPT,
+            "--input_dir", BETFAIR_DATA_DIR,
+            "--mode", "full",
+            "--layout", layout,
+            "--overwrite"
+        ]
+        if use_catalog:
+            cmd.append("--use_catalog")
+        for c in group:
+            cmd += ["--target", c["snapshots_csv"], c.get("start_date", "2023-01-01"), c.get("end_date", "2023-12-31")]
+
+        try:
+            t0 = time.perf_counter()
+            subprocess.run(
+                cmd,
+                check=True,
+                env={**os.environ, "PYTHONPATH": ".", **(extra_env or {})},
+                stdout=sys.stdout,
+                stderr=sys.stderr
+            )
+            t1 = time.perf_counter()
+            log_success(f"✅ Parsed snapshots for {labels} in {t1 - t0:.2f} seconds")
+        except subprocess.CalledProcessError:
+            log_error(f"❌ Snapshot parsing failed for {labels}")
+            log_error(f"    Command: {' '.join(cmd)}")
+            raise
+
+    return snapshot_paths
 
 
 def main():
     parser = argparse.ArgumentParser(description="Build raw matches for all tournaments in YAML config.")
     parser.add_argument("--config", default=DEFAULT_CONFIG, help="Path to tournaments YAML config")
+    parser.add_argument("--format", choices=list(TABLE_FORMATS), default=None,
+                        help="Storage format for snapshots and built match tables (overrides defaults.format; csv if unset)")
+    parser.add_argument("--label", default=None,
+                        help="Only build this tournament label (errors then fail the run instead of being skipped)")
+    parser.add_argument("--reuse_snapshots", action="store_true",
+                        help="Keep existing snapshot files under --overwrite (e.g. parsed by the pipeline beforehand)")
     add_common_flags(parser)
     args = parser.parse_args()
 
@@ -82,24 +112,43 @@ def main():
 
     defaults = config.get("defaults", {})
     tournaments = config.get("tournaments", [])
-
-    for t in tournaments:
-        conf = merge_with_defaults(t, defaults)
+    if args.label:
+        tournaments = [t for t in tournaments if merge_with_defaults(t, defaults).get("label") == args.label]
+        if not tournaments:
+            raise ValueError(f"❌ No tournament with label '{args.label}' in {args.config}")
+
+    confs = [merge_with_defaults(t, defaults) for t in tournaments]
+    if args.format:
+        for conf in confs:
+            conf["format"] = args.format
+    reparse = args.overwrite and not args.reuse_snapshots
+    try:
+        parse_all_snapshots_if_needed(confs, reparse, args.dry_run)
+    except Exception as e:
+        if args.label:
+            raise
+        # Tournaments whose snapshots are still missing are retried (and skipped) one by one
+        log_warning(f"⚠️ Shared snapshot parse failed ({e}); parsing per tournament")
+
+    for conf in confs:
         label = conf["label"]
         log_info(f"\n🏗️ Building: {label}")
 
         try:
-            snapshot_csv = parse_snapshots_if_needed(conf, args.overwrite, args.dry_run)
-            output_path = get_pipeline_paths(label)["raw_csv"]
+            # Snapshots were (re)parsed above; this only parses ones that are still missing
+            snapshot_csv = parse_snapshots_if_needed(conf, False, args.dry_run)
+            output_path = get_pipeline_paths(label, conf.get("format"))["raw_csv"]
 
             if not should_run(output_path, args.overwrite, args.dry_run):
                 continue
 
-            assert_file_exists(snapshot_csv, "snapshots_csv")
+            assert_snapshots_exist(snapshot_csv, "snapshots_csv")
             if conf.get("sackmann_csv") and not conf.get("snapshot_only", False):
                 assert_file_exists(conf["sackmann_csv"], "sackmann_csv")
             if "alias_csv" in conf:
                 assert_file_exists(conf["alias_csv"], "alias_csv")
+            if "player_stats_csv" in conf:
+                assert_file_exists(conf["player_stats_csv"], "player_stats_csv")
 
             cmd = [
                 PYTHON, BUILDER_SCRIPT,
@@ -118,10 +167,10 @@ def main():
                 cmd.append("--fuzzy_match")
             if "alias_csv" in conf:
                 cmd += ["--alias_csv", conf["alias_csv"]]
-
-            if args.dry_run:
-                log_info(f"🧪 Dry run: would run {BUILDER_SCRIPT} → {output_path}")
-                continue
+            if "player_registry" in conf:
+                cmd += ["--player_registry", conf["player_registry"]]
+            if "player_stats_csv" in conf:
+                cmd += ["--player_stats_csv", conf["player_stats_csv"]]
 
             t0 = time.perf_counter()
             subprocess.run(
@@ -135,6 +184,8 @@ def main():
             log_success(f"✅ Finished: {label} in {t1 - t0:.2f} seconds")
 
         except Exception as e:
+            if args.label:
+                raise
             log_error(f"⚠️ Skipping {label} due to error: {e}")
 
 
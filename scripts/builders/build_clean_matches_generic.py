@@ -1,22 +1,94 @@
+from __future__ import annotations
+
 import argparse
-import pandas as pd
 from pathlib import Path
 import sys
-import hashlib
 
 sys.path.append(str(Path(__file__).resolve().parents[2]))
 
+from scripts.utils.lazy import lazy_import
+from scripts.utils.table_io import read_table, write_table
 from scripts.builders.core import build_matches_from_snapshots
-from scripts.utils.paths import get_snapshot_csv_path
+from scripts.utils.paths import get_snapshot_csv_path, PLAYER_REGISTRY_CSV
+from scripts.utils.player_registry import PlayerRegistry, open_registry
+from scripts.utils.player_ratings import add_rating_features
+from scripts.utils.snapshot_tables import assert_snapshots_exist
 from scripts.utils.logger import log_info, log_success, log_error
 from scripts.utils.cli_utils import (
     assert_file_exists, should_run, add_common_flags, assert_columns_exist
 )
 
+pd = lazy_import("pandas")
+
+MATCH_ID_COLUMNS = ["tournament", "year", "player_1", "player_2", "market_id"]
+
+
+def generate_match_ids(df: pd.DataFrame) -> pd.Series:
+    """
+    Stable 64-bit hash (16 hex chars) of tournament, year, players and market_id.
+    Values are hashed as strings, so ids don't depend on column dtypes (e.g. year).
+    """
+    hashes = pd.util.hash_pandas_object(df[MATCH_ID_COLUMNS].astype(str), index=False)
+    return pd.Series([f"{h:016x}" for h in hashes.to_numpy()], index=df.index, dtype=object)
+
 
-def generate_match_id(row) -> str:
-    key = f"{row['tournament']}_{row['year']}_{row['player_1']}_{row['player_2']}_{row['market_id']}"
-    return hashlib.md5(key.encode()).hexdigest()
+def build_clean_matches(
+    snapshots_csv: str,
+    tournament: str,
+    year,
+    sackmann_csv: str | None = None,
+    alias_csv: str | None = None,
+    snapshot_only: bool = False,
+    fuzzy_match: bool = False,
+    snapshots=None,
+    player_registry=PLAYER_REGISTRY_CSV,
+    player_stats_csv: str | None = None,
+):
+    """
+    One row per match with player_1/player_2 (Betfair runner order), outcome
+    columns and actual_winner when results are joined, tournament/year, and a
+    stable match_id. Ticks are not carried: the ids/merge stages read them from
+    the snapshots by market_id.
+    snapshots: already-loaded snapshot rows (skips reading snapshots_csv).
+    player_registry: registry CSV giving player_1_id/player_2_id (None to skip).
+    player_stats_csv: ratings history (build_player_ratings.py); adds point-in-time
+    Elo/form features as of the day before each match.
+    """
+    # The matches are built against an unlocked copy of the registry; only merging its
+    # changes and assigning ids holds the lock, so parallel builds overlap
+    local = PlayerRegistry(player_registry) if player_registry is not None else None
+    df_matches = build_matches_from_snapshots(
+        snapshot_csv=snapshots_csv,
+        sackmann_csv=sackmann_csv,
+        alias_csv=alias_csv,
+        snapshot_only=snapshot_only,
+        fuzzy_match=fuzzy_match,
+        snapshots=snapshots,
+        registry=local,
+    )
+    df_matches["player_1"] = df_matches["runner_1"]
+    df_matches["player_2"] = df_matches["runner_2"]
+    if local is not None:
+        with open_registry(player_registry) as registry:
+            registry.merge(local)
+            df_matches["player_1_id"] = registry.ids(df_matches["player_1"])
+            df_matches["player_2_id"] = registry.ids(df_matches["player_2"])
+    if "winner_name" in df_matches.columns and "actual_winner" not in df_matches.columns:
+        df_matches["actual_winner"] = df_matches["winner_name"]
+
+    required = ["market_id", "player_1", "player_2"]
+    assert_columns_exist(df_matches, required, context="match build")
+
+    if player_stats_csv:
+        df_matches = add_rating_features(df_matches, read_table(player_stats_csv))
+
+    df_matches["tournament"] = tournament
+    df_matches["year"] = year
+    df_matches["match_id"] = generate_match_ids(df_matches)
+    if df_matches["match_id"].duplicated().any():
+        dupes = df_matches[df_matches["match_id"].duplicated(keep=False)]
+        raise ValueError(f"❌ Duplicate match_ids found:\n{dupes[['match_id', 'player_1', 'player_2']].head()}")
+    return df_matches
 
 
 def main():
@@ -27,9 +99,11 @@ def main():
     parser.add_argument("--snapshots_csv", help="Path to parsed Betfair snapshots")
     parser.add_argument("--sackmann_csv", help="Optional match results file for outcome labels")
     parser.add_argument("--alias_csv", help="Optional alias map file")
-    parser.add_argument("--player_stats_csv", help="Optional stats feature CSV")  # not used yet
+    parser.add_argument("--player_stats_csv", help="Optional ratings history (build_player_ratings.py) for Elo/form features")
     parser.add_argument("--snapshot_only", action="store_true")
     parser.add_argument("--fuzzy_match", action="store_true")
+    parser.add_argument("--player_registry", default=str(PLAYER_REGISTRY_CSV),
+                        help="Player registry CSV (name → player_id), updated with new names")
     parser.add_argument("--output_csv", required=True)
     add_common_flags(parser)
     args = parser.parse_args()
@@ -40,7 +114,7 @@ def main():
 
     label = f"{args.tournament}_{args.year}_{args.tour}"
     snapshots_csv = args.snapshots_csv or get_snapshot_csv_path(label)
-    assert_file_exists(snapshots_csv, "snapshots_csv")
+    assert_snapshots_exist(snapshots_csv, "snapshots_csv")
     if args.sackmann_csv and not args.snapshot_only:
         assert_file_exists(args.sackmann_csv, "sackmann_csv")
     if args.alias_csv:
@@ -49,25 +123,20 @@ def main():
         assert_file_exists(args.player_stats_csv, "player_stats_csv")
 
     try:
-        df_matches = build_matches_from_snapshots(
-            snapshot_csv=snapshots_csv,
+        df_matches = build_clean_matches(
+            snapshots_csv,
+            args.tournament,
+            args.year,
             sackmann_csv=args.sackmann_csv,
             alias_csv=args.alias_csv,
             snapshot_only=args.snapshot_only,
             fuzzy_match=args.fuzzy_match,
+            player_registry=args.player_registry,
+            player_stats_csv=args.player_stats_csv,
         )
 
-        required = ["market_id", "player_1", "player_2"]
-        assert_columns_exist(df_matches, required, context="match build")
-
-        df_matches["match_id"] = df_matches.apply(generate_match_id, axis=1)
-        if df_matches["match_id"].duplicated().any():
-            dupes = df_matches[df_matches["match_id"].duplicated(keep=False)]
-            raise ValueError(f"❌ Duplicate match_ids found:\n{dupes[['match_id', 'player_1', 'player_2']].head()}")
-
         log_info(f"📏 Built {len(df_matches)} matches")
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        df_matches.to_csv(output_path, index=False)
+        write_table(df_matches, output_path)
         log_success(f"✅ Saved {len(df_matches)} matches to {output_path}")
 
     except Exception as e:
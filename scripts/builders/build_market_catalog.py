@@ -0,0 +1,41 @@
+import argparse
+import yaml
+from datetime import datetime
+
+from scripts.utils.market_catalog import MarketCatalog, NO_MARKETS
+from scripts.utils.cli_utils import assert_file_exists, merge_with_defaults
+from scripts.utils.logger import log_info, log_success
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or incrementally update the Betfair market catalog.")
+    parser.add_argument("--input_dir", default="data/BASIC", help="Root of the .bz2 snapshot archive")
+    parser.add_argument("--catalog_csv", default=None, help="Catalog path (default: parsed/market_catalog_<dir>.csv)")
+    parser.add_argument("--start_date", default=None, help="Only catalog files from this date (YYYY-MM-DD)")
+    parser.add_argument("--end_date", default=None, help="Only catalog files up to this date (YYYY-MM-DD)")
+    parser.add_argument("--config", default=None, help="Tournaments YAML; reports MATCH_ODDS markets per label window")
+    parser.add_argument("--workers", type=int, default=1, help="Number of parser processes (1 = serial)")
+    args = parser.parse_args()
+
+    assert_file_exists(args.input_dir, "input_dir")
+    start = datetime.strptime(args.start_date, "%Y-%m-%d") if args.start_date else None
+    end = datetime.strptime(args.end_date, "%Y-%m-%d") if args.end_date else None
+
+    catalog = MarketCatalog(args.input_dir, args.catalog_csv)
+    df = catalog.update(start, end, workers=args.workers)
+    log_success(f"✅ Catalog holds {(df['market_id'] != NO_MARKETS).sum()} markets → {catalog.catalog_path}")
+
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f)
+        defaults = config.get("defaults", {})
+        for t in config.get("tournaments", []):
+            conf = merge_with_defaults(t, defaults)
+            t_start = datetime.strptime(conf["start_date"], "%Y-%m-%d")
+            t_end = datetime.strptime(conf["end_date"], "%Y-%m-%d")
+            markets = catalog.query(t_start, t_end, workers=args.workers)
+            log_info(f"🎾 {conf['label']}: {len(markets)} MATCH_ODDS markets in {conf['start_date']} → {conf['end_date']}")
+
+
+if __name__ == "__main__":
+    main()
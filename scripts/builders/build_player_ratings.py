@@ -0,0 +1,54 @@
+import argparse
+from pathlib import Path
+
+from scripts.utils.lazy import lazy_import
+from scripts.utils.paths import PLAYER_RATINGS_CSV, PLAYER_REGISTRY_CSV
+from scripts.utils.results_store import RESULTS_DIRS, find_results_files, load_results
+from scripts.utils.player_ratings import update_ratings
+from scripts.utils.player_registry import open_registry
+from scripts.utils.table_io import read_table, write_table
+from scripts.utils.logger import log_info, log_success, log_warning
+from scripts.utils.cli_utils import add_common_flags, assert_file_exists
+
+pd = lazy_import("pandas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build point-in-time surface Elo and form ratings from Sackmann results.")
+    parser.add_argument("--results_csvs", nargs="*", default=None,
+                        help="Results files (default: every *_matches_*.csv in data/tennis_atp and data/tennis_wta)")
+    parser.add_argument("--output_csv", default=str(PLAYER_RATINGS_CSV),
+                        help="Ratings history (player, date, elo, elo_<surface>, matches, form); the engine state is saved next to it")
+    parser.add_argument("--player_registry", default=str(PLAYER_REGISTRY_CSV),
+                        help="Player registry CSV; adds player_id to the history")
+    add_common_flags(parser)
+    args = parser.parse_args()
+
+    sources = args.results_csvs or find_results_files(RESULTS_DIRS)
+    if not sources:
+        log_warning(f"⚠️ No results files found in {', '.join(RESULTS_DIRS)}")
+        return
+    for source in sources:
+        assert_file_exists(source, "results_csv")
+
+    output_path = Path(args.output_csv)
+    state_path = output_path.with_name(f"{output_path.stem}.state.joblib")
+    if args.dry_run:
+        log_info(f"🧪 Dry run: would update {output_path} from {len(sources)} results file(s)")
+        return
+
+    results = pd.concat([load_results(source).frame for source in sources], ignore_index=True)
+    history = read_table(output_path) if output_path.exists() and not args.overwrite else None
+    history, applied = update_ratings(results, history, state_path, rebuild=args.overwrite)
+    if not applied:
+        log_info(f"♻️ Ratings up to date: {output_path}")
+        return
+
+    with open_registry(args.player_registry) as registry:
+        history["player_id"] = registry.ids(history["player"], source="sackmann")
+    write_table(history, output_path)
+    log_success(f"✅ Applied {applied} results; {history['player'].nunique()} players rated → {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import argparse
+from datetime import datetime
+
+from scripts.utils.manifest import SnapshotManifest
+from scripts.utils.logger import log_info, log_success
+from scripts.utils.cli_utils import assert_file_exists
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or incrementally refresh the Betfair snapshot file manifest.")
+    parser.add_argument("--input_dir", default="data/BASIC", help="Root of the .bz2 snapshot archive")
+    parser.add_argument("--manifest_csv", default=None, help="Manifest path (default: parsed/snapshot_manifest_<dir>.csv)")
+    parser.add_argument("--start_date", default=None, help="Only refresh days from this date (YYYY-MM-DD)")
+    parser.add_argument("--end_date", default=None, help="Only refresh days up to this date (YYYY-MM-DD)")
+    parser.add_argument("--full", action="store_true", help="Also stat every file, so files overwritten in place are re-listed")
+    args = parser.parse_args()
+
+    assert_file_exists(args.input_dir, "input_dir")
+    start = datetime.strptime(args.start_date, "%Y-%m-%d") if args.start_date else None
+    end = datetime.strptime(args.end_date, "%Y-%m-%d") if args.end_date else None
+
+    manifest = SnapshotManifest(args.input_dir, args.manifest_csv)
+    log_info(f"🗂️ Refreshing manifest {manifest.manifest_path}")
+    df = manifest.refresh(start, end, full=args.full)
+    log_success(f"✅ Manifest holds {len(df)} files ({df['size'].sum() / 1e6:.1f} MB) → {manifest.manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import argparse
+from pathlib import Path
+
+from scripts.utils.tick_store import TickStore
+from scripts.utils.snapshot_tables import read_snapshots, assert_snapshots_exist
+from scripts.utils.logger import log_info, log_success
+from scripts.utils.cli_utils import add_common_flags, should_run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a memory-mapped LTP tick store from parsed Betfair snapshots.")
+    parser.add_argument("--snapshots_csv", required=True, help="Parsed snapshots (either layout; --mode full for tick history)")
+    parser.add_argument("--store_dir", required=True, help="Output directory for the .npy columns and market index")
+    add_common_flags(parser)
+    args = parser.parse_args()
+
+    store_dir = Path(args.store_dir)
+    if not should_run(store_dir, args.overwrite, args.dry_run):
+        return
+    assert_snapshots_exist(args.snapshots_csv, "snapshots_csv")
+
+    ticks = read_snapshots(args.snapshots_csv, ["market_id", "selection_id", "ltp", "timestamp", "market_time", "in_play_time"])
+    log_info(f"📥 Loaded {len(ticks)} snapshot rows from {args.snapshots_csv}")
+
+    store = TickStore.build(ticks, store_dir)
+    log_success(f"✅ Tick store holds {len(store.arrays['ltp'])} ticks across {len(store)} markets → {store_dir}")
+
+
+if __name__ == "__main__":
+    main()
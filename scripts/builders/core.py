@@ -1,47 +1,74 @@
-import pandas as pd
+from __future__ import annotations
+
+from pathlib import Path
 from typing import Optional
 
+from scripts.utils.lazy import lazy_import
 from scripts.utils.matching import (
     apply_alias_map,
     fuzzy_match_players,
     match_snapshots_to_results,
     load_alias_map
 )
+from scripts.utils.snapshot_tables import has_snapshot_tables, load_snapshot_tables, read_snapshots
 from scripts.utils.logger import log_info
 
+pd = lazy_import("pandas")
+
+# A match is one (market_time, runner_1, runner_2); its ticks stay in the snapshots
+# and are referenced by market_id (ids, ticks and merge stages read them from there)
+MATCH_COLUMNS = ["market_time", "market_id", "runner_1", "runner_2"]
+MATCH_KEY = ["market_time", "runner_1", "runner_2"]
+
+
+def group_snapshot_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per match from denormalized snapshot rows, keyed on market_time + runner names.
+    Keeps each match's first market_id; drop_duplicates factorizes the key columns to
+    integer codes, so no per-row key strings or per-match tick lists are built.
+    """
+    df = df[MATCH_COLUMNS].dropna(subset=["runner_1", "runner_2"])
+    matches = df.drop_duplicates(subset=MATCH_KEY)
+    return matches.sort_values(MATCH_KEY, kind="stable", na_position="last").reset_index(drop=True)
+
+
+def group_snapshot_tables(tables: dict) -> pd.DataFrame:
+    """
+    Same output as group_snapshot_rows from normalized tables: matches come straight
+    from the markets table, limited to markets that have ticks.
+    """
+    markets = tables["markets"].dropna(subset=["runner_1", "runner_2"])
+    markets = markets[markets["market_id"].isin(tables["ticks"]["market_id"].unique())]
+    markets = markets[MATCH_COLUMNS].drop_duplicates(subset=MATCH_KEY)
+    # Sorted like group_snapshot_rows, so match order does not depend on the layout
+    return markets.sort_values(MATCH_KEY, kind="stable", na_position="last").reset_index(drop=True)
+
 
 def build_matches_from_snapshots(
     snapshot_csv: str,
     sackmann_csv: Optional[str] = None,
     alias_csv: Optional[str] = None,
     snapshot_only: bool = False,
-    fuzzy_match: bool = False
+    fuzzy_match: bool = False,
+    snapshots: Optional[pd.DataFrame] = None,
+    registry=None
 ) -> pd.DataFrame:
     """
     Builds a clean match dataset from Betfair snapshot data.
     Optionally merges Sackmann match data if provided.
+    snapshots: already-loaded snapshot rows, used instead of reading snapshot_csv.
+    registry: optional PlayerRegistry that caches name resolutions across runs.
     """
-    log_info(f"📄 Reading snapshots from: {snapshot_csv}")
-    df = pd.read_csv(snapshot_csv)
-    df = df.dropna(subset=["runner_1", "runner_2"]).copy()
-
-    # Deduplicate
-    df["match_key"] = df["market_time"].astype(str) + "_" + df["runner_1"] + "_" + df["runner_2"]
-    df = df.drop_duplicates(subset=["match_key", "selection_id", "timestamp"])
-
-    # Group by match and pivot
-    grouped = df.groupby("match_key").agg({
-        "market_time": "first",
-        "market_id": "first",
-        "runner_1": "first",
-        "runner_2": "first",
-        "selection_id": list,
-        "ltp": list,
-        "timestamp": list,
-        "runner_name": list
-    }).reset_index(drop=True)
-
-    grouped["match_id"] = grouped.apply(lambda row: f"{row['market_id']}_{row['runner_1']}_{row['runner_2']}", axis=1)
+    if snapshots is not None:
+        grouped = group_snapshot_rows(snapshots)
+    else:
+        log_info(f"📄 Reading snapshots from: {snapshot_csv}")
+        if not Path(snapshot_csv).exists() and has_snapshot_tables(snapshot_csv):
+            grouped = group_snapshot_tables(load_snapshot_tables(snapshot_csv, tick_columns=["market_id"]))
+        else:
+            grouped = group_snapshot_rows(read_snapshots(snapshot_csv, MATCH_COLUMNS))
+
+    grouped["match_id"] = grouped["market_id"].astype(str) + "_" + grouped["runner_1"] + "_" + grouped["runner_2"]
 
     # Alias mapping
     alias_map = load_alias_map(alias_csv) if alias_csv else {}
@@ -54,6 +81,8 @@ def build_matches_from_snapshots(
 
     # Merge Sackmann data
     if not snapshot_only and sackmann_csv:
-        grouped = match_snapshots_to_results(grouped, sackmann_csv, alias_map=alias_map, fuzzy=fuzzy_match)
+        grouped = match_snapshots_to_results(
+            grouped, sackmann_csv, alias_map=alias_map, fuzzy=fuzzy_match, registry=registry
+        )
 
     return grouped
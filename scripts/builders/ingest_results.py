@@ -0,0 +1,35 @@
+import argparse
+
+from scripts.utils.results_store import RESULTS_DIRS, find_results_files, is_fresh, load_results, store_path
+from scripts.utils.logger import log_info, log_success, log_warning
+from scripts.utils.cli_utils import add_common_flags
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest Sackmann results CSVs into typed, indexed results stores.")
+    parser.add_argument("--results_dirs", nargs="+", default=RESULTS_DIRS, help="Directories holding *_matches_*.csv files")
+    parser.add_argument("--files", nargs="*", default=None, help="Specific results files (instead of --results_dirs)")
+    add_common_flags(parser)
+    args = parser.parse_args()
+
+    files = args.files or find_results_files(args.results_dirs)
+    if not files:
+        log_warning(f"⚠️ No results files found in {', '.join(args.results_dirs)}")
+        return
+
+    ingested = 0
+    for source in files:
+        if not args.overwrite and is_fresh(source):
+            log_info(f"♻️ Up to date: {source} → {store_path(source)}")
+            continue
+        if args.dry_run:
+            log_info(f"🧪 Dry run: would ingest {source} → {store_path(source)}")
+            continue
+        load_results(source, rebuild=True)
+        ingested += 1
+    if not args.dry_run:
+        log_success(f"✅ Ingested {ingested} of {len(files)} results file(s)")
+
+
+if __name__ == "__main__":
+    main()
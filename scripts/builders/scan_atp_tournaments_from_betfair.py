@@ -1,12 +1,16 @@
 import argparse
-import pandas as pd
 from pathlib import Path
 from datetime import datetime
-from tqdm import tqdm
 
+from scripts.utils.lazy import lazy_import
+from scripts.utils.table_io import write_table
 from scripts.utils.snapshot_parser import SnapshotParser
+from scripts.utils.market_catalog import MarketCatalog
 from scripts.utils.logger import log_info, log_warning, log_success
 from scripts.utils.cli_utils import add_common_flags, should_run, assert_file_exists
+from scripts.utils.profiling import profiled_workers
+
+pd = lazy_import("pandas")
 
 
 def main():
@@ -15,8 +19,11 @@ def main():
     parser.add_argument("--output_csv", required=True, help="File path to save extracted metadata")
     parser.add_argument("--start_date", required=True, help="Start date (YYYY-MM-DD)")
     parser.add_argument("--end_date", required=True, help="End date (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of parser processes (1 = serial)")
+    parser.add_argument("--rescan", action="store_true", help="Decompress every file instead of querying the market catalog")
     add_common_flags(parser)
     args = parser.parse_args()
+    args.workers = profiled_workers(args)
 
     input_dir = Path(args.input_dir)
     output_path = Path(args.output_csv)
@@ -28,26 +35,24 @@ def main():
     start = datetime.strptime(args.start_date, "%Y-%m-%d")
     end = datetime.strptime(args.end_date, "%Y-%m-%d")
 
-    all_files = list(input_dir.rglob("*.bz2"))
-    parser_obj = SnapshotParser(mode="metadata")
-
-    filtered = [f for f in all_files if parser_obj.should_parse_file(f, start, end)]
-    log_info(f"🔍 Found {len(filtered)} .bz2 files in range")
-
-    all_rows = []
-    for f in tqdm(filtered, desc="Extracting metadata"):
-        all_rows.extend(parser_obj.parse_file(f))
-
-    if not all_rows:
+    if args.rescan:
+        parser_obj = SnapshotParser(mode="metadata")
+        df = pd.DataFrame(parser_obj.parse_directory(input_dir, start=start, end=end, workers=args.workers))
+    else:
+        catalog = MarketCatalog(input_dir)
+        df = catalog.query(start, end, market_type="MATCH_ODDS", workers=args.workers)
+        df = df[(df["runner_1"] != "") & (df["runner_2"] != "")]
+        df = df[["market_id", "market_time", "market_name", "runner_1", "runner_2"]]
+        log_info(f"📚 {len(df)} MATCH_ODDS markets in range from catalog {catalog.catalog_path}")
+
+    if df.empty:
         log_warning("⚠️ No metadata rows found.")
         return
 
-    df = pd.DataFrame(all_rows)
     df["market_time"] = pd.to_datetime(df["market_time"], errors="coerce")
     df = df.dropna(subset=["runner_1", "runner_2", "market_id"])
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(output_path, index=False)
+    write_table(df, output_path)
     log_success(f"✅ Saved {len(df)} ATP candidate markets to {output_path}")
 
 
@@ -0,0 +1,70 @@
+"""
+p1v2: one entry point for the pipeline, builder, modeling and analysis scripts.
+
+    python -m scripts --help
+    python -m scripts <command> [args...]
+
+Commands are found by scanning the script sources, and a command's module is only
+imported when it runs. Listing commands and `--help`/`--dry_run` therefore don't
+load pandas, sklearn or matplotlib (scripts bind those lazily, see utils/lazy.py).
+"""
+import re
+import sys
+import difflib
+import importlib
+from pathlib import Path
+
+PROG = "p1v2"
+COMMAND_GROUPS = ["pipeline", "builders", "modeling", "analysis"]
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+_MAIN_RE = re.compile(r'^if __name__ == "__main__":', re.MULTILINE)
+_DESCRIPTION_RE = re.compile(r'ArgumentParser\(\s*description=(["\'])(.*?)\1', re.DOTALL)
+
+
+def discover_commands() -> dict:
+    """
+    Command name → (group, module, description) for every runnable script
+    (a file with a __main__ guard) in COMMAND_GROUPS.
+    """
+    commands = {}
+    for group in COMMAND_GROUPS:
+        for path in sorted((SCRIPTS_DIR / group).glob("*.py")):
+            source = path.read_text(encoding="utf-8")
+            if not _MAIN_RE.search(source):
+                continue
+            match = _DESCRIPTION_RE.search(source)
+            commands[path.stem] = (group, f"scripts.{group}.{path.stem}", match.group(2) if match else "")
+    return commands
+
+
+def print_help(commands: dict):
+    print(f"usage: {PROG} <command> [args...]\n")
+    width = max((len(name) for name in commands), default=0)
+    for group in COMMAND_GROUPS:
+        print(f"{group}:")
+        for name, (g, _, description) in commands.items():
+            if g == group:
+                print(f"  {name:<{width}}  {description}")
+        print()
+    print(f"Run '{PROG} <command> --help' for a command's options.")
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    commands = discover_commands()
+    if not argv or argv[0] in ("-h", "--help"):
+        print_help(commands)
+        return 0
+
+    name, args = argv[0].replace("-", "_"), argv[1:]
+    if name not in commands:
+        close = [c for c in commands if c.startswith(name)][:3] or difflib.get_close_matches(name, commands, n=3)
+        hint = f" Did you mean: {', '.join(close)}?" if close else ""
+        print(f"{PROG}: unknown command '{argv[0]}'.{hint} See '{PROG} --help'.", file=sys.stderr)
+        return 2
+
+    module = importlib.import_module(commands[name][1])
+    sys.argv = [f"{PROG} {name}", *args]
+    module.main()
+    return 0
@@ -0,0 +1,67 @@
+import argparse
+import bz2
+import json
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+from scripts.utils.snapshot_parser import SnapshotParser, MODE_MARKERS, _json_loads
+from scripts.utils.logger import log_info, log_success
+from scripts.utils.cli_utils import assert_file_exists
+
+
+def legacy_read_lines(file_path: Path):
+    """
+    The original decode path: text mode, json.loads on every line.
+    """
+    open_func = bz2.open if file_path.suffix == ".bz2" else open
+    with open_func(file_path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def time_it(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark per-line decode cost of SnapshotParser.iter_messages.")
+    parser.add_argument("--file", required=True, help="A Betfair .bz2 stream file")
+    parser.add_argument("--mode", choices=list(MODE_MARKERS), default="full")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path = Path(args.file)
+    assert_file_exists(path, "file")
+
+    # Decompress once so the benchmark measures decoding only, not bz2
+    raw = bz2.decompress(path.read_bytes()) if path.suffix == ".bz2" else path.read_bytes()
+    # Written to a temp dir, never next to the input inside the raw data archive
+    tmp_dir = Path(tempfile.mkdtemp(prefix="benchmark_read_lines_"))
+    plain = tmp_dir / f"{path.stem}.jsonl"
+    plain.write_bytes(raw)
+    n_lines = raw.count(b"\n")
+
+    parser_obj = SnapshotParser(mode=args.mode)
+    try:
+        before = time_it(lambda: sum(1 for _ in legacy_read_lines(plain)), args.repeat)
+        after = time_it(lambda: sum(1 for _ in parser_obj.iter_messages(plain, MODE_MARKERS[args.mode])), args.repeat)
+        decoded = sum(1 for _ in parser_obj.iter_messages(plain, MODE_MARKERS[args.mode]))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    log_info(f"📄 {path.name}: {n_lines} lines, {decoded} decoded after prefilter (mode={args.mode})")
+    log_info(f"🔧 JSON decoder: {'orjson' if _json_loads.__module__ == 'orjson' else 'json'}")
+    log_info(f"⏱️ Before: {before * 1e6 / n_lines:.2f} µs/line ({before:.3f}s)")
+    log_info(f"⏱️ After:  {after * 1e6 / n_lines:.2f} µs/line ({after:.3f}s)")
+    log_success(f"✅ Speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,19 @@
 import argparse
-import pandas as pd
-import joblib
 import json
 from pathlib import Path
 from datetime import datetime
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
 
+from scripts.utils.lazy import lazy_import
+from scripts.utils.table_io import read_table
 from scripts.utils.normalize_columns import normalize_columns, patch_winner_column
 from scripts.utils.betting_math import add_ev_and_kelly
 from scripts.utils.logger import log_info, log_success, log_warning, log_error
 from scripts.utils.cli_utils import should_run, assert_file_exists, add_common_flags
 from scripts.utils.constants import DEFAULT_EV_THRESHOLD
 
+pd = lazy_import("pandas")
+joblib = lazy_import("joblib")
+
 
 def main():
     parser = argparse.ArgumentParser(description="Train EV filter model (RandomForest).")
@@ -27,11 +27,15 @@ def main():
     if not should_run(output_path, args.overwrite, args.dry_run):
         return
 
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import classification_report
+
     all_rows = []
     for path in args.input_files:
         try:
             assert_file_exists(path, "input_csv")
-            df = pd.read_csv(path)
+            df = read_table(path)
             df = normalize_columns(df)
             df = add_ev_and_kelly(df)
             df = patch_winner_column(df)
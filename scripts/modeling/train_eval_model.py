@@ -1,9 +1,8 @@
 import argparse
-import pandas as pd
 from pathlib import Path
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score, log_loss
 
+from scripts.utils.lazy import lazy_import
+from scripts.utils.table_io import read_table, write_table
 from scripts.utils.betting_math import add_ev_and_kelly, compute_kelly_stake
 from scripts.utils.logger import log_info, log_success, log_warning
 from scripts.utils.normalize_columns import normalize_columns, patch_winner_column
@@ -17,6 +16,8 @@ from scripts.utils.constants import (
     DEFAULT_FIXED_STAKE, DEFAULT_STRATEGY
 )
 
+pd = lazy_import("pandas")
+
 
 def main():
     parser = argparse.ArgumentParser(description="Train and evaluate win probability model.")
@@ -43,11 +44,14 @@ def main():
     if not should_run(bankroll_path, args.overwrite, args.dry_run):
         return
 
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import accuracy_score, log_loss
+
     train_dfs = []
     for path in args.train_csvs:
         try:
             assert_file_exists(path, "train_csv")
-            df = pd.read_csv(path)
+            df = read_table(path)
             df = normalize_columns(df)
             df = df.dropna(subset=args.features + ["actual_winner", "player_1"])
             df["label"] = (df["actual_winner"] == df["player_1"]).astype(int)
@@ -63,7 +67,7 @@ def main():
     log_info(f"✅ Loaded {len(df_train)} training rows")
 
     assert_file_exists(args.test_csv, "test_csv")
-    df_test = pd.read_csv(args.test_csv)
+    df_test = read_table(args.test_csv)
     df_test = normalize_columns(df_test)
     df_test = df_test.dropna(subset=args.features)
 
@@ -92,8 +96,7 @@ def main():
     df_filtered["kelly_stake"] = compute_kelly_stake(df_filtered["predicted_prob"], df_filtered["odds"])
     df_filtered["stake"] = args.fixed_stake if args.strategy == "flat" else df_filtered["kelly_stake"]
 
-    value_bets_path.parent.mkdir(parents=True, exist_ok=True)
-    df_filtered.to_csv(value_bets_path, index=False)
+    write_table(df_filtered, value_bets_path)
     log_success(f"✅ Saved {len(df_filtered)} value bets to {value_bets_path}")
 
     sim_df, final_bankroll, max_drawdown = simulate_bankroll(
@@ -105,8 +108,7 @@ def main():
         cap_fraction=0.05
     )
 
-    bankroll_path.parent.mkdir(parents=True, exist_ok=True)
-    sim_df.to_csv(bankroll_path, index=False)
+    write_table(sim_df, bankroll_path)
     log_success(f"💰 Final bankroll: {final_bankroll:.2f}")
     log_success(f"📉 Max drawdown: {max_drawdown:.2f}")
 
@@ -1,26 +1,23 @@
+from __future__ import annotations
+
 import argparse
-import pandas as pd
 from pathlib import Path
 
+from scripts.utils.lazy import lazy_import
+from scripts.utils.table_io import read_table, write_table
 from scripts.utils.betting_math import add_ev_and_kelly
 from scripts.utils.normalize_columns import normalize_columns
 from scripts.utils.logger import log_info, log_success
 from scripts.utils.cli_utils import should_run, add_common_flags, assert_file_exists
 
+pd = lazy_import("pandas")
 
-def main():
-    parser = argparse.ArgumentParser(description="Build implied odds features and EV/Kelly fields.")
-    parser.add_argument("--input_csv", required=True, help="Input CSV path")
-    parser.add_argument("--output_csv", required=True, help="Path to save output with features")
-    add_common_flags(parser)
-    args = parser.parse_args()
 
-    assert_file_exists(args.input_csv, "input_csv")
-    output_path = Path(args.output_csv)
-    if not should_run(output_path, args.overwrite, args.dry_run):
-        return
-
-    df = pd.read_csv(args.input_csv)
+def build_odds_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Odds, implied probability and margin features; EV/Kelly when predictions are present.
+    """
+    df = df.copy()
 
     # Flexible odds column mapping
     if "odds_player_1" not in df.columns:
@@ -48,9 +45,23 @@ def main():
     df = normalize_columns(df)
     if "predicted_prob" in df.columns:
         df = add_ev_and_kelly(df)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build implied odds features and EV/Kelly fields.")
+    parser.add_argument("--input_csv", required=True, help="Input CSV path")
+    parser.add_argument("--output_csv", required=True, help="Path to save output with features")
+    add_common_flags(parser)
+    args = parser.parse_args()
+
+    assert_file_exists(args.input_csv, "input_csv")
+    output_path = Path(args.output_csv)
+    if not should_run(output_path, args.overwrite, args.dry_run):
+        return
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(output_path, index=False)
+    df = build_odds_features(read_table(args.input_csv))
+    write_table(df, output_path)
     log_success(f"✅ Saved odds features to {output_path}")
 
 
@@ -1,39 +1,43 @@
+from __future__ import annotations
+
 import argparse
-import pandas as pd
-import numpy as np
 from pathlib import Path
 
-from scripts.utils.ev import compute_ev
+from scripts.utils.lazy import lazy_import
+from scripts.utils.table_io import read_table, write_table
+from scripts.utils.betting_math import compute_ev
 from scripts.utils.logger import log_info, log_warning, log_success
 from scripts.utils.normalize_columns import normalize_columns, patch_winner_column
 from scripts.utils.cli_utils import (
     add_common_flags, should_run, assert_file_exists, assert_columns_exist
 )
-from scripts.utils.constants import DEFAULT_MAX_MARGIN
-
+from scripts.utils.constants import DEFAULT_EV_THRESHOLD, DEFAULT_MAX_ODDS, DEFAULT_MAX_MARGIN
 
-def main():
-    parser = argparse.ArgumentParser(description="Filter predictions to find +EV value bets.")
-    parser.add_argument("--input_csv", required=True, help="Predictions input CSV")
-    parser.add_argument("--output_csv", required=True, help="Path to save filtered value bets")
-    parser.add_argument("--ev_threshold", type=float, default=0.2)
-    parser.add_argument("--confidence_threshold", type=float, default=0.4)
-    parser.add_argument("--max_odds", type=float, default=6.0)
-    parser.add_argument("--max_margin", type=float, default=DEFAULT_MAX_MARGIN)
-    add_common_flags(parser)
-    args = parser.parse_args()
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
 
-    assert_file_exists(args.input_csv, "predictions file")
-    output_path = Path(args.output_csv)
-    if not should_run(output_path, args.overwrite, args.dry_run):
-        return
 
-    df = pd.read_csv(args.input_csv)
-    log_info(f"📥 Loaded {len(df)} rows from {args.input_csv}")
+def detect_value_bets(
+    df: pd.DataFrame,
+    ev_threshold: float = DEFAULT_EV_THRESHOLD,
+    confidence_threshold: float = 0.4,
+    max_odds: float = DEFAULT_MAX_ODDS,
+    max_margin: float = DEFAULT_MAX_MARGIN
+) -> pd.DataFrame:
+    """
+    Rows passing the EV, confidence, odds and margin filters, with a binary winner column.
+    Without an odds column the bet is on player_1 at odds_player_1, the side whose
+    win probability the model predicts; EV is betting_math.compute_ev (prob * odds - 1).
+    Threshold defaults come from utils/constants.py.
+    """
     df = normalize_columns(df)
 
+    # Bets are on player_1, whose win probability the model predicts
+    if "odds" not in df.columns and "odds_player_1" in df.columns:
+        df["odds"] = df["odds_player_1"]
+
     if "expected_value" not in df.columns:
-        df["expected_value"] = compute_ev(df["predicted_prob"], df["odds"], df.get("implied_prob"))
+        df["expected_value"] = compute_ev(df["predicted_prob"], df["odds"])
         log_info("🔧 Computed expected_value")
 
     if "confidence_score" not in df.columns and "predicted_prob" in df.columns:
@@ -50,21 +54,42 @@ def main():
         log_warning(f"⚠️ Dropped {dropped} rows with NaN or inf in required columns")
 
     filtered = df[
-        (df["expected_value"] >= args.ev_threshold) &
-        (df["confidence_score"] >= args.confidence_threshold) &
-        (df["odds"] <= args.max_odds)
+        (df["expected_value"] >= ev_threshold) &
+        (df["confidence_score"] >= confidence_threshold) &
+        (df["odds"] <= max_odds)
     ]
     if "odds_margin" in filtered.columns:
-        filtered = filtered[filtered["odds_margin"] <= args.max_margin]
+        filtered = filtered[filtered["odds_margin"] <= max_margin]
 
-    if filtered.empty:
-        log_warning("⚠️ No value bets found after filtering.")
+    return patch_winner_column(filtered.copy())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filter predictions to find +EV value bets.")
+    parser.add_argument("--input_csv", required=True, help="Predictions input CSV")
+    parser.add_argument("--output_csv", required=True, help="Path to save filtered value bets")
+    parser.add_argument("--ev_threshold", type=float, default=DEFAULT_EV_THRESHOLD)
+    parser.add_argument("--confidence_threshold", type=float, default=0.4)
+    parser.add_argument("--max_odds", type=float, default=DEFAULT_MAX_ODDS)
+    parser.add_argument("--max_margin", type=float, default=DEFAULT_MAX_MARGIN)
+    add_common_flags(parser)
+    args = parser.parse_args()
+
+    assert_file_exists(args.input_csv, "predictions file")
+    output_path = Path(args.output_csv)
+    if not should_run(output_path, args.overwrite, args.dry_run):
         return
 
-    filtered = patch_winner_column(filtered)
+    df = read_table(args.input_csv)
+    log_info(f"📥 Loaded {len(df)} rows from {args.input_csv}")
+    filtered = detect_value_bets(
+        df, args.ev_threshold, args.confidence_threshold, args.max_odds, args.max_margin
+    )
+    if filtered.empty:
+        # Still written, so downstream stages never read bets from an older threshold
+        log_warning("⚠️ No value bets found after filtering.")
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    filtered.to_csv(output_path, index=False)
+    write_table(filtered, output_path)
     log_success(f"✅ Saved {len(filtered)} value bets to {output_path}")
 
 
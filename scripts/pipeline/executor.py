@@ -0,0 +1,211 @@
+import yaml
+from pathlib import Path
+
+from scripts.utils.table_io import read_table, write_table, DEFAULT_TABLE_FORMAT
+from scripts.utils.snapshot_tables import read_snapshots, assert_snapshots_exist
+from scripts.utils.cli_utils import assert_file_exists, merge_with_defaults
+from scripts.utils.constants import DEFAULT_MODEL_PATH, DEFAULT_HORIZONS, DEFAULT_STRATEGY
+from scripts.utils.logger import log_info, log_success, log_warning
+from scripts.utils.perf import count_read, count_write
+from scripts.utils.paths import PLAYER_REGISTRY_CSV
+
+DEFAULT_TOURNAMENT_CONFIG = "configs/tournaments_2023.yaml"
+
+# Stage → path key of the table it produces (see get_pipeline_paths)
+STAGE_OUTPUTS = {
+    "build": "raw_csv",
+    "ids": "ids_csv",
+    "ticks": "tick_store",
+    "merge": "odds_csv",
+    "horizons": "horizons_csv",
+    "features": "features_csv",
+    "predict": "predictions_csv",
+    "detect": "value_csv",
+    "simulate": "bankroll_csv",
+}
+
+# Config keys passed through as --<key> to a stage (stage-level values override defaults)
+STAGE_OPTIONS = {
+    "detect": ["ev_threshold", "confidence_threshold", "max_odds", "max_margin"],
+    "simulate": ["strategy", "fixed_stake"],
+}
+
+
+def tournament_conf(config_path: str, label: str) -> dict:
+    """
+    The tournaments-config entry for a label, merged with the config's defaults.
+    """
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    defaults = config.get("defaults", {})
+    for t in config.get("tournaments", []):
+        conf = merge_with_defaults(t, defaults)
+        if conf.get("label") == label:
+            return conf
+    raise ValueError(f"❌ No tournament with label '{label}' in {config_path}")
+
+
+def player_registry_path(config_path: str, label: str) -> str:
+    """
+    The player registry a label's build and ids stages share: its tournaments-config
+    entry's player_registry, else the default registry.
+    """
+    try:
+        return str(tournament_conf(config_path, label).get("player_registry", PLAYER_REGISTRY_CSV))
+    except (OSError, ValueError):
+        return str(PLAYER_REGISTRY_CSV)
+
+
+class InProcessExecutor:
+    """
+    Runs the pipeline stages for one label inside the current process.
+
+    Each stage calls the same DataFrame → DataFrame function its CLI script uses,
+    and hands its result to the next stage in memory. Tables are only written for
+    stages listed in checkpoints; a stage whose input was not produced in this run
+    reads it from disk. Snapshots are read once and shared by build/ids/merge/horizons.
+    """
+
+    def __init__(self, label: str, conf: dict, paths: dict, checkpoints: list[str]):
+        self.label = label
+        self.conf = conf
+        self.paths = paths
+        self.checkpoints = set(checkpoints)
+        self.snapshot_csv = paths["snapshot_csv"]
+        self.frames = {}
+        self._snapshots = None
+
+    def snapshots(self):
+        if self._snapshots is None:
+            assert_snapshots_exist(self.snapshot_csv, "snapshots_csv")
+            self._snapshots = read_snapshots(self.snapshot_csv)
+            log_info(f"📥 Loaded {len(self._snapshots)} snapshot rows from {self.snapshot_csv}")
+        return self._snapshots
+
+    # Tables handed over in memory count as rows in/out with no bytes (see utils/perf.py)
+
+    def load(self, key: str):
+        if key not in self.frames:
+            assert_file_exists(self.paths[key], key)
+            self.frames[key] = read_table(self.paths[key])
+        else:
+            count_read(rows=len(self.frames[key]), nbytes=0)
+        return self.frames[key]
+
+    def save(self, name: str, df):
+        key = STAGE_OUTPUTS[name]
+        self.frames[key] = df
+        if name in self.checkpoints:
+            write_table(df, self.paths[key])
+            log_success(f"💾 Checkpoint: {name} ({self.label}) → {self.paths[key]}")
+        else:
+            count_write(rows=len(df), nbytes=0)
+
+    def run(self, name: str, conf: dict | None = None):
+        """
+        Runs one stage; conf (stage merged with defaults) replaces the executor's options.
+        """
+        runner = getattr(self, f"_run_{name}", None)
+        if runner is None:
+            raise ValueError(f"❌ Unknown pipeline stage: {name}")
+        if conf is not None:
+            self.conf = conf
+        log_info(f"\n🚀 Running in-process: {name} ({self.label})")
+        runner()
+
+    # Stage modules are imported on first use so a partial run only pays for what it needs
+
+    def _run_build(self):
+        from scripts.builders.build_all_tournaments_from_yaml import parse_snapshots_if_needed
+        from scripts.builders.build_clean_matches_generic import build_clean_matches
+
+        t = tournament_conf(self.conf.get("config", DEFAULT_TOURNAMENT_CONFIG), self.label)
+        # The pipeline format sets the snapshot path too, as for the build script's --format
+        t["format"] = self.conf.get("format", DEFAULT_TABLE_FORMAT)
+        self.snapshot_csv = parse_snapshots_if_needed(t, overwrite=False, dry_run=False)
+        use_results = t.get("sackmann_csv") and not t.get("snapshot_only", False)
+        df = build_clean_matches(
+            self.snapshot_csv,
+            t["tournament"],
+            t["year"],
+            sackmann_csv=t["sackmann_csv"] if use_results else None,
+            alias_csv=t.get("alias_csv"),
+            snapshot_only=t.get("snapshot_only", False),
+            fuzzy_match=t.get("fuzzy_match", False),
+            snapshots=self.snapshots(),
+            player_registry=t.get("player_registry", PLAYER_REGISTRY_CSV),
+            player_stats_csv=t.get("player_stats_csv"),
+        )
+        self.save("build", df)
+
+    def _run_ids(self):
+        from scripts.pipeline.match_selection_ids import match_selection_ids
+
+        snapshots = self.snapshots()[["market_id", "selection_id", "runner_name"]]
+        registry = player_registry_path(self.conf.get("config", DEFAULT_TOURNAMENT_CONFIG), self.label)
+        self.save("ids", match_selection_ids(self.load("raw_csv"), snapshots, registry))
+
+    def _run_ticks(self):
+        from scripts.utils.tick_store import TickStore
+
+        # The tick store is a disk artifact, so it is always written
+        store = TickStore.build(self.snapshots(), self.paths["tick_store"])
+        log_success(f"✅ Tick store holds {len(store)} markets → {self.paths['tick_store']}")
+
+    def _ticks(self, matches):
+        if self.conf.get("tick_store"):
+            from scripts.utils.tick_store import TickStore
+
+            ticks = TickStore(self.paths["tick_store"]).frame(matches["market_id"].unique())
+            ticks["market_id"] = ticks["market_id"].astype(matches["market_id"].dtype)
+            return ticks
+        return self.snapshots()
+
+    def _run_merge(self):
+        from scripts.pipeline.merge_final_ltps_into_matches import final_ltps, merge_final_ltps
+
+        matches = self.load("ids_csv")
+        self.save("merge", merge_final_ltps(matches, final_ltps(self._ticks(matches))))
+
+    def _run_horizons(self):
+        from scripts.pipeline.sample_preoff_prices import sample_preoff_prices
+
+        matches = self.load("ids_csv")
+        horizons = self.conf.get("horizons") or DEFAULT_HORIZONS
+        self.save("horizons", sample_preoff_prices(self._ticks(matches), horizons, matches))
+
+    def _run_features(self):
+        from scripts.pipeline.build_odds_features import build_odds_features
+
+        self.save("features", build_odds_features(self.load("odds_csv")))
+
+    def _run_predict(self):
+        import joblib
+        from scripts.pipeline.predict_win_probs import predict_win_probs
+
+        model_file = self.conf.get("model_file", DEFAULT_MODEL_PATH)
+        assert_file_exists(model_file, "model_file")
+        self.save("predict", predict_win_probs(self.load("features_csv"), joblib.load(model_file)))
+
+    def _run_detect(self):
+        from scripts.pipeline.detect_value_bets import detect_value_bets
+
+        options = {
+            k: self.conf[k] for k in STAGE_OPTIONS["detect"] if self.conf.get(k) is not None
+        }
+        bets = detect_value_bets(self.load("predictions_csv"), **options)
+        if bets.empty:
+            log_warning("⚠️ No value bets found after filtering.")
+        self.save("detect", bets)
+
+    def _run_simulate(self):
+        from scripts.pipeline.simulate_bankroll_growth import simulate_bankroll_growth
+        from scripts.utils.simulation import generate_bankroll_plot
+
+        sim_df, final_bankroll, max_drawdown = simulate_bankroll_growth(
+            self.load("value_csv"), self.conf.get("strategy", DEFAULT_STRATEGY)
+        )
+        self.save("simulate", sim_df)
+        if "simulate" in self.checkpoints and not sim_df.empty:
+            generate_bankroll_plot(sim_df["bankroll"], output_path=Path(self.paths["bankroll_csv"]).with_suffix(".png"))
+        log_info(f"💰 Final bankroll: {final_bankroll:.2f}  📉 Max drawdown: {max_drawdown:.2f}")
@@ -1,18 +1,60 @@
+from __future__ import annotations
+
 import argparse
-import pandas as pd
-from tqdm import tqdm
 from pathlib import Path
 
-from scripts.utils.selection import build_market_runner_map, match_player_to_selection_id
+from scripts.utils.lazy import lazy_import
+from scripts.utils.table_io import read_table, write_table
+from scripts.utils.selection import build_runner_table, match_players_to_selection_ids
+from scripts.utils.player_registry import PlayerRegistry
+from scripts.utils.paths import PLAYER_REGISTRY_CSV
+from scripts.utils.snapshot_tables import read_snapshots, assert_snapshots_exist
 from scripts.utils.logger import log_info, log_warning, log_error, log_success
 from scripts.utils.cli_utils import should_run, assert_file_exists, add_common_flags
 
+pd = lazy_import("pandas")
+
+
+def match_selection_ids(
+    df_matches: pd.DataFrame, df_snaps: pd.DataFrame, player_registry: str | Path | None = None
+) -> pd.DataFrame:
+    """
+    Adds selection_id_1 / selection_id_2 by matching player names to runner names per market.
+    Names are joined exactly on the distinct runners of each market, then on registry
+    player ids (player_1_id/player_2_id), and only the rest is fuzzy-matched.
+    """
+    if "match_id" not in df_matches.columns:
+        raise ValueError("❌ 'match_id' column is required in merged_csv")
+
+    log_info(f"🔍 Matching selection IDs for {len(df_matches)} matches")
+
+    runners = build_runner_table(df_snaps)
+    if player_registry is not None and Path(player_registry).exists():
+        registry = PlayerRegistry(player_registry)
+        ids = {name: registry.id_of(name) for name in runners["runner_name"].dropna().unique()}
+        runners["player_id"] = runners["runner_name"].map(ids).astype("Int64")
+
+    df_matches = df_matches.copy()
+    fuzzy_cache = {}
+    for n in (1, 2):
+        df_matches[f"selection_id_{n}"] = match_players_to_selection_ids(
+            df_matches, runners, f"player_{n}", id_col=f"player_{n}_id", fuzzy_cache=fuzzy_cache
+        )
+
+    unmatched_1 = df_matches["selection_id_1"].isna().sum()
+    unmatched_2 = df_matches["selection_id_2"].isna().sum()
+    log_warning(f"⚠️ Unmatched selection_id_1: {unmatched_1}")
+    log_warning(f"⚠️ Unmatched selection_id_2: {unmatched_2}")
+    return df_matches
+
 
 def main():
     parser = argparse.ArgumentParser(description="Match player names to Betfair selection IDs.")
     parser.add_argument("--merged_csv", required=True, help="Input match CSV with player names")
     parser.add_argument("--snapshots_csv", required=True, help="Parsed Betfair snapshots")
     parser.add_argument("--output_csv", required=True, help="Path to save selection ID mapping")
+    parser.add_argument("--player_registry", default=str(PLAYER_REGISTRY_CSV),
+                        help="Player registry CSV used to match runners by player id (skipped if missing)")
     add_common_flags(parser)
     args = parser.parse_args()
 
@@ -21,35 +63,13 @@ def main():
         return
 
     assert_file_exists(args.merged_csv, "merged_csv")
-    assert_file_exists(args.snapshots_csv, "snapshots_csv")
-
-    df_matches = pd.read_csv(args.merged_csv)
-    df_snaps = pd.read_csv(args.snapshots_csv)
-
-    if "match_id" not in df_matches.columns:
-        raise ValueError("❌ 'match_id' column is required in merged_csv")
-
-    log_info(f"🔍 Matching selection IDs for {len(df_matches)} matches")
+    assert_snapshots_exist(args.snapshots_csv, "snapshots_csv")
 
-    market_runner_map = build_market_runner_map(df_snaps)
-
-    tqdm.pandas()
-    df_matches["selection_id_1"] = df_matches.progress_apply(
-        lambda row: match_player_to_selection_id(market_runner_map, row["market_id"], row["player_1"]),
-        axis=1
-    )
-    df_matches["selection_id_2"] = df_matches.progress_apply(
-        lambda row: match_player_to_selection_id(market_runner_map, row["market_id"], row["player_2"]),
-        axis=1
-    )
-
-    unmatched_1 = df_matches["selection_id_1"].isna().sum()
-    unmatched_2 = df_matches["selection_id_2"].isna().sum()
-    log_warning(f"⚠️ Unmatched selection_id_1: {unmatched_1}")
-    log_warning(f"⚠️ Unmatched selection_id_2: {unmatched_2}")
+    df_matches = read_table(args.merged_csv)
+    df_snaps = read_snapshots(args.snapshots_csv, ["market_id", "selection_id", "runner_name"])
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    df_matches.to_csv(output_path, index=False)
+    df_matches = match_selection_ids(df_matches, df_snaps, args.player_registry)
+    write_table(df_matches, output_path)
     log_success(f"✅ Saved selection ID mappings to {output_path}")
 
 
@@ -1,15 +1,51 @@
+from __future__ import annotations
+
 import argparse
-import pandas as pd
 from pathlib import Path
 
+from scripts.utils.lazy import lazy_import
+from scripts.utils.table_io import read_table, write_table
+from scripts.utils.snapshot_tables import read_snapshots, assert_snapshots_exist
+from scripts.utils.tick_store import TickStore
 from scripts.utils.logger import log_info, log_success, log_warning
 from scripts.utils.cli_utils import assert_file_exists, should_run, add_common_flags
 
+pd = lazy_import("pandas")
+
+
+def final_ltps(snapshots: pd.DataFrame) -> pd.DataFrame:
+    """
+    Last non-null LTP per (market_id, selection_id).
+    Snapshots parsed in --mode final already hold one row per selection, so the
+    timestamp sort is only paid for tick-level files.
+    """
+    keys = ["market_id", "selection_id"]
+    ticks = snapshots.dropna(subset=["ltp"])
+    if ticks.duplicated(subset=keys).any():
+        ticks = ticks.sort_values(by="timestamp", kind="stable").drop_duplicates(subset=keys, keep="last")
+    return ticks[keys + ["ltp"]].reset_index(drop=True)
+
+
+def merge_final_ltps(matches: pd.DataFrame, final_ltp: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds ltp_player_1 / ltp_player_2 from final LTPs keyed on (market_id, selection_id).
+    """
+    merged = matches.merge(final_ltp, left_on=["market_id", "selection_id_1"], right_on=["market_id", "selection_id"], how="left")
+    merged = merged.rename(columns={"ltp": "ltp_player_1"}).drop(columns=["selection_id"])
+
+    merged = merged.merge(final_ltp, left_on=["market_id", "selection_id_2"], right_on=["market_id", "selection_id"], how="left")
+    merged = merged.rename(columns={"ltp": "ltp_player_2"}).drop(columns=["selection_id"])
+
+    if merged["ltp_player_1"].isna().any() or merged["ltp_player_2"].isna().any():
+        log_warning("⚠️ Some LTP values are missing after merge")
+    return merged
+
 
 def main():
     parser = argparse.ArgumentParser(description="Merge final LTPs from snapshots into matches CSV.")
     parser.add_argument("--matches_csv", required=True, help="Path to clean matches CSV")
-    parser.add_argument("--snapshots_csv", required=True, help="Path to parsed Betfair snapshots")
+    parser.add_argument("--snapshots_csv", default=None, help="Path to parsed Betfair snapshots")
+    parser.add_argument("--tick_store", default=None, help="Tick store directory to read final LTPs from instead of --snapshots_csv")
     parser.add_argument("--output_csv", required=True, help="Path to save enriched matches CSV")
     add_common_flags(parser)
     args = parser.parse_args()
@@ -19,34 +55,27 @@ def main():
         return
 
     assert_file_exists(args.matches_csv, "matches_csv")
-    assert_file_exists(args.snapshots_csv, "snapshots_csv")
-
-    matches = pd.read_csv(args.matches_csv)
-    snapshots = pd.read_csv(args.snapshots_csv)
-
-    if "market_id" not in matches.columns or "market_id" not in snapshots.columns:
-        raise ValueError("❌ Both files must contain market_id column")
-
-    # Get final LTPs per selection
-    final_ltp = (
-        snapshots
-        .sort_values(by="timestamp")
-        .groupby(["market_id", "selection_id"])
-        .last()
-        .reset_index()[["market_id", "selection_id", "ltp"]]
-    )
-
-    merged = matches.merge(final_ltp, left_on=["market_id", "selection_id_1"], right_on=["market_id", "selection_id"], how="left")
-    merged = merged.rename(columns={"ltp": "ltp_player_1"}).drop(columns=["selection_id"])
+    if not args.snapshots_csv and not args.tick_store:
+        raise ValueError("❌ Provide --snapshots_csv or --tick_store")
 
-    merged = merged.merge(final_ltp, left_on=["market_id", "selection_id_2"], right_on=["market_id", "selection_id"], how="left")
-    merged = merged.rename(columns={"ltp": "ltp_player_2"}).drop(columns=["selection_id"])
+    matches = read_table(args.matches_csv)
+    if "market_id" not in matches.columns:
+        raise ValueError("❌ matches_csv must contain market_id column")
 
-    if merged["ltp_player_1"].isna().any() or merged["ltp_player_2"].isna().any():
-        log_warning("⚠️ Some LTP values are missing after merge")
+    if args.tick_store:
+        store = TickStore(args.tick_store)
+        final_ltp = store.final_ltps(matches["market_id"].unique())
+        final_ltp["market_id"] = final_ltp["market_id"].astype(matches["market_id"].dtype)
+        log_info(f"📦 Read final LTPs for {final_ltp['market_id'].nunique()} markets from {args.tick_store}")
+    else:
+        assert_snapshots_exist(args.snapshots_csv, "snapshots_csv")
+        snapshots = read_snapshots(args.snapshots_csv, ["market_id", "selection_id", "ltp", "timestamp"])
+        if "market_id" not in snapshots.columns:
+            raise ValueError("❌ Both files must contain market_id column")
+        final_ltp = final_ltps(snapshots)
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    merged.to_csv(output_path, index=False)
+    merged = merge_final_ltps(matches, final_ltp)
+    write_table(merged, output_path)
     log_success(f"✅ Saved matches with LTPs to {output_path}")
 
 
@@ -1,40 +1,155 @@
 import argparse
 from pathlib import Path
 from datetime import datetime
-import pandas as pd
 
 from scripts.utils.snapshot_parser import SnapshotParser
-from scripts.utils.logger import log_info, log_success
+from scripts.utils.market_catalog import MarketCatalog
+from scripts.utils.table_io import TableAppender
+from scripts.utils.snapshot_tables import NormalizedSnapshotWriter, get_snapshot_table_paths, snapshot_frame
+from scripts.utils.logger import log_info, log_success, log_warning
 from scripts.utils.cli_utils import add_common_flags, should_run, assert_file_exists
+from scripts.utils.profiling import profiled_workers
 
 
 def main():
     parser = argparse.ArgumentParser(description="Parse Betfair snapshots to structured CSV.")
     parser.add_argument("--input_dir", required=True, help="Directory with .bz2 snapshot files")
-    parser.add_argument("--output_csv", required=True, help="Path to save parsed snapshot data")
-    parser.add_argument("--start_date", required=True)
-    parser.add_argument("--end_date", required=True)
+    parser.add_argument("--output_csv", default=None, help="Path to save parsed snapshot data")
+    parser.add_argument("--start_date", default=None)
+    parser.add_argument("--end_date", default=None)
+    parser.add_argument(
+        "--target", nargs=3, action="append", default=[], metavar=("OUTPUT_CSV", "START_DATE", "END_DATE"),
+        help="Repeatable alternative to --output_csv/--start_date/--end_date: files are parsed once "
+             "and written to every target whose date window contains them"
+    )
     parser.add_argument("--mode", choices=["final", "full", "metadata"], default="final")
+    parser.add_argument("--pre_off", action="store_true", help="In final mode, keep the last tick before the market goes in-play")
+    parser.add_argument("--workers", type=int, default=1, help="Number of parser processes (1 = serial)")
+    parser.add_argument(
+        "--use_catalog", action="store_true",
+        help="Only decompress files the market catalog lists with a MATCH_ODDS market (catalogs new files first)"
+    )
+    parser.add_argument("--batch_size", type=int, default=100_000, help="Rows buffered in memory before each flush to disk")
+    parser.add_argument(
+        "--layout", choices=["rows", "normalized"], default="rows",
+        help="rows: one denormalized CSV; normalized: _markets/_runners/_ticks tables next to --output_csv"
+    )
     add_common_flags(parser)
     args = parser.parse_args()
+    args.workers = profiled_workers(args)
 
-    output_path = Path(args.output_csv)
-    if not should_run(output_path, args.overwrite, args.dry_run):
+    if args.layout == "normalized" and args.mode not in ("full", "final"):
+        raise ValueError("❌ --layout normalized requires --mode full or final")
+    targets = list(args.target)
+    if args.output_csv:
+        if not (args.start_date and args.end_date):
+            raise ValueError("❌ --output_csv requires --start_date and --end_date")
+        targets.append((args.output_csv, args.start_date, args.end_date))
+    if not targets:
+        raise ValueError("❌ Provide --output_csv/--start_date/--end_date or at least one --target")
+
+    targets = [
+        {
+            "output": Path(out),
+            "start": datetime.strptime(start, "%Y-%m-%d"),
+            "end": datetime.strptime(end, "%Y-%m-%d"),
+        }
+        for out, start, end in targets
+    ]
+    targets = [
+        t for t in targets
+        if should_run(
+            get_snapshot_table_paths(t["output"])["ticks"] if args.layout == "normalized" else t["output"],
+            args.overwrite, args.dry_run
+        )
+    ]
+    if not targets:
         return
     assert_file_exists(args.input_dir, "input_dir")
 
-    parser_obj = SnapshotParser(mode=args.mode)
-    start = datetime.strptime(args.start_date, "%Y-%m-%d")
-    end = datetime.strptime(args.end_date, "%Y-%m-%d")
+    parser_obj = SnapshotParser(mode=args.mode, pre_off=args.pre_off, runner_rows=args.layout == "normalized")
+    totals = parse_targets(
+        parser_obj, args.input_dir, targets, layout=args.layout, workers=args.workers, batch_size=args.batch_size,
+        use_catalog=args.use_catalog
+    )
 
-    rows = parser_obj.parse_directory(args.input_dir, start=start, end=end)
-    if not rows:
+    empty = [str(out) for out, total in totals.items() if not total]
+    if len(empty) == len(totals):
         raise ValueError("❌ No snapshot data extracted.")
+    for out in empty:
+        log_warning(f"⚠️ No snapshot data extracted for {out}")
+
+
+def parse_targets(
+    parser_obj, input_dir, targets: list[dict], layout="rows", workers=1, batch_size=100_000, use_catalog=False
+) -> dict:
+    """
+    Parses the files of several date windows in one pass.
+    Each file is parsed once and its rows are routed to every target whose
+    [start, end] window contains the file's date, so overlapping windows (e.g. the
+    ATP and WTA draws of one event) do not decompress the same files twice.
+    With use_catalog, files whose markets are not MATCH_ODDS (per the MarketCatalog)
+    are skipped before parsing.
+    Returns the rows (ticks for the normalized layout) written per output path.
+    """
+    start = min(t["start"] for t in targets)
+    end = max(t["end"] for t in targets)
+    if use_catalog:
+        candidates = MarketCatalog(input_dir).files(start, end, workers=workers)
+    else:
+        candidates = parser_obj.list_files(input_dir, start, end)
+    files = [
+        f for f in candidates
+        if any(parser_obj.should_parse_file(f, t["start"], t["end"]) for t in targets)
+    ]
+    if len(targets) > 1:
+        log_info(f"🔀 Routing {len(files)} files to {len(targets)} outputs")
+
+    writers = {
+        t["output"]: NormalizedSnapshotWriter(t["output"]) if layout == "normalized" else TableAppender(t["output"])
+        for t in targets
+    }
+    batches = {t["output"]: [] for t in targets}
+
+    def flush(out):
+        writer = writers[out]
+        chunk = snapshot_frame(batches[out])
+        if layout == "normalized":
+            writer.write(chunk)
+        else:
+            writer.append(chunk)
+        batches[out] = []
+
+    try:
+        for f, file_rows in parser_obj.iter_file_rows(files, workers=workers):
+            if not file_rows:
+                continue
+            for t in targets:
+                if parser_obj.should_parse_file(f, t["start"], t["end"]):
+                    batches[t["output"]].extend(file_rows)
+                    if len(batches[t["output"]]) >= batch_size:
+                        flush(t["output"])
+        for out, batch in batches.items():
+            if batch:
+                flush(out)
+    finally:
+        for writer in writers.values():
+            writer.close()
 
-    df = pd.DataFrame(rows)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(output_path, index=False)
-    log_success(f"✅ Saved {len(df)} snapshot rows to {output_path}")
+    totals = {}
+    for out, writer in writers.items():
+        if layout == "normalized":
+            totals[out] = writer.counts["ticks"]
+            if totals[out]:
+                log_success(
+                    f"✅ Saved {writer.counts['markets']} markets, {writer.counts['runners']} runners, "
+                    f"{writer.counts['ticks']} ticks to {', '.join(str(p) for p in writer.paths.values())}"
+                )
+        else:
+            totals[out] = writer.rows
+            if totals[out]:
+                log_success(f"✅ Saved {writer.rows} snapshot rows to {out}")
+    return totals
 
 
 if __name__ == "__main__":
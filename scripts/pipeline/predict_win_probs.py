@@ -1,21 +1,37 @@
+from __future__ import annotations
+
 import argparse
-import joblib
-import pandas as pd
 from pathlib import Path
 
+from scripts.utils.lazy import lazy_import
+from scripts.utils.table_io import read_table, write_table
 from scripts.utils.logger import log_info, log_success, log_warning
 from scripts.utils.cli_utils import add_common_flags, should_run, assert_file_exists, assert_columns_exist
 from scripts.utils.normalize_columns import normalize_columns
 
+joblib = lazy_import("joblib")
+pd = lazy_import("pandas")
+
+DEFAULT_FEATURES = ["implied_prob_1", "implied_prob_2", "implied_prob_diff", "odds_margin"]
+
+
+def predict_win_probs(df: pd.DataFrame, model, features: list[str] = DEFAULT_FEATURES) -> pd.DataFrame:
+    """
+    Adds predicted_prob (player_1 win probability) from a fitted classifier.
+    """
+    df = normalize_columns(df)
+    assert_columns_exist(df, features, context="prediction")
+
+    df["predicted_prob"] = model.predict_proba(df[features])[:, 1]
+    return df
+
 
 def main():
     parser = argparse.ArgumentParser(description="Use trained model to predict win probabilities.")
     parser.add_argument("--model_file", required=True, help="Trained sklearn model (joblib)")
     parser.add_argument("--input_csv", required=True, help="Input CSV with feature columns")
     parser.add_argument("--output_csv", required=True, help="Path to save predictions")
-    parser.add_argument("--features", nargs="+", default=[
-        "implied_prob_1", "implied_prob_2", "implied_prob_diff", "odds_margin"
-    ])
+    parser.add_argument("--features", nargs="+", default=DEFAULT_FEATURES)
     add_common_flags(parser)
     args = parser.parse_args()
 
@@ -27,15 +43,9 @@ def main():
     assert_file_exists(args.model_file, "model_file")
 
     model = joblib.load(args.model_file)
-    df = pd.read_csv(args.input_csv)
-    df = normalize_columns(df)
-
-    assert_columns_exist(df, args.features, context="prediction")
-
-    df["predicted_prob"] = model.predict_proba(df[args.features])[:, 1]
+    df = predict_win_probs(read_table(args.input_csv), model, args.features)
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(output_path, index=False)
+    write_table(df, output_path)
     log_success(f"✅ Saved predictions to {output_path}")
 
 
@@ -4,18 +4,38 @@ import subprocess
 from pathlib import Path
 import os
 import sys
+import time
+import shutil
+import tempfile
+from datetime import datetime
+from functools import partial
 
 from scripts.utils.logger import log_info, log_success, log_warning, log_error
 from scripts.utils.cli_utils import add_common_flags, merge_with_defaults, should_run
-from scripts.utils.paths import get_pipeline_paths
+from scripts.utils.paths import get_pipeline_paths, PERF_DIR
+from scripts.utils.perf import (
+    PERF_RECORD_ENV, REPORT_COLUMNS, measure, append_record, load_record, write_report
+)
+from scripts.utils.table_io import TABLE_FORMATS, DEFAULT_TABLE_FORMAT
+from scripts.utils.stage_cache import StageCache
+from scripts.utils.constants import DEFAULT_MODEL_PATH
+from scripts.pipeline.executor import (
+    InProcessExecutor, STAGE_OUTPUTS, STAGE_OPTIONS, DEFAULT_TOURNAMENT_CONFIG, tournament_conf, player_registry_path
+)
+from scripts.builders.build_all_tournaments_from_yaml import parse_all_snapshots_if_needed
+from scripts.utils.results_store import is_fresh, load_results, store_path
+from scripts.pipeline.scheduler import resolve_labels, expand_stages, run_graph, log_summary
 
 PYTHON = sys.executable
 DEFAULT_CONFIG = "configs/pipeline_run.yaml"
+SHARED_LABEL = "shared"  # perf report label for work done once for all labels
 
 STAGE_SCRIPTS = {
     "build": "scripts/builders/build_all_tournaments_from_yaml.py",
     "ids": "scripts/pipeline/match_selection_ids.py",
+    "ticks": "scripts/builders/build_tick_store.py",
     "merge": "scripts/pipeline/merge_final_ltps_into_matches.py",
+    "horizons": "scripts/pipeline/sample_preoff_prices.py",
     "features": "scripts/pipeline/build_odds_features.py",
     "predict": "scripts/pipeline/predict_win_probs.py",
     "detect": "scripts/pipeline/detect_value_bets.py",
@@ -23,24 +43,97 @@ STAGE_SCRIPTS = {
 }
 
 
+def stage_options(stage_name, conf):
+    args = []
+    for key in STAGE_OPTIONS.get(stage_name, []):
+        if conf.get(key) is not None:
+            args += [f"--{key}", str(conf[key])]
+    return args
+
+
+def config_inputs(config_path):
+    """
+    Files referenced from a tournaments config (results, aliases, snapshots).
+    The build stage reads these, so they are part of its fingerprint.
+    """
+    if not Path(config_path).is_file():
+        return []
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    entries = [config.get("defaults", {})] + config.get("tournaments", [])
+    return sorted({
+        v for entry in entries for v in entry.values()
+        if isinstance(v, str) and Path(v).is_file()
+    })
+
+
+def stage_inputs(name, label, paths, defaults):
+    """
+    Files a stage reads that its arguments do not name, so they are part of its
+    fingerprint: the config's files, the snapshots, the player registry, the ratings
+    history and the results store, all read by build. (ids gets --player_registry.)
+    """
+    if name != "build":
+        return []
+    config = defaults.get("config", DEFAULT_TOURNAMENT_CONFIG)
+    try:
+        t = tournament_conf(config, label)
+    except (OSError, ValueError):
+        return config_inputs(config)
+    inputs = config_inputs(config) + [player_registry_path(config, label), t.get("snapshots_csv") or paths["snapshot_csv"]]
+    if t.get("player_stats_csv"):
+        inputs.append(t["player_stats_csv"])
+    if t.get("sackmann_csv") and not t.get("snapshot_only"):
+        inputs.append(store_path(t["sackmann_csv"]))
+    return inputs
+
+
+def tick_source(paths, defaults):
+    """
+    Tick input for merge/horizons: the memory-mapped tick store when
+    defaults.tick_store is set (built by the 'ticks' stage), else the snapshot file.
+    """
+    if defaults.get("tick_store"):
+        return ["--tick_store", str(paths["tick_store"])]
+    return ["--snapshots_csv", str(paths["snapshot_csv"])]
+
+
 def build_args(stage_name, label, paths, defaults):
     if stage_name == "build":
         return [
-            "--config", defaults.get("config", "configs/tournaments_2023.yaml"),
+            "--config", defaults.get("config", DEFAULT_TOURNAMENT_CONFIG),
+            "--label", label,
+            "--format", defaults.get("format", DEFAULT_TABLE_FORMAT),
+            "--reuse_snapshots",
             "--overwrite"
         ]
     elif stage_name == "ids":
         return [
             "--merged_csv", str(paths["raw_csv"]),
             "--snapshots_csv", str(paths["snapshot_csv"]),
+            "--player_registry", player_registry_path(defaults.get("config", DEFAULT_TOURNAMENT_CONFIG), label),
             "--output_csv", str(paths["ids_csv"]),
         ]
+    elif stage_name == "ticks":
+        return [
+            "--snapshots_csv", str(paths["snapshot_csv"]),
+            "--store_dir", str(paths["tick_store"]),
+        ]
     elif stage_name == "merge":
         return [
             "--matches_csv", str(paths["ids_csv"]),
-            "--snapshots_csv", str(paths["snapshot_csv"]),
+            *tick_source(paths, defaults),
             "--output_csv", str(paths["odds_csv"]),
         ]
+    elif stage_name == "horizons":
+        args = [
+            *tick_source(paths, defaults),
+            "--matches_csv", str(paths["ids_csv"]),
+            "--output_csv", str(paths["horizons_csv"]),
+        ]
+        if defaults.get("horizons"):
+            args += ["--horizons", *defaults["horizons"]]
+        return args
     elif stage_name == "features":
         return [
             "--input_csv", str(paths["odds_csv"]),
@@ -48,7 +141,7 @@ def build_args(stage_name, label, paths, defaults):
         ]
     elif stage_name == "predict":
         return [
-            "--model_file", "modeling/win_model.pkl",
+            "--model_file", defaults.get("model_file", DEFAULT_MODEL_PATH),
             "--input_csv", str(paths["features_csv"]),
             "--output_csv", str(paths["predictions_csv"]),
         ]
@@ -56,20 +149,195 @@ def build_args(stage_name, label, paths, defaults):
         return [
             "--input_csv", str(paths["predictions_csv"]),
             "--output_csv", str(paths["value_csv"]),
+            *stage_options(stage_name, defaults),
         ]
     elif stage_name == "simulate":
         return [
             "--value_bets_csv", str(paths["value_csv"]),
             "--output_csv", str(paths["bankroll_csv"]),
+            *stage_options(stage_name, defaults),
         ]
     else:
         raise ValueError(f"❌ Unknown pipeline stage: {stage_name}")
 
 
+def prepare_snapshots(labels, defaults, overwrite, dry_run, records_dir=None):
+    """
+    Parses the snapshots of every label to be built in one shared pass, so builds
+    of overlapping date windows running side by side do not parse the same files.
+    On failure each build falls back to parsing its own snapshots.
+    """
+    config = defaults.get("config", DEFAULT_TOURNAMENT_CONFIG)
+    env = {PERF_RECORD_ENV: str(record_path(records_dir, SHARED_LABEL, "snapshots"))} if records_dir else None
+    try:
+        # The build stage's --format also sets the snapshot path (see build_args)
+        fmt = defaults.get("format", DEFAULT_TABLE_FORMAT)
+        confs = [{**tournament_conf(config, label), "format": fmt} for label in labels]
+        parse_all_snapshots_if_needed(confs, overwrite, dry_run, extra_env=env)
+    except Exception as e:
+        log_warning(f"⚠️ Shared snapshot parse failed ({e}); each build parses its own snapshots")
+
+
+def prepare_results(labels, defaults, dry_run, records_dir=None):
+    """
+    Ingests each results file used by the labels to be built into its results store
+    once, before builds running side by side would each ingest it.
+    """
+    config = defaults.get("config", DEFAULT_TOURNAMENT_CONFIG)
+    try:
+        confs = [tournament_conf(config, label) for label in labels]
+        sources = sorted({c["sackmann_csv"] for c in confs if c.get("sackmann_csv") and not c.get("snapshot_only")})
+        stale = [s for s in sources if Path(s).is_file() and not is_fresh(s)]
+        if dry_run:
+            for source in stale:
+                log_info(f"🧪 Dry run: would ingest results {source}")
+            return
+        if not stale:
+            return
+        with measure() as m:
+            for source in stale:
+                load_results(source, rebuild=True)
+        if records_dir:
+            append_record(record_path(records_dir, SHARED_LABEL, "results"), m.record)
+    except Exception as e:
+        log_warning(f"⚠️ Results ingest failed ({e}); each build ingests its own results")
+
+
+def record_path(records_dir, label, name):
+    return Path(records_dir) / f"{label}__{name}.jsonl"
+
+
+def run_label_in_process(label, stage, defaults, checkpoints, dry_run, records_dir=None):
+    """
+    Runs one label's stage chain in this process with an InProcessExecutor.
+    stage is the scheduler node: {"name": "chain", "stages": [...]}.
+    Only checkpoint stages (default: the last stage) write their output.
+    Each stage's run record is written to records_dir when given.
+    """
+    stages = stage["stages"]
+    checkpoints = checkpoints or defaults.get("checkpoints") or [stages[-1]["name"]]
+    executor = None
+    for s in stages:
+        name = s["name"]
+        if name not in STAGE_OUTPUTS:
+            log_warning(f"⚠️ Skipping unknown stage: {name}")
+            continue
+        conf = merge_with_defaults(s, defaults)
+        if dry_run:
+            saves = " → " + str(get_pipeline_paths(label, conf.get("format"))[STAGE_OUTPUTS[name]]) if name in checkpoints else ""
+            log_info(f"🧪 Dry run: would run {name} ({label}) in-process{saves}")
+            continue
+        if executor is None:
+            executor = InProcessExecutor(label, conf, get_pipeline_paths(label, conf.get("format")), checkpoints)
+        with measure() as m:
+            executor.run(name, conf)
+        if records_dir:
+            append_record(record_path(records_dir, label, name), m.record)
+        log_success(f"✅ Completed: {name} ({label})")
+    return "skipped" if dry_run else "ran"
+
+
+def run_stage(label, stage, defaults, cache, overwrite, dry_run, records_dir=None, profile=None):
+    """
+    Runs one stage script for one label as a subprocess.
+    Returns 'ran', 'cached' (fingerprint unchanged) or 'skipped'.
+    With records_dir, the stage (and any subprocess it starts) appends its run record there.
+    profile (e.g. ['--profile', 'sample']) is passed on to the script but not fingerprinted.
+    """
+    name = stage["name"]
+    conf = merge_with_defaults(stage, defaults)
+    paths = get_pipeline_paths(label, conf.get("format"))
+    script = STAGE_SCRIPTS.get(name)
+    if not script:
+        log_warning(f"⚠️ Skipping unknown stage: {name}")
+        return "skipped"
+
+    output_path = Path(paths[STAGE_OUTPUTS[name]])
+    stage_args = build_args(name, label, paths, conf)
+    extra_inputs = stage_inputs(name, label, paths, conf)
+    cache_key = f"{label}:{name}"
+
+    # The cache replaces the output-exists check: a stage is skipped only if its
+    # code, arguments and inputs are unchanged, and is otherwise rerun over its output
+    if cache is not None and not overwrite:
+        fingerprint = cache.fingerprint(script, stage_args, output_path, extra_inputs)
+        if cache.is_fresh(cache_key, fingerprint, output_path):
+            log_info(f"♻️ Up to date: {name} ({label}) → {output_path}")
+            return "cached"
+        rerun = True
+    else:
+        # Dry runs are reported below with the full command
+        if not should_run(output_path, overwrite, dry_run=False):
+            return "skipped"
+        rerun = overwrite
+
+    cmd = [PYTHON, script] + stage_args
+
+    if rerun and "--overwrite" not in stage_args:
+        cmd.append("--overwrite")
+    cmd += profile or []
+    if dry_run:
+        log_info(f"🧪 Dry run: would run {script}")
+        log_info("      " + " ".join(cmd))
+        return "skipped"
+
+    log_info(f"\n🚀 Running: {name} ({label})")
+    log_info("      " + " ".join(cmd))
+    env = {**os.environ, "PYTHONPATH": "."}
+    if records_dir:
+        env[PERF_RECORD_ENV] = str(record_path(records_dir, label, name))
+    subprocess.run(cmd, check=True, env=env)
+    if cache is not None:
+        # Recomputed after the run: build may have produced files it also reads
+        cache.record(cache_key, cache.fingerprint(script, stage_args, output_path, extra_inputs), output_path)
+    log_success(f"✅ Completed: {name} ({label}) → {output_path}")
+    return "ran"
+
+
+def collect_records(nodes, reports, records_dir, run):
+    """
+    One perf report row per (label, stage) in run order: the scheduler's status and
+    wall time merged with the CPU time, peak RSS, rows and bytes the stage recorded.
+    """
+    rows = []
+    for shared_stage in ("snapshots", "results"):
+        shared = load_record(record_path(records_dir, SHARED_LABEL, shared_stage))
+        if shared:
+            rows.append({**shared, "label": SHARED_LABEL, "stage": shared_stage, "status": "ran"})
+    for label, stage in nodes:
+        name = stage["name"]
+        record = load_record(record_path(records_dir, label, name)) or {}
+        status, secs = reports[label].stages.get(name, (None, None))
+        if status is None:
+            # In-process runs schedule a label's stages as one 'chain' node
+            status = "ran" if record else reports[label].stages.get("chain", ("skipped", 0.0))[0]
+            secs = record.get("wall_s")
+        rows.append({**record, "label": label, "stage": name, "status": status,
+                     "wall_s": round(secs, 3) if secs is not None else None})
+    return [
+        {**dict.fromkeys(REPORT_COLUMNS), **row, "run_id": run["run_id"], "started_at": run["started_at"]}
+        for row in rows
+    ]
+
+
 def main():
     parser = argparse.ArgumentParser(description="Run full value betting pipeline.")
     parser.add_argument("--config", default=DEFAULT_CONFIG, help="Path to pipeline YAML config")
     parser.add_argument("--only", nargs="*", help="Optional list of stages to run (e.g., 'predict detect')")
+    parser.add_argument("--labels", nargs="+", default=None,
+                        help="Labels to run (overrides defaults.label/labels); 'all' = every tournament in the config")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of stages (or in-process labels) run concurrently")
+    parser.add_argument("--format", choices=list(TABLE_FORMATS), default=None,
+                        help="Storage format for stage outputs (overrides defaults.format; csv if unset)")
+    parser.add_argument("--ev_threshold", type=float, default=None, help="Override the detect stage EV threshold")
+    parser.add_argument("--executor", choices=["subprocess", "in_process"], default=None,
+                        help="Run each stage as a script (default) or chain all stages in this process")
+    parser.add_argument("--checkpoints", nargs="*", default=None,
+                        help="In-process mode: stages whose output is written to disk (default: the last stage)")
+    parser.add_argument("--no_cache", action="store_true",
+                        help="Ignore stage fingerprints; only skip stages whose output exists (unless --overwrite)")
+    parser.add_argument("--perf_dir", default=str(PERF_DIR),
+                        help="Directory for per-run perf reports (run_<id>.json) and the history.csv they append to")
     add_common_flags(parser)
     args = parser.parse_args()
 
@@ -78,53 +346,74 @@ def main():
 
     defaults = raw_config.get("defaults", {})
     stages = raw_config.get("stages", [])
+    if args.format:
+        defaults["format"] = args.format
+    if args.ev_threshold is not None:
+        defaults["ev_threshold"] = args.ev_threshold
 
-    for stage in stages:
-        name = stage["name"]
-        label = stage.get("label") or defaults.get("label")
-        if not label:
-            raise ValueError(f"❌ Missing 'label' in stage: {stage}")
+    overwrite = args.overwrite or defaults.get("overwrite", False)
+    dry_run = args.dry_run or defaults.get("dry_run", False)
+    cache = None if args.no_cache else StageCache()
 
-        if args.only and name not in args.only:
-            continue
+    stages = [s for s in stages if not args.only or s["name"] in args.only]
+    labels = resolve_labels(defaults, args.labels, defaults.get("config", DEFAULT_TOURNAMENT_CONFIG))
+    nodes = expand_stages(stages, labels) if stages else []
+    t0 = time.time()
+    started_at = datetime.now()
+    # Stages append their run records here (see utils/perf.py); merged into one report at the end
+    records_dir = None if dry_run else tempfile.mkdtemp(prefix="p1v2_perf_")
 
-        paths = get_pipeline_paths(label)
-        script = STAGE_SCRIPTS.get(name)
-        if not script:
-            log_warning(f"⚠️ Skipping unknown stage: {name}")
-            continue
+    build_labels = [label for label, stage in nodes if stage["name"] == "build"]
+    if build_labels:
+        prepare_snapshots(build_labels, defaults, overwrite, dry_run, records_dir)
+        prepare_results(build_labels, defaults, dry_run, records_dir)
 
-        output_key = {
-            "build": "raw_csv",
-            "ids": "ids_csv",
-            "merge": "odds_csv",
-            "features": "features_csv",
-            "predict": "predictions_csv",
-            "detect": "value_csv",
-            "simulate": "bankroll_csv"
-        }.get(name)
-
-        output_path = Path(paths[output_key])
-        if output_path and not should_run(
-            output_path,
-            args.overwrite or defaults.get("overwrite", False),
-            args.dry_run or defaults.get("dry_run", False)
-        ):
-            continue
+    if (args.executor or defaults.get("executor")) == "in_process":
+        # Fingerprints need every stage's output on disk, so the stage cache is not used
+        # here; entries for the stages run are dropped since their outputs may change
+        if cache is not None and not dry_run:
+            cache.invalidate([f"{label}:{stage['name']}" for label, stage in nodes])
+        chains = {}
+        for label, stage in nodes:
+            chains.setdefault(label, []).append(stage)
+        run_node = partial(
+            run_label_in_process, defaults=defaults, checkpoints=args.checkpoints, dry_run=dry_run,
+            records_dir=records_dir
+        )
+        # One node per label; labels run in separate processes when jobs > 1
+        reports = run_graph(
+            [(label, {"name": "chain", "stages": chain}) for label, chain in chains.items()],
+            run_node, jobs=args.jobs, processes=args.jobs > 1
+        )
+    else:
+        run_node = partial(
+            run_stage, defaults=defaults, cache=cache, overwrite=overwrite, dry_run=dry_run, records_dir=records_dir,
+            profile=["--profile", args.profile, "--profile_top", str(args.profile_top)] if args.profile else None
+        )
+        reports = run_graph(nodes, run_node, jobs=args.jobs)
 
-        cmd = [PYTHON, script] + build_args(name, label, paths, defaults)
+    wall = time.time() - t0
+    if records_dir:
+        run = {
+            # Microseconds and pid keep runs started in the same second apart
+            "run_id": f"{started_at:%Y%m%d_%H%M%S_%f}_{os.getpid()}",
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "config": args.config,
+            "executor": args.executor or defaults.get("executor", "subprocess"),
+            "jobs": args.jobs,
+            "labels": list(reports),
+            "failed": [label for label, r in reports.items() if r.failed],
+            "wall_s": round(wall, 3),
+        }
+        report_path = write_report(collect_records(nodes, reports, records_dir, run), run, args.perf_dir)
+        shutil.rmtree(records_dir, ignore_errors=True)
+        log_info(f"📈 Perf report: {report_path}")
 
-        if args.overwrite or defaults.get("overwrite", False):
-            cmd.append("--overwrite")
-        if args.dry_run or defaults.get("dry_run", False):
-            log_info(f"🧪 Dry run: would run {script}")
-            log_info("      " + " ".join(cmd))
-            continue
+    if len(reports) > 1 or any(r.failed for r in reports.values()):
+        log_summary(reports, wall, args.jobs)
+    if any(r.failed for r in reports.values()):
+        sys.exit(1)
 
-        log_info(f"\n🚀 Running: {name} ({label})")
-        log_info("      " + " ".join(cmd))
-        subprocess.run(cmd, check=True, env={**os.environ, "PYTHONPATH": "."})
-        log_success(f"✅ Completed: {name} ({label}) → {output_path}")
 
 if __name__ == "__main__":
     main()
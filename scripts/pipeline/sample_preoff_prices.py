@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from scripts.utils.lazy import lazy_import
+from scripts.utils.table_io import read_table, write_table
+from scripts.utils.horizons import sample_horizons, horizon_column
+from scripts.utils.snapshot_tables import read_snapshots, assert_snapshots_exist
+from scripts.utils.tick_store import TickStore
+from scripts.utils.logger import log_info, log_success, log_warning
+from scripts.utils.cli_utils import add_common_flags, should_run, assert_file_exists, assert_columns_exist
+from scripts.utils.constants import DEFAULT_HORIZONS
+
+pd = lazy_import("pandas")
+
+
+def attach_to_matches(matches: pd.DataFrame, prices: pd.DataFrame, horizons: list[str]) -> pd.DataFrame:
+    """
+    Adds ltp_player_1_<h> / ltp_player_2_<h> columns to matches via selection_id_1/2.
+    """
+    cols = [horizon_column(h) for h in horizons]
+    for side in (1, 2):
+        renamed = prices[["market_id", "selection_id"] + cols].rename(
+            columns={c: c.replace("ltp_", f"ltp_player_{side}_", 1) for c in cols}
+        )
+        matches = matches.merge(
+            renamed, left_on=["market_id", f"selection_id_{side}"], right_on=["market_id", "selection_id"], how="left"
+        ).drop(columns=["selection_id"])
+    return matches
+
+
+def sample_preoff_prices(ticks: pd.DataFrame, horizons: list[str], matches: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Per-selection prices at each horizon, attached to matches when given.
+    """
+    prices = sample_horizons(ticks, horizons)
+    for h in horizons:
+        missing = prices[horizon_column(h)].isna().sum()
+        if missing:
+            log_warning(f"⚠️ {missing} selections have no tick by horizon {h}")
+
+    if matches is not None:
+        return attach_to_matches(matches, prices, horizons)
+    return prices
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample LTPs at several horizons before the off from tick snapshots.")
+    parser.add_argument("--snapshots_csv", default=None, help="Tick-level snapshots (parse --mode full)")
+    parser.add_argument("--tick_store", default=None, help="Tick store directory to read ticks from instead of --snapshots_csv")
+    parser.add_argument("--output_csv", required=True, help="Path to save sampled prices")
+    parser.add_argument("--horizons", nargs="+", default=DEFAULT_HORIZONS, help="e.g. 60m 15m 1m off")
+    parser.add_argument("--matches_csv", default=None, help="Optional matches with selection_id_1/2 to attach prices to")
+    add_common_flags(parser)
+    args = parser.parse_args()
+
+    output_path = Path(args.output_csv)
+    if not should_run(output_path, args.overwrite, args.dry_run):
+        return
+    if not args.snapshots_csv and not args.tick_store:
+        raise ValueError("❌ Provide --snapshots_csv or --tick_store")
+
+    matches = None
+    if args.matches_csv:
+        assert_file_exists(args.matches_csv, "matches_csv")
+        matches = read_table(args.matches_csv)
+        assert_columns_exist(matches, ["market_id", "selection_id_1", "selection_id_2"], context="matches_csv")
+
+    if args.tick_store:
+        # Only the matched markets are sliced out of the store
+        store = TickStore(args.tick_store)
+        ticks = store.frame(matches["market_id"].unique() if matches is not None else None)
+        if matches is not None:
+            ticks["market_id"] = ticks["market_id"].astype(matches["market_id"].dtype)
+    else:
+        assert_snapshots_exist(args.snapshots_csv, "snapshots_csv")
+        ticks = read_snapshots(
+            args.snapshots_csv, ["market_id", "selection_id", "ltp", "timestamp", "market_time", "in_play_time"]
+        )
+    log_info(f"📥 Loaded {len(ticks)} ticks from {args.tick_store or args.snapshots_csv}")
+
+    out = sample_preoff_prices(ticks, args.horizons, matches)
+    write_table(out, output_path)
+    log_success(f"✅ Saved {len(out)} rows with horizons {', '.join(args.horizons)} to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
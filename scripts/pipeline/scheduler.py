@@ -0,0 +1,162 @@
+import time
+import yaml
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from scripts.utils.cli_utils import merge_with_defaults
+from scripts.utils.logger import log_info, log_success, log_error
+
+# Stage → stages whose outputs it reads. Dependencies that are not part of a run
+# are treated as satisfied (their outputs are read from disk).
+STAGE_DEPENDENCIES = {
+    "build": [],
+    "ids": ["build"],
+    "ticks": ["build"],
+    "merge": ["ids", "ticks"],
+    "horizons": ["ids", "ticks"],
+    "features": ["merge"],
+    "predict": ["features"],
+    "detect": ["predict"],
+    "simulate": ["detect"],
+}
+
+
+def tournament_labels(config_path: str) -> list[str]:
+    """
+    Labels of every tournament in a tournaments YAML, in file order.
+    """
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    defaults = config.get("defaults", {})
+    return [merge_with_defaults(t, defaults)["label"] for t in config.get("tournaments", [])]
+
+
+def resolve_labels(defaults: dict, labels: list[str] | None, tournament_config: str) -> list[str]:
+    """
+    Labels to run: explicit labels (CLI or defaults.labels), 'all' for every
+    tournament in the tournaments config, else the single defaults.label.
+    """
+    labels = labels or defaults.get("labels")
+    if isinstance(labels, str):
+        labels = [labels]
+    if labels == ["all"]:
+        return tournament_labels(tournament_config)
+    if labels:
+        return list(labels)
+    return [defaults["label"]] if defaults.get("label") else []
+
+
+def expand_stages(stages: list[dict], labels: list[str]) -> list[tuple[str, dict]]:
+    """
+    (label, stage) nodes for every label × stage. Stages pinned to a label keep it.
+    """
+    nodes = []
+    for label in labels:
+        for stage in stages:
+            if not stage.get("label"):
+                nodes.append((label, stage))
+    nodes += [(stage["label"], stage) for stage in stages if stage.get("label")]
+    if not nodes:
+        raise ValueError("❌ No labels to run: set defaults.label, defaults.labels or --labels")
+    return nodes
+
+
+class LabelReport:
+    """
+    Per-label outcome for the end-of-run summary.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.stages = {}
+        self.failed = None
+        self.start = None
+        self.end = None
+
+    def add(self, stage: str, status: str, start: float, end: float):
+        self.stages[stage] = (status, end - start)
+        self.start = start if self.start is None else min(self.start, start)
+        self.end = end if self.end is None else max(self.end, end)
+
+    @property
+    def wall(self) -> float:
+        return (self.end - self.start) if self.start is not None else 0.0
+
+
+def _timed(fn, *args):
+    start = time.time()
+    status = fn(*args)
+    return status, start, time.time()
+
+
+def run_graph(nodes: list[tuple[str, dict]], run_node, jobs: int = 1, processes: bool = False) -> dict:
+    """
+    Runs (label, stage) nodes on a pool of `jobs` workers, each node once all of its
+    same-label dependencies in the graph have finished. run_node(label, stage) returns
+    a status string ('ran', 'cached', 'skipped'). A failing node marks its label failed
+    and cancels that label's remaining nodes; other labels keep running.
+
+    Threads suit subprocess stages; processes=True is for CPU-bound Python work and
+    needs a picklable, module-level run_node.
+    """
+    present = {(label, stage["name"]) for label, stage in nodes}
+    deps = {
+        (label, stage["name"]): {
+            (label, d) for d in STAGE_DEPENDENCIES.get(stage["name"], []) if (label, d) in present
+        }
+        for label, stage in nodes
+    }
+    reports = {label: LabelReport(label) for label, _ in nodes}
+    pending = list(nodes)
+    done = set()
+    running = {}
+
+    pool_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool_cls(max_workers=max(1, jobs)) as pool:
+        while pending or running:
+            for node in list(pending):
+                label, stage = node
+                key = (label, stage["name"])
+                if reports[label].failed:
+                    pending.remove(node)
+                    reports[label].stages[stage["name"]] = ("cancelled", 0.0)
+                elif deps[key] <= done:
+                    pending.remove(node)
+                    running[pool.submit(_timed, run_node, label, stage)] = key
+
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                label, name = running.pop(future)
+                try:
+                    status, start, end = future.result()
+                    reports[label].add(name, status, start, end)
+                    done.add((label, name))
+                except Exception as e:
+                    reports[label].failed = name
+                    reports[label].stages[name] = ("failed", 0.0)
+                    log_error(f"❌ {name} ({label}) failed: {e}")
+    return reports
+
+
+def log_summary(reports: dict, wall: float, jobs: int):
+    """
+    One line per label: outcome, stage counts and wall time.
+    """
+    log_info(f"\n📊 Run summary — {len(reports)} label(s), jobs={jobs}, wall {wall:.1f}s")
+    width = max((len(label) for label in reports), default=0)
+    for label, r in reports.items():
+        counts = {}
+        for status, _ in r.stages.values():
+            counts[status] = counts.get(status, 0) + 1
+        detail = ", ".join(f"{n} {status}" for status, n in counts.items())
+        slowest = max(
+            ((name, secs) for name, (status, secs) in r.stages.items() if status == "ran"),
+            key=lambda x: x[1], default=None
+        )
+        slow = f"  slowest: {slowest[0]} {slowest[1]:.1f}s" if slowest else ""
+        line = f"   {label:<{width}}  {r.wall:7.1f}s  {detail}{slow}"
+        if r.failed:
+            log_error(f"❌{line}  (failed at {r.failed})")
+        else:
+            log_success(f"✅{line}")
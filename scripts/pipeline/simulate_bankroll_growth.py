@@ -1,12 +1,26 @@
 import argparse
-import pandas as pd
 from pathlib import Path
 
+from scripts.utils.table_io import read_table, write_table
 from scripts.utils.simulation import simulate_bankroll, generate_bankroll_plot
 from scripts.utils.cli_utils import add_common_flags, should_run, assert_file_exists
 from scripts.utils.constants import DEFAULT_FIXED_STAKE, DEFAULT_STRATEGY
 
 
+def simulate_bankroll_growth(df, strategy: str = DEFAULT_STRATEGY):
+    """
+    Bankroll path over the value bets; returns (per-bet log, final bankroll, max drawdown).
+    """
+    return simulate_bankroll(
+        df,
+        strategy=strategy,
+        initial_bankroll=1000.0,
+        ev_threshold=0.0,
+        odds_cap=100.0,
+        cap_fraction=0.05
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(description="Simulate bankroll growth from value bets.")
     parser.add_argument("--value_bets_csv", required=True)
@@ -23,18 +37,10 @@ def main():
     if not should_run(output_path, args.overwrite, args.dry_run):
         return
 
-    df = pd.read_csv(value_bets_path)
-    sim_df, final_bankroll, max_drawdown = simulate_bankroll(
-        df,
-        strategy=args.strategy,
-        initial_bankroll=1000.0,
-        ev_threshold=0.0,
-        odds_cap=100.0,
-        cap_fraction=0.05
-    )
+    df = read_table(value_bets_path)
+    sim_df, final_bankroll, max_drawdown = simulate_bankroll_growth(df, args.strategy)
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    sim_df.to_csv(output_path, index=False)
+    write_table(sim_df, output_path)
     png_path = output_path.with_suffix(".png")
     generate_bankroll_plot(sim_df["bankroll"], output_path=png_path)
 
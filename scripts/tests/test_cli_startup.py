@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# --help / --dry_run must not import these; checked from -X importtime, so the
+# test does not depend on how fast the machine is
+HEAVY_MODULES = {"pandas", "numpy", "sklearn", "matplotlib", "scipy", "joblib", "rapidfuzz", "pyarrow"}
+# Wall-time backstop for a fresh interpreter (about 0.2s locally); generous for shared CI
+STARTUP_BUDGET_S = float(os.environ.get("P1V2_STARTUP_BUDGET_S", "2.0"))
+RUNS = 2
+
+
+def imported_modules(importtime_log: str) -> set[str]:
+    """Top-level packages listed by -X importtime ('import time: self | cumulative | module')"""
+    modules = set()
+    for line in importtime_log.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            modules.add(name.split(".")[0])
+    return modules
+
+
+def cold_start(args: list[str]) -> tuple[subprocess.CompletedProcess, float, set[str]]:
+    """
+    Best wall time of RUNS fresh `python -X importtime -m scripts ...` processes,
+    with the last run's result and the packages it imported.
+    """
+    best, result = float("inf"), None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "scripts", *args], cwd=REPO_ROOT, capture_output=True, text=True
+        )
+        best = min(best, time.perf_counter() - start)
+    return result, best, imported_modules(result.stderr)
+
+
+def check_startup(args: list[str], result: subprocess.CompletedProcess, elapsed: float, modules: set[str]):
+    command = " ".join(args)
+    assert result.returncode == 0, result.stderr
+    heavy = sorted(HEAVY_MODULES & modules)
+    assert not heavy, f"p1v2 {command} imported {', '.join(heavy)}"
+    assert elapsed < STARTUP_BUDGET_S, f"p1v2 {command} took {elapsed:.2f}s (budget {STARTUP_BUDGET_S}s)"
+
+
+def commands() -> list[str]:
+    sys.path.insert(0, str(REPO_ROOT))
+    from scripts.cli import discover_commands
+    return list(discover_commands())
+
+
+@pytest.mark.parametrize("args", [["--help"]] + [[name, "--help"] for name in commands()])
+def test_help_startup_budget(args):
+    check_startup(args, *cold_start(args))
+
+
+def test_dry_run_startup_budget(tmp_path):
+    predictions = tmp_path / "predictions.csv"
+    predictions.write_text("match_id\n")
+    cases = [
+        ["detect_value_bets", "--input_csv", str(predictions), "--output_csv", str(tmp_path / "value_bets.csv")],
+        ["simulate_bankroll_growth", "--value_bets_csv", str(predictions), "--output_csv", str(tmp_path / "bankroll.csv")],
+        ["train_eval_model", "--train_csvs", str(predictions), "--test_csv", str(predictions),
+         "--value_bets_csv", str(tmp_path / "vb.csv"), "--bankroll_csv", str(tmp_path / "br.csv")],
+        ["parse_betfair_snapshots", "--input_dir", str(tmp_path), "--output_csv", str(tmp_path / "snapshots.csv"),
+         "--start_date", "2024-01-01", "--end_date", "2024-01-02"],
+    ]
+    for args in cases:
+        result, elapsed, modules = cold_start(args + ["--dry_run"])
+        check_startup(args[:1] + ["--dry_run"], result, elapsed, modules)
+        assert "Dry run" in result.stdout
+        assert not any(tmp_path.glob("*bankroll*")) and not (tmp_path / "value_bets.csv").exists()
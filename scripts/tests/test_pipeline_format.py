@@ -0,0 +1,130 @@
+import bz2
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT))
+
+from scripts.utils.horizons import sample_horizons
+from scripts.utils.snapshot_parser import SnapshotParser
+from scripts.utils.snapshot_tables import NormalizedSnapshotWriter, read_snapshots, snapshot_frame
+
+LABEL = "test_2023_atp"
+PLAYERS = [("Player A", 101), ("Player B", 102), ("Player C", 103), ("Player D", 104)]
+
+
+def write_market(
+    root: Path, market_id: str, event_id: str, p1, p2, ticks: int = 5, p2_trades: bool = True,
+    in_play_at: int | None = None, tick_ms: int = 60_000
+):
+    """
+    One MATCH_ODDS stream file in the BASIC layout: a definition then a few LTP updates,
+    tick t at 06:00 + (t + 1) * tick_ms. With in_play_at, tick in_play_at arrives with a
+    definition flipped to inPlay (the market is scheduled for 10:00).
+    """
+    pt0 = 1673935200000  # 2023-01-17T06:00Z
+    md = {
+        "eventId": event_id, "marketType": "MATCH_ODDS", "marketTime": "2023-01-17T10:00:00.000Z",
+        "inPlay": False, "status": "OPEN", "name": "Match Odds", "eventName": f"{p1[0]} v {p2[0]}",
+        "runners": [{"id": p1[1], "name": p1[0], "sortPriority": 1}, {"id": p2[1], "name": p2[0], "sortPriority": 2}],
+    }
+    lines = [{"op": "mcm", "pt": pt0, "mc": [{"id": market_id, "marketDefinition": md}]}]
+    for t in range(ticks):
+        rc = [{"id": p1[1], "ltp": 1.5 + t / 10}] + ([{"id": p2[1], "ltp": 2.5 + t / 10}] if p2_trades else [])
+        mc = {"id": market_id, "rc": rc}
+        if t == in_play_at:
+            mc["marketDefinition"] = {**md, "inPlay": True}
+        lines.append({"op": "mcm", "pt": pt0 + (t + 1) * tick_ms, "mc": [mc]})
+    out = root / "data/BASIC/2023/Jan/17" / event_id
+    out.mkdir(parents=True, exist_ok=True)
+    with bz2.open(out / f"{market_id}.bz2", "wt", encoding="utf-8") as f:
+        f.writelines(json.dumps(line) + "\n" for line in lines)
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / "scripts").symlink_to(REPO_ROOT / "scripts")
+    write_market(tmp_path, "1.100", "3001", PLAYERS[0], PLAYERS[1])
+    write_market(tmp_path, "1.101", "3002", PLAYERS[2], PLAYERS[3])
+    (tmp_path / "configs").mkdir()
+    (tmp_path / "configs/tournaments.yaml").write_text(
+        "defaults:\n  snapshot_only: true\n"
+        f"tournaments:\n  - tour: atp\n    tournament: test\n    year: 2023\n    label: {LABEL}\n"
+        '    start_date: "2023-01-16"\n    end_date: "2023-01-18"\n'
+    )
+    (tmp_path / "configs/pipeline.yaml").write_text(
+        f"defaults:\n  label: {LABEL}\n  config: configs/tournaments.yaml\n"
+        "stages:\n  - name: build\n  - name: ids\n  - name: merge\n"
+    )
+    return tmp_path
+
+
+@pytest.mark.parametrize("executor", ["subprocess", "in_process"])
+def test_pipeline_runs_with_parquet_format(workspace, executor):
+    pytest.importorskip("pyarrow")
+    result = subprocess.run(
+        [sys.executable, "scripts/pipeline/run_full_pipeline.py", "--config", "configs/pipeline.yaml",
+         "--format", "parquet", "--executor", executor, "--checkpoints", "build", "ids", "merge"],
+        cwd=workspace, env={**os.environ, "PYTHONPATH": "."}, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert (workspace / f"parsed/betfair_{LABEL}_snapshots.parquet").exists()
+    for suffix in ("clean_snapshot_matches", "ids", "with_odds"):
+        assert (workspace / f"data/processed/{LABEL}_{suffix}.parquet").exists(), suffix
+    assert not list((workspace / "parsed").glob("betfair_*.csv"))
+    odds = pd.read_parquet(workspace / f"data/processed/{LABEL}_with_odds.parquet")
+    assert len(odds) == 2
+
+
+def test_normalized_layout_lists_runners_that_never_traded(tmp_path):
+    write_market(tmp_path, "1.100", "3001", PLAYERS[0], PLAYERS[1], p2_trades=False)
+    parser_obj = SnapshotParser(mode="full", runner_rows=True)
+    rows = parser_obj.parse_file(tmp_path / "data/BASIC/2023/Jan/17/3001/1.100.bz2")
+
+    writer = NormalizedSnapshotWriter(tmp_path / "snapshots.csv")
+    writer.write(pd.DataFrame.from_records(rows))
+    writer.close()
+    assert writer.counts == {"markets": 1, "runners": 2, "ticks": 5}
+
+    runners = read_snapshots(tmp_path / "snapshots.csv", ["market_id", "selection_id", "runner_name"])
+    assert sorted(zip(runners["selection_id"], runners["runner_name"])) == [(101, "Player A"), (102, "Player B")]
+
+
+def test_horizons_anchor_on_a_late_in_play_start(tmp_path):
+    # Hourly ticks from 07:00; scheduled for 10:00 but in-play from the 13:00 tick
+    write_market(tmp_path, "1.100", "3001", PLAYERS[0], PLAYERS[1], ticks=8, in_play_at=6, tick_ms=3_600_000)
+    rows = SnapshotParser(mode="full").parse_file(tmp_path / "data/BASIC/2023/Jan/17/3001/1.100.bz2")
+
+    prices = sample_horizons(snapshot_frame(rows), ["2h", "off"]).set_index("selection_id")
+    # off: the 12:00 tick, the last before the flip; 2h: the 11:00 tick
+    assert prices.loc[101, "ltp_off"] == pytest.approx(2.0)
+    assert prices.loc[101, "ltp_t2h"] == pytest.approx(1.9)
+    assert prices.loc[102, "ltp_off"] == pytest.approx(3.0)
+
+    # Without the transition, horizons fall back to the scheduled time
+    scheduled = sample_horizons(snapshot_frame(rows).drop(columns="in_play_time"), ["off"]).set_index("selection_id")
+    assert scheduled.loc[101, "ltp_off"] == pytest.approx(1.8)
+
+
+@pytest.mark.parametrize("pre_off, expected", [(False, {101: 1.9, 102: 2.9}), (True, {101: 1.7, 102: 2.7})])
+def test_final_mode_keeps_the_last_ltp_per_runner(tmp_path, pre_off, expected):
+    # Ticks 0-2 are pre-play; the definition flips to inPlay with tick 3
+    write_market(tmp_path, "1.100", "3001", PLAYERS[0], PLAYERS[1], ticks=5, in_play_at=3)
+    path = tmp_path / "data/BASIC/2023/Jan/17/3001/1.100.bz2"
+    rows = SnapshotParser(mode="final", pre_off=pre_off).parse_file(path)
+
+    assert {r["selection_id"]: r["ltp"] for r in rows} == pytest.approx(expected)
+    assert len(rows) == 2
+    if pre_off:
+        assert {r["timestamp"] for r in rows} == {1673935200000 + 3 * 60_000}
+    # final mode reports the same last ticks as a full replay, cut at the flip with pre_off
+    full = snapshot_frame(SnapshotParser(mode="full").parse_file(path))
+    if pre_off:
+        full = full[full["in_play_time"].isna()]
+    assert {r["selection_id"]: r["ltp"] for r in rows} == full.groupby("selection_id")["ltp"].last().to_dict()
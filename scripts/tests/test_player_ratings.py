@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from scripts.utils.player_ratings import update_ratings
+
+
+def results(rows):
+    """Sackmann-style results from (tourney_id, tourney_date, match_num, winner, loser)"""
+    return pd.DataFrame(
+        [{"tourney_id": t, "tourney_date": d, "match_num": n, "winner_name": w, "loser_name": l,
+          "surface": "Hard", "round": "R32", "score": "6-4 6-4"} for t, d, n, w, l in rows]
+    )
+
+
+WEEK_1 = [
+    ("2023-1", 20230102, 1, "p1", "p2"),
+    ("2023-1", 20230102, 2, "p3", "p4"),
+    ("2023-1", 20230102, 3, "p1", "p3"),
+    ("2023-1", 20230102, 4, "p2", "p4"),
+    ("2023-1", 20230102, 5, "p4", "p1"),
+]
+WEEK_2 = [("2023-2", 20230109, 1, "p2", "p1"), ("2023-2", 20230109, 2, "p3", "p1")]
+
+
+def rebuild(all_rows, tmp_path):
+    history, _ = update_ratings(results(all_rows), None, tmp_path / "rebuild.joblib", rebuild=True)
+    return history
+
+
+@pytest.mark.parametrize("batches", [
+    [WEEK_1[1:], WEEK_1[:1]],                      # the latest week gains a result that sorts first
+    [WEEK_1[1:], WEEK_1[:1] + WEEK_2],             # ... together with a later week
+    [WEEK_1, WEEK_2[1:], WEEK_2[:1]],              # a later week, then one more result in it
+    [WEEK_1[:2] + WEEK_2, WEEK_1[2:]],             # an earlier week gains results
+])
+def test_incremental_matches_rebuild(tmp_path, batches):
+    state = tmp_path / "state.joblib"
+    history, seen = None, []
+    for batch in batches:
+        seen += batch
+        history, applied = update_ratings(results(seen), history, state)
+        assert applied > 0
+    pd.testing.assert_frame_equal(history, rebuild(seen, tmp_path))
+
+    # Nothing new: the history is returned as is
+    _, applied = update_ratings(results(seen), history, state)
+    assert applied == 0
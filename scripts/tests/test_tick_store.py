@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from scripts.utils.snapshot_parser import SnapshotParser
+from scripts.utils.snapshot_tables import snapshot_frame
+from scripts.utils.tick_store import TickStore
+from test_pipeline_format import write_market, PLAYERS
+
+
+def parsed_ticks(root: Path) -> pd.DataFrame:
+    write_market(root, "1.100", "3001", PLAYERS[0], PLAYERS[1], ticks=5)
+    write_market(root, "1.101", "3002", PLAYERS[2], PLAYERS[3], ticks=3, in_play_at=2)
+    parser_obj = SnapshotParser(mode="full")
+    rows = [r for f in sorted((root / "data/BASIC").rglob("*.bz2")) for r in parser_obj.parse_file(f)]
+    return snapshot_frame(rows)
+
+
+def test_round_trip_by_market(tmp_path):
+    ticks = parsed_ticks(tmp_path)
+    store = TickStore.build(ticks, tmp_path / "store")
+
+    reopened = TickStore(tmp_path / "store")
+    assert len(reopened) == 2 and "1.101" in reopened
+    for market_id, source in ticks.groupby("market_id"):
+        source = source.sort_values(["selection_id", "timestamp"], kind="stable")
+        view = reopened.market(market_id)
+        assert isinstance(view["ltp"], np.memmap)
+        np.testing.assert_array_equal(view["selection_id"], source["selection_id"].to_numpy())
+        np.testing.assert_array_equal(view["pt"], source["timestamp"].to_numpy())
+        np.testing.assert_array_equal(view["ltp"], source["ltp"].to_numpy())
+
+    # frame() slices one market back into the snapshot row shape
+    frame = store.frame(["1.101"])
+    source = ticks[ticks["market_id"] == "1.101"].sort_values(["selection_id", "timestamp"], kind="stable")
+    pd.testing.assert_frame_equal(
+        frame[["selection_id", "timestamp", "ltp", "market_time"]],
+        source[["selection_id", "timestamp", "ltp", "market_time"]].reset_index(drop=True),
+        check_dtype=False,
+    )
+    # in_play_time is kept per market, so every tick of the market carries it
+    assert set(frame["in_play_time"]) == {source["in_play_time"].min()}
+
+    last = store.final_ltps().set_index(["market_id", "selection_id"])["ltp"]
+    assert last.to_dict() == ticks.groupby(["market_id", "selection_id"])["ltp"].last().to_dict()
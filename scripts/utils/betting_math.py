@@ -1,4 +1,8 @@
-import pandas as pd
+from __future__ import annotations
+
+from scripts.utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
 
 def compute_ev(prob: float, odds: float) -> float:
     """
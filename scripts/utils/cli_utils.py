@@ -1,31 +1,43 @@
+from __future__ import annotations
+
 from pathlib import Path
 import os
 import argparse
-import pandas as pd
 
-from scripts.utils.logger import log_error
+from scripts.utils.lazy import lazy_import
+from scripts.utils.logger import log_info, log_error
+from scripts.utils.profiling import ProfileAction, PROFILE_MODES, DEFAULT_PROFILE_TOP
+
+pd = lazy_import("pandas")
 
 
 def add_common_flags(parser: argparse.ArgumentParser):
     """
-    Add shared CLI flags for overwrite protection and dry-run simulation.
+    Add shared CLI flags for overwrite protection, dry-run simulation and profiling.
     """
     parser.add_argument("--overwrite", action="store_true", help="Overwrite existing output files")
     parser.add_argument("--dry_run", action="store_true", help="Only simulate the steps without writing output")
+    parser.add_argument(
+        "--profile", nargs="?", const="cprofile", default=None, choices=PROFILE_MODES, action=ProfileAction,
+        help="Profile this run (cprofile: exact call stats; sample: low-overhead stack sampling for long runs). "
+             "Writes a dump and a top-N summary next to the output"
+    )
+    parser.add_argument("--profile_top", type=int, default=DEFAULT_PROFILE_TOP,
+                        help="Functions listed in the --profile summary")
 
 
 def should_run(output_path: Path, overwrite: bool, dry_run: bool) -> bool:
     """
     Decide whether to proceed with generating output at the given path.
+    A dry run never proceeds (so no input is loaded); it only reports the output.
     """
-    if output_path.exists():
-        if not overwrite:
-            if dry_run:
-                return True
-            log_error(f"⚠️ Output exists: {output_path} — use --overwrite to replace.")
-            return False
-        if dry_run:
-            return True
+    output_path = Path(output_path)
+    if output_path.exists() and not overwrite:
+        log_error(f"⚠️ Output exists: {output_path} — use --overwrite to replace.")
+        return False
+    if dry_run:
+        log_info(f"🧪 Dry run: would write {output_path}")
+        return False
 
     return True
 
@@ -14,3 +14,6 @@ DEFAULT_MODEL_PATH = "modeling/win_model.pkl"  # Fallback path for prediction mo
 
 # Configuration
 DEFAULT_CONFIG_FILE = "configs/tournaments_2024.yaml"
+
+# Pre-off price horizons sampled from tick data (see utils/horizons.py)
+DEFAULT_HORIZONS = ["60m", "15m", "1m", "off"]
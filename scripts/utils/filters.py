@@ -1,4 +1,8 @@
-import pandas as pd
+from __future__ import annotations
+
+from scripts.utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
 
 def filter_value_bets(df: pd.DataFrame, ev_threshold: float, max_odds: float, max_margin: float) -> pd.DataFrame:
     """
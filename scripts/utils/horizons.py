@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import re
+
+from scripts.utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+_HORIZON_RE = re.compile(r"^(\d+(?:\.\d+)?)([smh])$")
+_UNITS = {"s": "seconds", "m": "minutes", "h": "hours"}
+
+
+def parse_horizon(spec: str) -> pd.Timedelta:
+    """
+    Parses a horizon like '60m', '90s', '2h' or 'off' into an offset before the off.
+    'off' is the last tick before the market turned in-play (offset 0).
+    """
+    spec = str(spec).strip().lower()
+    if spec == "off":
+        return pd.Timedelta(0)
+    m = _HORIZON_RE.match(spec)
+    if not m:
+        raise ValueError(f"❌ Invalid horizon: {spec} (expected e.g. 60m, 90s, 2h or off)")
+    return pd.Timedelta(**{_UNITS[m.group(2)]: float(m.group(1))})
+
+
+def horizon_column(spec: str, prefix: str = "ltp") -> str:
+    """
+    Column name for a horizon, e.g. '60m' → 'ltp_t60m', 'off' → 'ltp_off'.
+    """
+    spec = str(spec).strip().lower()
+    return f"{prefix}_off" if spec == "off" else f"{prefix}_t{spec}"
+
+
+def to_utc(values: pd.Series) -> pd.Series:
+    """
+    Converts tick timestamps to UTC datetimes. Accepts Betfair 'pt' epoch
+    milliseconds (as written by SnapshotParser) or datetime strings.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return pd.to_datetime(values, unit="ms", utc=True)
+    return pd.to_datetime(values, utc=True, format="mixed")
+
+
+def in_play_times(ticks: pd.DataFrame) -> pd.Series:
+    """
+    UTC time each market turned in-play, from the parser's in_play_time (epoch ms).
+    Markets that never went in-play (or ticks without the column) are absent.
+    """
+    if "in_play_time" not in ticks:
+        return pd.Series(dtype="datetime64[ns, UTC]")
+    in_play = ticks.dropna(subset=["in_play_time"]).groupby("market_id")["in_play_time"].min()
+    return to_utc(in_play.astype("int64"))
+
+
+def off_times(ticks: pd.DataFrame) -> pd.Series:
+    """
+    Off time per market_id: when the market turned in-play, or the scheduled
+    market_time for markets that never went in-play. Tennis matches often start
+    well after their scheduled time, so market_time alone can be hours early.
+    """
+    scheduled = pd.to_datetime(ticks.groupby("market_id")["market_time"].first(), utc=True, format="mixed")
+    return in_play_times(ticks).reindex(scheduled.index).fillna(scheduled)
+
+
+def sample_horizons(ticks: pd.DataFrame, horizons: list[str]) -> pd.DataFrame:
+    """
+    As-of LTP per (market_id, selection_id) at each horizon before the off.
+
+    ticks needs market_id, selection_id, timestamp, ltp and market_time, plus
+    in_play_time to anchor on the in-play transition (see off_times). Ticks from
+    the transition on are in-play and never sampled. The ticks are sorted once;
+    each horizon is then a single merge_asof against the targets, so adding a
+    horizon costs one vectorized join rather than another parse.
+    Returns one row per selection with one column per horizon (NaN if no tick yet).
+    """
+    keys = ["market_id", "selection_id"]
+    ticks = ticks.dropna(subset=["ltp"])
+
+    ts = to_utc(ticks["timestamp"])
+    pre_off = ~(ts >= ticks["market_id"].map(in_play_times(ticks)))
+    right = pd.DataFrame({
+        "market_id": ticks["market_id"].values,
+        "selection_id": ticks["selection_id"].values,
+        "ts": ts.values,
+        "ltp": ticks["ltp"].values,
+    })[pre_off.values].sort_values("ts", kind="stable")
+
+    targets = ticks.drop_duplicates(subset=keys)[keys + ["market_time"]].reset_index(drop=True)
+    off = targets["market_id"].map(off_times(ticks))
+
+    out = targets.copy()
+    for spec in horizons:
+        left = targets[keys].assign(ts=(off - parse_horizon(spec)).values, _row=range(len(targets)))
+        left = left.dropna(subset=["ts"]).sort_values("ts", kind="stable")
+        joined = pd.merge_asof(left, right, on="ts", by=keys, direction="backward")
+        out[horizon_column(spec)] = joined.set_index("_row")["ltp"].reindex(range(len(targets))).values
+    return out
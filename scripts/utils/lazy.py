@@ -0,0 +1,23 @@
+import sys
+import importlib.util
+
+
+def lazy_import(name: str):
+    """
+    Returns a module whose import is deferred until one of its attributes is used.
+    Scripts bind heavy dependencies (pandas, numpy, joblib) this way so that
+    --help, --dry_run and the p1v2 command listing start without loading them.
+    Modules that use them in annotations need `from __future__ import annotations`.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
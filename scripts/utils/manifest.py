@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from datetime import datetime
+
+from scripts.utils.lazy import lazy_import
+from scripts.utils.paths import PARSED_DIR
+from scripts.utils.logger import log_info
+
+pd = lazy_import("pandas")
+
+MANIFEST_COLUMNS = ["path", "date", "event_id", "market_id", "size", "mtime"]
+
+
+def default_manifest_path(root: str | Path) -> Path:
+    """
+    Manifest location for a snapshot archive, e.g. parsed/snapshot_manifest_BASIC.csv
+    """
+    return PARSED_DIR / f"snapshot_manifest_{Path(root).resolve().name}.csv"
+
+
+class SnapshotManifest:
+    """
+    Persistent index of the .bz2 files under a Betfair archive laid out as
+    <root>/<year>/<Mon>/<day>/<event_id>/<market_id>.bz2
+
+    Each day directory is stored with a signature (its own mtime and the mtimes of
+    its event directories). On refresh, only days whose signature changed are
+    re-listed, so an up-to-date manifest costs a stat per directory instead of an
+    rglob, strptime and row rebuild per file. A file overwritten in place changes
+    no directory mtime; refresh(full=True) also compares a digest of every file's
+    size and mtime to catch it.
+
+    query() answers from the saved index and only walks the archive when asked to
+    (refresh=True) or when no day in the range has been indexed yet.
+    """
+
+    def __init__(self, root: str | Path, manifest_path: str | Path | None = None):
+        self.root = Path(root)
+        self.manifest_path = Path(manifest_path) if manifest_path else default_manifest_path(root)
+        self.days_path = self.manifest_path.with_suffix(".days.json")
+        self._df = None
+        self._days = None
+
+    def load(self) -> pd.DataFrame:
+        if self._df is None:
+            if self.manifest_path.exists() and self.days_path.exists():
+                df = pd.read_csv(self.manifest_path, dtype={"event_id": str, "market_id": str, "path": str})
+                df["date"] = pd.to_datetime(df["date"])
+                with open(self.days_path, "r", encoding="utf-8") as f:
+                    self._days = json.load(f)
+            else:
+                df = pd.DataFrame(columns=MANIFEST_COLUMNS).astype({"date": "datetime64[ns]"})
+                self._days = {}
+            self._df = df.sort_values("date", kind="stable").reset_index(drop=True)
+        return self._df
+
+    def save(self):
+        """Writes both files to temp files and renames them, so concurrent builds never read a partial manifest"""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_name(f"{self.manifest_path.name}.{os.getpid()}.tmp")
+        self._df.to_csv(tmp, index=False, date_format="%Y-%m-%d")
+        days_tmp = self.days_path.with_name(f"{self.days_path.name}.{os.getpid()}.tmp")
+        with open(days_tmp, "w", encoding="utf-8") as f:
+            json.dump(self._days, f, indent=0, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+        os.replace(days_tmp, self.days_path)
+
+    def _iter_day_dirs(self):
+        """
+        Yields (relative_day_dir, date) for every <year>/<Mon>/<day> directory.
+        """
+        for year in _scandir_dirs(self.root):
+            for month in _scandir_dirs(year.path):
+                for day in _scandir_dirs(month.path):
+                    try:
+                        dt = datetime.strptime(f"{year.name}-{month.name}-{day.name}", "%Y-%b-%d")
+                    except ValueError:
+                        continue
+                    yield os.path.join(year.name, month.name, day.name), dt
+
+    def _day_signature(self, day_dir: str, files: bool = False) -> list:
+        full = self.root / day_dir
+        events = sorted(_scandir_dirs(full), key=lambda e: e.name)
+        mtime = max([full.stat().st_mtime_ns] + [e.stat().st_mtime_ns for e in events])
+        if not files:
+            return [mtime, len(events)]
+        # Overwriting a file in place changes neither directory mtime, so fold in file stats
+        digest = hashlib.blake2b(digest_size=8)
+        for event in events:
+            with os.scandir(event.path) as it:
+                for entry in sorted((e for e in it if e.name.endswith(".bz2")), key=lambda e: e.name):
+                    st = entry.stat()
+                    digest.update(f"{event.name}/{entry.name}:{st.st_size}:{st.st_mtime_ns};".encode())
+        return [mtime, len(events), digest.hexdigest()]
+
+    def _list_day(self, day_dir: str, dt: datetime) -> list[dict]:
+        rows = []
+        for event in _scandir_dirs(self.root / day_dir):
+            with os.scandir(event.path) as it:
+                for entry in it:
+                    if not entry.name.endswith(".bz2") or not entry.is_file():
+                        continue
+                    st = entry.stat()
+                    rows.append({
+                        "path": os.path.join(day_dir, event.name, entry.name),
+                        "date": dt,
+                        "event_id": event.name,
+                        "market_id": entry.name[:-len(".bz2")],
+                        "size": st.st_size,
+                        "mtime": st.st_mtime_ns,
+                    })
+        return rows
+
+    def refresh(self, start: datetime | None = None, end: datetime | None = None, full: bool = False) -> pd.DataFrame:
+        """
+        Brings the manifest up to date, optionally only for days within [start, end].
+        Days are compared by directory mtimes; full=True also stats every file, so a
+        file overwritten in place is re-listed too.
+        """
+        df = self.load()
+        seen, changed, new_rows = set(), [], []
+        for day_dir, dt in self._iter_day_dirs():
+            if (start and dt < start) or (end and dt > end):
+                continue
+            seen.add(day_dir)
+            sig = self._day_signature(day_dir, files=full)
+            # A light signature is the prefix of a full one, so either kind compares on it
+            saved = self._days.get(day_dir)
+            if saved is not None and saved[:len(sig)] == sig:
+                continue
+            changed.append(day_dir)
+            self._days[day_dir] = sig
+            new_rows.extend(self._list_day(day_dir, dt))
+
+        # Days in the refreshed range that no longer exist on disk
+        removed = [d for d in self._days if d not in seen and _in_range(d, start, end)]
+        for d in removed:
+            del self._days[d]
+
+        if changed or removed:
+            stale = set(changed) | set(removed)
+            day_of = df["path"].map(lambda p: os.path.dirname(os.path.dirname(p)))
+            df = df[~day_of.isin(stale)]
+            if new_rows:
+                df = pd.concat([df, pd.DataFrame(new_rows, columns=MANIFEST_COLUMNS)], ignore_index=True)
+            self._df = df.sort_values(["date", "path"], kind="stable").reset_index(drop=True)
+            self.save()
+            log_info(f"🗂️ Manifest refreshed: {len(changed)} day(s) re-listed, {len(removed)} removed, {len(self._df)} files indexed")
+        return self._df
+
+    def query(self, start: datetime, end: datetime, refresh: bool = False) -> list[Path]:
+        """
+        Returns the snapshot files dated within [start, end] (inclusive), in path order.
+        Reads the saved index; refresh=True (or a range with no indexed day) refreshes it first.
+        """
+        df = self.load()
+        if refresh or not any(_in_range(d, start, end) for d in self._days):
+            df = self.refresh(start, end)
+        dates = df["date"].values
+        lo = dates.searchsorted(pd.Timestamp(start).to_datetime64(), side="left")
+        hi = dates.searchsorted(pd.Timestamp(end).to_datetime64(), side="right")
+        return [self.root / p for p in sorted(df["path"].iloc[lo:hi])]
+
+
+def _scandir_dirs(path):
+    try:
+        with os.scandir(path) as it:
+            return [e for e in it if e.is_dir()]
+    except FileNotFoundError:
+        return []
+
+
+def _in_range(day_dir: str, start: datetime | None, end: datetime | None) -> bool:
+    try:
+        dt = datetime.strptime("-".join(Path(day_dir).parts[-3:]), "%Y-%b-%d")
+    except ValueError:
+        return False
+    return not ((start and dt < start) or (end and dt > end))
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import os
+import json
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+
+from scripts.utils.lazy import lazy_import
+from scripts.utils.manifest import SnapshotManifest
+from scripts.utils.snapshot_parser import SnapshotParser
+from scripts.utils.paths import PARSED_DIR
+from scripts.utils.logger import log_info, log_error
+
+pd = lazy_import("pandas")
+
+CATALOG_COLUMNS = [
+    "market_id", "event_id", "market_time", "event_name", "competition", "country_code",
+    "market_type", "market_name", "runner_1", "runner_2", "selection_id_1", "selection_id_2",
+    "runners", "path", "file_date", "size", "mtime",
+]
+# market_id of the marker row recorded for a file without any marketDefinition,
+# so update() knows it was read and does not decompress it again
+NO_MARKETS = ""
+
+
+def default_catalog_path(root: str | Path) -> Path:
+    """
+    Catalog location for a snapshot archive, e.g. parsed/market_catalog_BASIC.csv
+    """
+    return PARSED_DIR / f"market_catalog_{Path(root).resolve().name}.csv"
+
+
+def read_market_definitions(file_path: Path) -> list[dict]:
+    """
+    Returns one catalog row per market in a stream file, taken from the first
+    marketDefinition seen for that market. Reading stops at the first definition
+    when the file holds a single market, which is the BASIC archive layout.
+    """
+    parser_obj = SnapshotParser(mode="metadata")
+    market_id = file_path.name[:-len(".bz2")] if file_path.name.endswith(".bz2") else None
+    found = {}
+    try:
+        for data in parser_obj.iter_messages(file_path, (b"marketDefinition",)):
+            for mc in data.get("mc", []):
+                mid = mc.get("id")
+                md = mc.get("marketDefinition")
+                if md is None or mid in found:
+                    continue
+                runners = md.get("runners", [])
+                found[mid] = {
+                    "market_id": mid,
+                    "event_id": md.get("eventId"),
+                    "market_time": md.get("marketTime"),
+                    "event_name": md.get("eventName", ""),
+                    "competition": md.get("competition", ""),
+                    "country_code": md.get("countryCode", ""),
+                    "market_type": md.get("marketType", ""),
+                    "market_name": md.get("name", ""),
+                    "runner_1": runners[0]["name"] if len(runners) >= 1 else "",
+                    "runner_2": runners[1]["name"] if len(runners) >= 2 else "",
+                    "selection_id_1": runners[0]["id"] if len(runners) >= 1 else None,
+                    "selection_id_2": runners[1]["id"] if len(runners) >= 2 else None,
+                    "runners": json.dumps([[r["id"], r["name"]] for r in runners], ensure_ascii=False),
+                }
+            if market_id in found:
+                break
+    except Exception as e:
+        log_error(f"❌ Failed: {file_path} — {e}")
+    return list(found.values())
+
+
+class MarketCatalog:
+    """
+    Persisted catalog of every market in the archive, built from marketDefinition headers.
+
+    Rows are keyed by the manifest entry (path, size, mtime) they were read from, so
+    update() only decompresses files that are new or changed since the last run.
+    Files without a marketDefinition get one marker row (market_id NO_MARKETS),
+    hidden from queries. Queries never touch the .bz2 files.
+    """
+
+    def __init__(self, root: str | Path, catalog_path: str | Path | None = None, manifest: SnapshotManifest | None = None):
+        self.root = Path(root)
+        self.catalog_path = Path(catalog_path) if catalog_path else default_catalog_path(root)
+        self.manifest = manifest or SnapshotManifest(root)
+        self._df = None
+
+    def load(self) -> pd.DataFrame:
+        if self._df is None:
+            if self.catalog_path.exists():
+                df = pd.read_csv(
+                    self.catalog_path,
+                    dtype={"market_id": str, "event_id": str, "path": str, "runners": str},
+                    keep_default_na=False, na_values={"selection_id_1": [""], "selection_id_2": [""]},
+                )
+                df["file_date"] = pd.to_datetime(df["file_date"])
+            else:
+                df = pd.DataFrame(columns=CATALOG_COLUMNS).astype({"file_date": "datetime64[ns]"})
+            self._df = df
+        return self._df
+
+    def save(self):
+        """Writes to a temp file and renames it, so concurrent or crashed builds never leave a partial catalog"""
+        self.catalog_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.catalog_path.with_name(f"{self.catalog_path.name}.{os.getpid()}.tmp")
+        self._df.to_csv(tmp, index=False, date_format="%Y-%m-%d")
+        os.replace(tmp, self.catalog_path)
+
+    def update(self, start: datetime | None = None, end: datetime | None = None, workers: int = 1) -> pd.DataFrame:
+        """
+        Catalogs every manifest file within [start, end] that is not already
+        cataloged at its current size and mtime.
+        """
+        files = self.manifest.refresh(start, end)
+        if start is not None:
+            files = files[files["date"] >= pd.Timestamp(start)]
+        if end is not None:
+            files = files[files["date"] <= pd.Timestamp(end)]
+
+        df = self.load()
+        known = set(zip(df["path"], df["size"].astype("int64"), df["mtime"].astype("int64")))
+        todo = files[[
+            (p, s, m) not in known for p, s, m in zip(files["path"], files["size"], files["mtime"])
+        ]]
+
+        # Drop rows for files in range that changed or disappeared
+        in_range = df["file_date"].between(pd.Timestamp(start or datetime.min), pd.Timestamp(end or datetime.max))
+        current = set(files["path"])
+        stale = in_range & (~df["path"].isin(current) | df["path"].isin(set(todo["path"])))
+
+        if todo.empty and not stale.any():
+            return df
+
+        log_info(f"📚 Cataloging {len(todo)} new or changed files")
+        paths = [self.root / p for p in todo["path"]]
+        if workers > 1 and len(paths) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(tqdm(
+                    pool.map(read_market_definitions, paths, chunksize=max(1, len(paths) // (workers * 8))),
+                    total=len(paths), desc="Cataloging markets", unit="file"
+                ))
+        else:
+            results = [read_market_definitions(p) for p in tqdm(paths, desc="Cataloging markets", unit="file")]
+
+        new_rows = []
+        for (_, f), rows in zip(todo.iterrows(), results):
+            for row in rows or [{"market_id": NO_MARKETS}]:
+                row.update({"path": f["path"], "file_date": f["date"], "size": f["size"], "mtime": f["mtime"]})
+                new_rows.append(row)
+
+        df = df[~stale]
+        if new_rows:
+            df = pd.concat([df, pd.DataFrame(new_rows, columns=CATALOG_COLUMNS)], ignore_index=True)
+        self._df = df.sort_values(["file_date", "path", "market_id"], kind="stable").reset_index(drop=True)
+        self.save()
+        log_info(f"📚 Catalog holds {(self._df['market_id'] != NO_MARKETS).sum()} markets → {self.catalog_path}")
+        return self._df
+
+    def query(
+        self,
+        start: datetime,
+        end: datetime,
+        market_type: str | None = "MATCH_ODDS",
+        update: bool = True,
+        workers: int = 1
+    ) -> pd.DataFrame:
+        """
+        Returns catalog rows for markets whose file date is within [start, end],
+        optionally restricted to one market type.
+        """
+        df = self.update(start, end, workers=workers) if update else self.load()
+        mask = df["file_date"].between(pd.Timestamp(start), pd.Timestamp(end)) & (df["market_id"] != NO_MARKETS)
+        if market_type:
+            mask &= df["market_type"] == market_type
+        return df[mask].reset_index(drop=True)
+
+    def files(
+        self,
+        start: datetime,
+        end: datetime,
+        market_type: str | None = "MATCH_ODDS",
+        update: bool = True,
+        workers: int = 1
+    ) -> list[Path]:
+        """
+        Snapshot files holding markets of the given type within [start, end], in path order.
+        Lets the parser skip files of other market types without decompressing them.
+        """
+        rows = self.query(start, end, market_type=market_type, update=update, workers=workers)
+        return [self.root / p for p in sorted(set(rows["path"]))]
@@ -1,5 +1,25 @@
-import pandas as pd
-from fuzzywuzzy import fuzz
+from __future__ import annotations
+
+from scripts.utils.lazy import lazy_import
+from scripts.utils.results_store import UNDATED, load_results, day_numbers
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+rapidfuzz = lazy_import("rapidfuzz")
+
+# tourney_date is the event's (Monday) start date: markets may open a few days before it
+# (Sunday starts, time zones) and the last matches are played up to ~3 weeks after it
+TOURNEY_DATE_SLACK_DAYS = 3
+MAX_TOURNEY_DAYS = 21
+
+# Minimum fuzz.ratio to accept a roster name / to treat two runners as the same name.
+# RapidFuzz scores are floats; the -0.5 keeps the old rounded-integer thresholds.
+FUZZY_CUTOFF = 85 - 0.5
+SAME_NAME_CUTOFF = 91 - 0.5
+
+# (sackmann_csv, fuzzy, aliases) → {name: resolved name or None}, so a name is
+# resolved once per run even when several tournaments share a results file
+_RESOLVED = {}
 
 
 def load_alias_map(path: str) -> dict:
@@ -15,12 +35,15 @@ def apply_alias_map(df: pd.DataFrame, alias_csv: str) -> pd.DataFrame:
 
 
 def fuzzy_match_players(df: pd.DataFrame) -> pd.DataFrame:
-    def match_names(row):
-        if fuzz.ratio(row["runner_1"], row["runner_2"]) > 90:
-            return row["runner_1"] + "_A", row["runner_2"] + "_B"
-        return row["runner_1"], row["runner_2"]
-
-    df[["runner_1", "runner_2"]] = df.apply(match_names, axis=1, result_type="expand")
+    """Suffixes near-identical runner names (_A/_B) so the two players stay distinct"""
+    if df.empty:
+        return df
+    scores = rapidfuzz.process.cpdist(
+        df["runner_1"].tolist(), df["runner_2"].tolist(), scorer=rapidfuzz.fuzz.ratio, workers=-1
+    )
+    same = scores >= SAME_NAME_CUTOFF
+    df.loc[same, "runner_1"] = df.loc[same, "runner_1"] + "_A"
+    df.loc[same, "runner_2"] = df.loc[same, "runner_2"] + "_B"
     return df
 
 
@@ -30,67 +53,119 @@ def build_roster_map(sack_df: pd.DataFrame) -> dict:
     return {name.lower(): name for name in names}
 
 
+def resolve_players(names, roster_map: dict, alias_map: dict, fuzzy: bool, cache: dict | None = None) -> dict:
+    """
+    Resolves distinct names to roster names: exact (case-insensitive, after aliases)
+    first, then all remaining names are scored against every roster key in one
+    multi-threaded similarity matrix; the best score must reach FUZZY_CUTOFF.
+    Results are added to cache, and names already in it are not resolved again.
+    """
+    cache = {} if cache is None else cache
+    pending = {}
+    for name in set(names) - cache.keys():
+        raw = alias_map.get(name, name).lower()
+        if raw in roster_map:
+            cache[name] = roster_map[raw]
+        else:
+            pending.setdefault(raw, []).append(name)
+
+    matches = {}
+    if fuzzy and pending and roster_map:
+        keys, queries = list(roster_map), list(pending)
+        scores = rapidfuzz.process.cdist(
+            queries, keys, scorer=rapidfuzz.fuzz.ratio, score_cutoff=FUZZY_CUTOFF, workers=-1
+        )
+        best = scores.argmax(axis=1)
+        for query, j, score in zip(queries, best, scores[np.arange(len(queries)), best]):
+            if score > 0:
+                matches[query] = roster_map[keys[j]]
+
+    for raw, originals in pending.items():
+        for name in originals:
+            cache[name] = matches.get(raw)
+    return {name: cache[name] for name in names}
+
+
 def resolve_player(name: str, roster_map: dict, alias_map: dict, fuzzy: bool) -> str:
-    raw = alias_map.get(name, name).lower()
-    if raw in roster_map:
-        return roster_map[raw]
+    return resolve_players([name], roster_map, alias_map, fuzzy)[name]
 
-    if fuzzy:
-        best_match = None
-        best_score = 0
-        for key in roster_map:
-            score = fuzz.ratio(raw, key)
-            if score > best_score:
-                best_match = key
-                best_score = score
-        return roster_map.get(best_match) if best_score >= 85 else None
 
-    return None
+def find_result(days, rows, market_day: int) -> int | None:
+    """
+    Row position of the result played at market_day among one pair's results (days/rows
+    from ResultsStore.pair_slice): the latest event starting no later than
+    market_day + TOURNEY_DATE_SLACK_DAYS, if it started at most MAX_TOURNEY_DAYS before.
+    Without dates, the pair's first result.
+    """
+    dated = days[days != UNDATED]
+    if market_day == UNDATED or dated.size == 0:
+        return int(rows.min())
+
+    i = np.searchsorted(dated, market_day + TOURNEY_DATE_SLACK_DAYS, side="right") - 1
+    if i < 0 or market_day - dated[i] > MAX_TOURNEY_DAYS:
+        return None
+    # Several results for the pair in one event: the first in file order
+    return int(rows[np.searchsorted(dated, dated[i], side="left")])
 
 
 def match_snapshots_to_results(
     df_matches: pd.DataFrame,
     sackmann_csv: str,
     alias_map: dict = None,
-    fuzzy: bool = True
+    fuzzy: bool = True,
+    registry=None
 ) -> pd.DataFrame:
     """
     Matches Betfair snapshot-based matches to Sackmann match results.
-    Adds columns: winner_name, loser_name, player_1_won, round, score, etc.
+    Adds columns: winner_name, loser_name, player_1_won, round, score, surface.
+    Each match is a lookup on its player pair plus a date search on tourney_date,
+    so rematches in a season resolve to the result of the right event.
+    registry: a PlayerRegistry; runner names it already links to a results player
+    are not fuzzy-matched again, and new resolutions are added to it.
+    Results come from the file's ResultsStore, parsed and indexed once (see results_store.py).
     """
     if alias_map is None:
         alias_map = {}
 
-    sack_df = pd.read_csv(sackmann_csv)
-    roster_map = build_roster_map(sack_df)
+    results = load_results(sackmann_csv)
+    sack_df = results.frame
+    roster_map = {name.lower(): name for name in results.players}
+    columns = {
+        col: sack_df[col].tolist() if col in sack_df else [""] * len(sack_df)
+        for col in ("winner_name", "loser_name", "round", "score", "surface")
+    }
+
+    names = set(df_matches["runner_1"]).union(df_matches["runner_2"])
+    cache = _RESOLVED.setdefault((str(sackmann_csv), fuzzy, frozenset(alias_map.items())), {})
+    if registry is not None:
+        registry.add_names(sorted(roster_map.values()), source="sackmann")
+        registry.add_aliases(alias_map)
+        for name in names:
+            canonical = registry.canonical(name)
+            if canonical is not None and canonical.lower() in roster_map:
+                cache.setdefault(name, roster_map[canonical.lower()])
+    resolved = resolve_players(names, roster_map, alias_map, fuzzy, cache)
+    if registry is not None:
+        for name in sorted(resolved):
+            registry.add(name, resolved[name], source="betfair")
+    market_days = day_numbers(pd.to_datetime(df_matches["market_time"], utc=True, errors="coerce"))
+    p1s, p2s = df_matches["runner_1"].map(resolved), df_matches["runner_2"].map(resolved)
+    codes = np.where(p1s.notna() & p2s.notna(), results.pair_codes(p1s, p2s), -1)
 
     matched = []
-    for _, row in df_matches.iterrows():
-        p1 = resolve_player(row["runner_1"], roster_map, alias_map, fuzzy)
-        p2 = resolve_player(row["runner_2"], roster_map, alias_map, fuzzy)
-
-        if not p1 or not p2:
+    for p1, code, market_day in zip(p1s, codes, market_days):
+        pos = find_result(*results.pair_slice(code), market_day) if code >= 0 else None
+        if pos is None:
             matched.append({})
             continue
 
-        candidates = sack_df[
-            ((sack_df["winner_name"].isin([p1, p2])) & (sack_df["loser_name"].isin([p1, p2])))
-        ]
-
-        if candidates.empty:
-            matched.append({})
-            continue
-
-        best_match = candidates.iloc[0]
-        winner = best_match["winner_name"]
-        player_1_won = int(winner == p1)
-
         matched.append({
-            "winner_name": best_match["winner_name"],
-            "loser_name": best_match["loser_name"],
-            "round": best_match.get("round", ""),
-            "score": best_match.get("score", ""),
-            "player_1_won": player_1_won,
+            "winner_name": columns["winner_name"][pos],
+            "loser_name": columns["loser_name"][pos],
+            "round": columns["round"][pos],
+            "score": columns["score"][pos],
+            "surface": columns["surface"][pos],
+            "player_1_won": int(columns["winner_name"][pos] == p1),
         })
 
     df_extra = pd.DataFrame(matched)
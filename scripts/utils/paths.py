@@ -1,36 +1,46 @@
 from pathlib import Path
 
+from scripts.utils.table_io import with_format
+
 # === Constants ===
 DEFAULT_MODEL_PATH = "modeling/win_model.pkl"
 DEFAULT_CONFIG_FILE = "configs/tournaments_2024.yaml"
 PROCESSED_DIR = Path("data/processed")
 PARSED_DIR = Path("parsed")
 SNAPSHOT_DIR = Path("parsed")
+PERF_DIR = PROCESSED_DIR / "perf"
+PLAYER_REGISTRY_CSV = PROCESSED_DIR / "player_registry.csv"
+RESULTS_STORE_DIR = PROCESSED_DIR / "results_store"
+PLAYER_RATINGS_CSV = PROCESSED_DIR / "player_ratings.csv"
 
-def get_pipeline_paths(label: str) -> dict:
+def get_pipeline_paths(label: str, fmt: str | None = None) -> dict:
     """
     Returns all standardized file paths used in the full pipeline for a given tournament label.
     Example label: 'ausopen_2024_atp'
+    fmt ('csv', 'parquet', 'feather') sets the suffix of every table path; keys keep their _csv names.
     """
     base = PROCESSED_DIR
-    return {
+    paths = {
         "raw_csv": base / f"{label}_clean_snapshot_matches.csv",
         "ids_csv": base / f"{label}_ids.csv",
         "odds_csv": base / f"{label}_with_odds.csv",
+        "horizons_csv": base / f"{label}_preoff_prices.csv",
         "features_csv": base / f"{label}_features.csv",
         "predictions_csv": base / f"{label}_predictions.csv",
         "value_csv": base / f"{label}_value_bets.csv",
         "bankroll_csv": base / f"{label}_bankroll.csv",
         "snapshot_csv": SNAPSHOT_DIR / f"betfair_{label}_snapshots.csv",
+        "tick_store": SNAPSHOT_DIR / f"betfair_{label}_tick_store",
         "summary_png": base / f"{label}_bankroll.png",
     }
+    return {k: (v if k in ("summary_png", "tick_store") else with_format(v, fmt)) for k, v in paths.items()}
 
-def get_snapshot_csv_path(label: str) -> str:
+def get_snapshot_csv_path(label: str, fmt: str | None = None) -> str:
     """
     Shortcut for snapshot file location.
     Used in builder and parser logic.
     """
-    return str(SNAPSHOT_DIR / f"betfair_{label}_snapshots.csv")
+    return str(with_format(SNAPSHOT_DIR / f"betfair_{label}_snapshots.csv", fmt))
 
 def ensure_dir(path: str | Path):
     """
@@ -0,0 +1,167 @@
+import os
+import sys
+import csv
+import json
+import time
+import atexit
+from pathlib import Path
+
+try:
+    import resource  # peak RSS; not available on Windows
+except ImportError:
+    resource = None
+
+# When set, the process appends its run record (one JSON line) to this file on exit.
+# run_full_pipeline sets it per stage; subprocesses a stage spawns inherit it.
+PERF_RECORD_ENV = "P1V2_PERF_RECORD"
+
+COUNTERS = ["rows_in", "rows_out", "bytes_in", "bytes_out"]
+REPORT_COLUMNS = [
+    "run_id", "started_at", "label", "stage", "status",
+    "wall_s", "cpu_s", "peak_rss_mb", *COUNTERS,
+]
+
+_counters = dict.fromkeys(COUNTERS, 0)
+_process_start = time.perf_counter()
+
+
+def path_size(path) -> int:
+    """
+    Size of a file, or of every file under a directory (0 if missing).
+    """
+    path = Path(path)
+    if path.is_file():
+        return path.stat().st_size
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+    return 0
+
+
+def count_read(path=None, rows: int = 0, nbytes: int | None = None):
+    """
+    Adds a read to this process's counters; bytes default to the size of path.
+    """
+    _counters["rows_in"] += rows
+    _counters["bytes_in"] += path_size(path) if nbytes is None else nbytes
+
+
+def count_write(path=None, rows: int = 0, nbytes: int | None = None):
+    _counters["rows_out"] += rows
+    _counters["bytes_out"] += path_size(path) if nbytes is None else nbytes
+
+
+def cpu_seconds() -> float:
+    """
+    CPU time of this process plus its finished subprocesses.
+    """
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def peak_rss_mb() -> float | None:
+    """
+    Peak resident set size of this process or its largest finished subprocess, in MiB.
+    """
+    if resource is None:
+        return None
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss: bytes on macOS, KiB on Linux
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return round(peak * scale / 2 ** 20, 1)
+
+
+class measure:
+    """
+    Resource usage and row/byte counts of a block, e.g. one in-process stage:
+
+        with measure() as m:
+            executor.run("merge")
+        m.record  # {"wall_s": ..., "cpu_s": ..., "peak_rss_mb": ..., "rows_in": ..., ...}
+
+    Peak RSS is the process peak so far (RSS is not tracked per block).
+    """
+
+    def __enter__(self):
+        self._start = (time.perf_counter(), cpu_seconds(), dict(_counters))
+        self.record = None
+        return self
+
+    def __exit__(self, *exc):
+        wall, cpu, counters = self._start
+        self.record = {
+            "wall_s": round(time.perf_counter() - wall, 3),
+            "cpu_s": round(cpu_seconds() - cpu, 3),
+            "peak_rss_mb": peak_rss_mb(),
+            **{k: _counters[k] - counters[k] for k in COUNTERS},
+        }
+
+
+def process_record() -> dict:
+    """
+    Run record for the whole process so far.
+    """
+    return {
+        "pid": os.getpid(),
+        "wall_s": round(time.perf_counter() - _process_start, 3),
+        "cpu_s": round(cpu_seconds(), 3),
+        "peak_rss_mb": peak_rss_mb(),
+        **_counters,
+    }
+
+
+def append_record(path, record: dict):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def load_record(path) -> dict | None:
+    """
+    Merges the records appended to path by a stage and its subprocesses:
+    rows and bytes are summed; CPU time and peak RSS, which already include
+    finished subprocesses, are the maximum over records.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if not records:
+        return None
+    merged = {k: sum(r.get(k, 0) for r in records) for k in COUNTERS}
+    for key in ("wall_s", "cpu_s", "peak_rss_mb"):
+        values = [r[key] for r in records if r.get(key) is not None]
+        merged[key] = max(values) if values else None
+    return merged
+
+
+def write_report(rows: list[dict], run: dict, report_dir) -> Path:
+    """
+    Writes run_<run_id>.json (run metadata + one record per stage) and appends the
+    stage records to history.csv, which accumulates every run for regression tracking.
+    """
+    report_dir = Path(report_dir)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    json_path = report_dir / f"run_{run['run_id']}.json"
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump({**run, "stages": rows}, f, indent=2)
+
+    history = report_dir / "history.csv"
+    new = not history.exists()
+    with open(history, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS, extrasaction="ignore")
+        if new:
+            writer.writeheader()
+        writer.writerows(rows)
+    return json_path
+
+
+def _emit_process_record():
+    append_record(os.environ[PERF_RECORD_ENV], process_record())
+
+
+if os.environ.get(PERF_RECORD_ENV):
+    atexit.register(_emit_process_record)
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import os
+import copy
+from pathlib import Path
+from collections import deque
+
+from scripts.utils.lazy import lazy_import
+from scripts.utils.results_store import parse_tourney_dates
+from scripts.utils.logger import log_info
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+joblib = lazy_import("joblib")
+
+STATE_VERSION = 2
+ELO_START = 1500.0
+FORM_WINDOW = 10  # matches in the rolling win rate
+SURFACES = ["Hard", "Clay", "Grass", "Carpet"]
+# Sackmann only dates the event (tourney_date = its first Monday), not each match.
+# An event's results become visible this many days after it starts (a Slam ends on
+# day 13-14), so a match never sees results of its own or a still-running event.
+RESULTS_LAG_DAYS = 15
+ROUND_ORDER = {r: i for i, r in enumerate(["Q1", "Q2", "Q3", "Q4", "RR", "R128", "R64", "R32", "R16", "QF", "SF", "BR", "F"])}
+
+RATING_COLUMNS = ["elo", *[f"elo_{s.lower()}" for s in SURFACES], "matches", "form"]
+FEATURE_COLUMNS = [
+    "elo_1", "elo_2", "elo_diff", "elo_win_prob",
+    "surface_elo_1", "surface_elo_2", "form_1", "form_2", "matches_1", "matches_2",
+]
+
+
+def k_factor(matches: int) -> float:
+    """Elo K that shrinks as a player's match count grows (FiveThirtyEight's tennis Elo)"""
+    return 250 / (matches + 5) ** 0.4
+
+
+def expected_score(rating: float, opponent: float) -> float:
+    return 1 / (1 + 10 ** ((opponent - rating) / 400))
+
+
+def match_keys(results: pd.DataFrame) -> pd.Series:
+    """Identifies a result across runs: tourney_id + match_num, else date, players and round"""
+    if {"tourney_id", "match_num"}.issubset(results.columns):
+        return results["tourney_id"].astype(str) + "_" + results["match_num"].astype(str)
+    return (
+        results["tourney_date"].astype(str) + "_" + results["winner_name"].astype(str)
+        + "_" + results["loser_name"].astype(str) + "_" + (results["round"].astype(str) if "round" in results else "")
+    )
+
+
+class RatingEngine:
+    """
+    Surface-aware Elo and rolling form, updated one match at a time in chronological
+    order. The state (ratings plus the keys of applied matches) is saved, so a later
+    run only applies matches it has not seen. Results of the latest applied date (an
+    event still being played) roll back to a checkpoint taken before that date and
+    re-apply it, so the order is the same as a rebuild; older ones recompute everything.
+    """
+
+    def __init__(self):
+        self.version = STATE_VERSION
+        self.players = {}  # name → {"elo", "n", "surface": {s: [elo, n]}, "form": deque}
+        self.applied = set()
+        self.as_of = None  # latest tourney_date applied
+        self.checkpoint = None  # (players, applied, as_of) before the as_of results
+
+    def player(self, name: str) -> dict:
+        state = self.players.get(name)
+        if state is None:
+            state = {"elo": ELO_START, "n": 0, "surface": {}, "form": deque(maxlen=FORM_WINDOW)}
+            self.players[name] = state
+        return state
+
+    def play(self, winner: str, loser: str, surface: str | None):
+        w, l = self.player(winner), self.player(loser)
+        expected = expected_score(w["elo"], l["elo"])
+        w_elo, l_elo = w["elo"], l["elo"]
+        w["elo"] = w_elo + k_factor(w["n"]) * (1 - expected)
+        l["elo"] = l_elo - k_factor(l["n"]) * (1 - expected)
+        w["n"] += 1
+        l["n"] += 1
+        if surface in SURFACES:
+            ws = w["surface"].setdefault(surface, [ELO_START, 0])
+            ls = l["surface"].setdefault(surface, [ELO_START, 0])
+            expected = expected_score(ws[0], ls[0])
+            ws[0], ls[0] = ws[0] + k_factor(ws[1]) * (1 - expected), ls[0] - k_factor(ls[1]) * (1 - expected)
+            ws[1] += 1
+            ls[1] += 1
+        w["form"].append(1)
+        l["form"].append(0)
+
+    def snapshot(self, name: str) -> dict:
+        state = self.players[name]
+        return {
+            "player": name,
+            "elo": state["elo"],
+            **{f"elo_{s.lower()}": state["surface"].get(s, [ELO_START])[0] for s in SURFACES},
+            "matches": state["n"],
+            "form": sum(state["form"]) / len(state["form"]),
+        }
+
+    def new_results(self, results: pd.DataFrame) -> pd.DataFrame:
+        """Results not applied yet"""
+        keys = match_keys(results)
+        return results[~keys.isin(self.applied)]
+
+    def apply(self, results: pd.DataFrame) -> pd.DataFrame:
+        """
+        Applies results (Sackmann columns; tourney_date parsed) in one chronological pass
+        and returns point-in-time snapshots: each player of each event with their ratings
+        after it, dated when the event's results become visible.
+        Walkovers are skipped.
+        """
+        if "tourney_id" not in results:
+            results = results.assign(tourney_id=results["tourney_date"].astype(str))
+        results = results.assign(
+            _key=match_keys(results),
+            _round=results["round"].astype(str).map(ROUND_ORDER).fillna(len(ROUND_ORDER)) if "round" in results else 0,
+            _num=results["match_num"] if "match_num" in results else 0,
+        ).dropna(subset=["tourney_date", "winner_name", "loser_name"])
+        results = results.sort_values(["tourney_date", "tourney_id", "_round", "_num"], kind="stable")
+        scores = results["score"].astype(str) if "score" in results else pd.Series("", index=results.index)
+        surfaces = results["surface"].astype(object) if "surface" in results else pd.Series(None, index=results.index)
+
+        last = results["tourney_date"].max() if len(results) else None
+        rows, event, players = [], None, set()
+        for key, tourney_id, date, winner, loser, surface, score in zip(
+            results["_key"], results["tourney_id"], results["tourney_date"],
+            results["winner_name"], results["loser_name"], surfaces, scores,
+        ):
+            if (tourney_id, date) != event:
+                rows += self._snapshots(players, event)
+                if date == last and (event is None or event[1] != last):
+                    self.checkpoint = copy.deepcopy((self.players, self.applied, self.as_of))
+                event, players = (tourney_id, date), set()
+            self.applied.add(key)
+            if "W/O" in score:
+                continue
+            self.play(winner, loser, surface)
+            players.update((winner, loser))
+        rows += self._snapshots(players, event)
+        if last is not None:
+            self.as_of = last if self.as_of is None else max(self.as_of, last)
+        return pd.DataFrame(rows, columns=["player", "date", *RATING_COLUMNS])
+
+    def rollback(self) -> bool:
+        """Restores the state from before the latest date's results; False if there is no checkpoint"""
+        if self.checkpoint is None:
+            return False
+        self.players, self.applied, self.as_of = self.checkpoint
+        self.checkpoint = None
+        return True
+
+    def _snapshots(self, players: set, event) -> list[dict]:
+        if event is None:
+            return []
+        visible = event[1] + pd.Timedelta(days=RESULTS_LAG_DAYS)
+        return [{**self.snapshot(name), "date": visible} for name in sorted(players)]
+
+    def save(self, path: str | Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        joblib.dump(self, tmp)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path: str | Path) -> RatingEngine | None:
+        """The saved engine, or None if missing or from an older layout"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        engine = joblib.load(path)
+        return engine if getattr(engine, "version", None) == STATE_VERSION else None
+
+
+def update_ratings(results: pd.DataFrame, history: pd.DataFrame | None, state_path: str | Path, rebuild: bool = False):
+    """
+    Brings the ratings history up to date with results. Only results not applied before
+    are processed. New results on the latest applied date re-apply that date from the
+    engine's checkpoint; a result dated earlier (e.g. a corrected older file) triggers
+    a full recompute. Either way the history equals a rebuild's.
+    Returns (history, number of results applied).
+    """
+    results = results.assign(tourney_date=parse_tourney_dates(results["tourney_date"])).dropna(subset=["tourney_date"])
+    engine = None if rebuild or history is None else RatingEngine.load(state_path)
+    if engine is not None:
+        new = engine.new_results(results)
+        if not len(new):
+            return history, 0
+        first = new["tourney_date"].min()
+        if engine.as_of is not None and first == engine.as_of and engine.rollback():
+            log_info(f"↩️ New results on {first:%Y-%m-%d}, the latest applied date; re-applying it")
+            new = engine.new_results(results)
+        elif engine.as_of is not None and first <= engine.as_of:
+            log_info(f"🔁 {len(new)} new results predate the saved ratings ({engine.as_of:%Y-%m-%d}); recomputing")
+            engine = None
+    if engine is None:
+        engine, new, history = RatingEngine(), results, None
+
+    snapshots = engine.apply(new)
+    if history is not None:
+        history = history.assign(date=pd.to_datetime(history["date"]))
+        snapshots = pd.concat([history[snapshots.columns], snapshots], ignore_index=True)
+    # Results added to an event already applied supersede its earlier snapshots
+    history = snapshots.drop_duplicates(["player", "date"], keep="last").sort_values(["date", "player"], kind="stable")
+    engine.save(state_path)
+    return history.reset_index(drop=True), len(new)
+
+
+def add_rating_features(df: pd.DataFrame, history: pd.DataFrame) -> pd.DataFrame:
+    """
+    Point-in-time rating features for player_1/player_2: each player's latest history
+    row dated strictly before the match's market day (merge_asof, no lookahead).
+    Joined on player_1_id/player_2_id when both sides have registry ids, else on name.
+    Players without history get the starting Elo, 0 matches and no form.
+    surface_elo_* uses the surface column (from the results join) when present.
+    """
+    df = df.copy()
+    history = history.assign(date=pd.to_datetime(history["date"]))
+    use_ids = "player_id" in history and {"player_1_id", "player_2_id"}.issubset(df.columns)
+    key = "player_id" if use_ids else "player"
+    right = history.dropna(subset=[key]).assign(_key=lambda h: h[key].astype("int64") if use_ids else h[key].str.lower())
+    right = right.sort_values("date")
+    day = pd.to_datetime(df["market_time"], utc=True, errors="coerce").dt.tz_convert(None).dt.normalize()
+
+    for n in (1, 2):
+        keys = df[f"player_{n}_id"] if use_ids else df[f"player_{n}"].astype(str).str.lower()
+        left = pd.DataFrame({"_row": np.arange(len(df)), "_key": keys.to_numpy(), "date": day.to_numpy()})
+        left = left.dropna(subset=["_key", "date"])
+        if use_ids:
+            left["_key"] = left["_key"].astype("int64")
+        found = pd.merge_asof(
+            left.sort_values("date"), right[["_key", "date", *RATING_COLUMNS]],
+            on="date", by="_key", direction="backward", allow_exact_matches=False,
+        ).set_index("_row").reindex(np.arange(len(df)))
+
+        df[f"elo_{n}"] = found["elo"].fillna(ELO_START).to_numpy()
+        df[f"matches_{n}"] = found["matches"].fillna(0).astype(int).to_numpy()
+        df[f"form_{n}"] = found["form"].to_numpy()
+        surface_elo = np.full(len(df), np.nan)
+        if "surface" in df:
+            for s in SURFACES:
+                mask = (df["surface"] == s).to_numpy()
+                surface_elo[mask] = found[f"elo_{s.lower()}"].fillna(ELO_START).to_numpy()[mask]
+        df[f"surface_elo_{n}"] = surface_elo
+
+    df["elo_diff"] = df["elo_1"] - df["elo_2"]
+    df["elo_win_prob"] = 1 / (1 + 10 ** (-df["elo_diff"] / 400))
+    return df
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import os
+import csv
+from pathlib import Path
+from contextlib import contextmanager
+
+try:
+    import fcntl  # cross-process lock; not available on Windows
+except ImportError:
+    fcntl = None
+
+from scripts.utils.lazy import lazy_import
+from scripts.utils.paths import PLAYER_REGISTRY_CSV
+from scripts.utils.logger import log_info
+
+pd = lazy_import("pandas")
+
+REGISTRY_COLUMNS = ["name", "player_id", "canonical", "source"]
+
+
+def name_key(name) -> str:
+    """Registry key of a spelling: lowercased and stripped, as runner names are compared"""
+    return str(name).lower().strip()
+
+
+class PlayerRegistry:
+    """
+    Maps every known spelling of a player (Betfair runner name, Sackmann name, alias)
+    to a stable integer player_id and the canonical (Sackmann) name.
+
+    Spellings of one player share an id. A runner name that could not be resolved to a
+    results name gets its own provisional id; once it resolves, it is relinked to the
+    results player.
+
+    Every change is journaled, so a copy loaded without the lock can be used for a
+    long build and its changes replayed onto the locked registry afterwards (merge).
+    """
+
+    def __init__(self, path: str | Path = PLAYER_REGISTRY_CSV):
+        self.path = Path(path)
+        self.entries = {}  # name_key → [player_id, canonical, source]
+        self.changed = 0
+        self.journal = []  # (name, canonical, source) of each add() that changed an entry
+        self.load()
+
+    def load(self):
+        self.entries = {}
+        if self.path.exists():
+            with open(self.path, "r", newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    self.entries[name_key(row["name"])] = [int(row["player_id"]), row["canonical"], row["source"]]
+        self.next_id = max((e[0] for e in self.entries.values()), default=0) + 1
+
+    def save(self):
+        """Rewrites the registry atomically (write to a temp file, then replace)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(REGISTRY_COLUMNS)
+            for key, (player_id, canonical, source) in sorted(self.entries.items(), key=lambda e: (e[1][0], e[0])):
+                writer.writerow([key, player_id, canonical, source])
+        os.replace(tmp, self.path)
+
+    def id_of(self, name) -> int | None:
+        entry = self.entries.get(name_key(name))
+        return entry[0] if entry else None
+
+    def canonical(self, name) -> str | None:
+        entry = self.entries.get(name_key(name))
+        return entry[1] if entry else None
+
+    def add(self, name, canonical=None, source: str = "") -> int:
+        """
+        Registers name as a spelling of canonical (itself when None) and returns its id.
+        Known names keep their id, except a provisional one that now has a canonical.
+        """
+        key = name_key(name)
+        entry = self.entries.get(key)
+        if canonical is None or name_key(canonical) == key:
+            if entry is None:
+                self.entries[key] = [self.next_id, str(name) if canonical is None else canonical, source]
+                self.next_id += 1
+                self.changed += 1
+                self.journal.append((name, canonical, source))
+            return self.entries[key][0]
+
+        player_id = self.add(canonical, source=source)
+        target = self.entries[name_key(canonical)]
+        if entry is None or (entry[0] != player_id and self.is_provisional(key)):
+            self.entries[key] = [player_id, target[1], source]
+            self.changed += 1
+            self.journal.append((name, canonical, source))
+        return self.entries[key][0]
+
+    def is_provisional(self, key: str) -> bool:
+        """An unresolved runner name: its own canonical and not a results name"""
+        player_id, canonical, source = self.entries[key]
+        return source == "betfair" and name_key(canonical) == key
+
+    def add_names(self, names, source: str):
+        for name in names:
+            self.add(name, source=source)
+
+    def add_aliases(self, alias_map: dict, source: str = "alias"):
+        for alias, standard in alias_map.items():
+            self.add(alias, standard, source=source)
+
+    def merge(self, other: PlayerRegistry):
+        """
+        Replays other's changes onto this registry. Ids are assigned here, so a name
+        added by a parallel build in the meantime keeps the id that build gave it.
+        """
+        for name, canonical, source in other.journal:
+            self.add(name, canonical, source=source)
+
+    def ids(self, names: pd.Series, source: str = "betfair") -> pd.Series:
+        """Player id per name (nullable Int64); unknown names are registered first"""
+        mapping = {name: self.add(name, source=source) for name in names.dropna().unique()}
+        return names.map(mapping).astype("Int64")
+
+
+@contextmanager
+def open_registry(path: str | Path | None = PLAYER_REGISTRY_CSV):
+    """
+    Loads the registry, yields it, and saves it if names were added. Held under an
+    exclusive file lock so parallel builds assign ids without collisions; keep the
+    block short (reload, merge, assign ids) so parallel builds are not serialized.
+    Yields None when path is None (registry disabled).
+    """
+    if path is None:
+        yield None
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + ".lock"), "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            registry = PlayerRegistry(path)
+            yield registry
+            if registry.changed:
+                registry.save()
+                log_info(f"🪪 Player registry: {registry.changed} update(s), {len(registry.entries)} names → {path}")
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
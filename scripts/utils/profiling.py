@@ -0,0 +1,166 @@
+import io
+import re
+import sys
+import time
+import atexit
+import argparse
+import threading
+from pathlib import Path
+from collections import Counter
+
+from scripts.utils.paths import PERF_DIR
+from scripts.utils.logger import log_info, log_warning
+
+PROFILE_MODES = ["cprofile", "sample"]
+DEFAULT_PROFILE_TOP = 30
+SAMPLE_INTERVAL_S = 0.005
+
+# Namespace attributes naming a stage's output; the profile is written next to the first one set
+OUTPUT_ARGS = ["output_csv", "output_model", "output", "output_path", "output_dir", "store_dir"]
+
+
+def profile_base(namespace: argparse.Namespace, prog: str, mode: str) -> Path:
+    """
+    Path stem for the profile files, e.g. data/processed/x_value_bets.cprofile
+    Falls back to data/processed/perf/profiles/<script>_<timestamp>.<mode>.
+    """
+    for name in OUTPUT_ARGS:
+        value = getattr(namespace, name, None)
+        if value:
+            out = Path(value)
+            return out.with_name(f"{out.stem}.{mode}")
+    script = re.sub(r"\W+", "_", Path(prog.split()[-1]).stem)
+    return PERF_DIR / "profiles" / f"{script}_{time.strftime('%Y%m%d_%H%M%S')}.{mode}"
+
+
+class StackSampler:
+    """
+    Samples the main thread's Python stack every `interval` seconds from a daemon
+    thread. Overhead does not grow with the number of calls, so it suits long runs
+    (e.g. snapshot parsing) where cProfile's per-call cost would skew timings.
+    Like cProfile, it only sees this process: work on a process pool would show up
+    as the parent waiting, hence profiled_workers().
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL_S):
+        self.interval = interval
+        self.stacks = Counter()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def write(self, base: Path, top: int) -> list[Path]:
+        """
+        <base>.folded: one 'caller;...;callee count' line per distinct stack, most
+        frequent first (flamegraph input). <base>.txt: top functions by self and
+        inclusive samples.
+        """
+        total = sum(self.stacks.values())
+        own, inclusive = Counter(), Counter()
+        for stack, n in self.stacks.items():
+            own[stack[-1]] += n
+            for fn in set(stack):
+                inclusive[fn] += n
+
+        folded = base.with_suffix(base.suffix + ".folded")
+        with open(folded, "w", encoding="utf-8") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {n}\n")
+
+        summary = base.with_suffix(base.suffix + ".txt")
+        with open(summary, "w", encoding="utf-8") as f:
+            f.write(f"{total} samples every {self.interval * 1000:.0f} ms (~{total * self.interval:.1f}s)\n")
+            for title, counts in (("self", own), ("inclusive", inclusive)):
+                f.write(f"\nTop {top} by {title} samples:\n")
+                for fn, n in counts.most_common(top):
+                    f.write(f"{n:8d} {100 * n / max(total, 1):6.1f}%  {fn}\n")
+        return [folded, summary]
+
+
+def _write_cprofile(profiler, base: Path, top: int) -> list[Path]:
+    """
+    <base>.prof: pstats dump (sort/browse with pstats or snakeviz).
+    <base>.txt: top functions by cumulative and by internal time.
+    """
+    import pstats
+
+    dump = base.with_suffix(base.suffix + ".prof")
+    profiler.dump_stats(dump)
+    stream = io.StringIO()
+    stats = pstats.Stats(str(dump), stream=stream)
+    for sort in ("cumulative", "tottime"):
+        stream.write(f"\nTop {top} by {sort}:\n")
+        stats.sort_stats(sort).print_stats(top)
+    summary = base.with_suffix(base.suffix + ".txt")
+    summary.write_text(stream.getvalue(), encoding="utf-8")
+    return [dump, summary]
+
+
+def start_profiler(mode: str, namespace: argparse.Namespace, prog: str):
+    """
+    Profiles the rest of the process (the stage's main() after argument parsing)
+    and writes the results at exit.
+    """
+    if mode == "sample":
+        profiler = StackSampler()
+        profiler.start()
+    else:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    def finish():
+        if mode == "sample":
+            profiler.stop()
+        else:
+            profiler.disable()
+        base = profile_base(namespace, prog, mode)
+        base.parent.mkdir(parents=True, exist_ok=True)
+        top = getattr(namespace, "profile_top", DEFAULT_PROFILE_TOP)
+        if mode == "sample":
+            files = profiler.write(base, top)
+        else:
+            files = _write_cprofile(profiler, base, top)
+        log_info(f"🔬 Profile ({mode}) written to {', '.join(str(f) for f in files)}")
+
+    atexit.register(finish)
+
+
+def profiled_workers(args: argparse.Namespace) -> int:
+    """
+    --workers to use: 1 while profiling, so the parsing runs (and is profiled) in
+    this process rather than in pool workers the profiler cannot see.
+    """
+    workers = getattr(args, "workers", 1)
+    if getattr(args, "profile", None) and workers > 1:
+        log_warning(f"⚠️ --profile only sees this process; running with --workers 1 instead of {workers}")
+        return 1
+    return workers
+
+
+class ProfileAction(argparse.Action):
+    """
+    --profile [cprofile|sample]: starts the profiler as soon as the flag is parsed.
+    """
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        setattr(namespace, self.dest, values)
+        start_profiler(values, namespace, parser.prog)
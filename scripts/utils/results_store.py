@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from scripts.utils.lazy import lazy_import
+from scripts.utils.paths import RESULTS_STORE_DIR
+from scripts.utils.perf import count_read, count_write
+from scripts.utils.logger import log_info
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+joblib = lazy_import("joblib")
+
+# Bump when the stored layout changes; older stores are re-ingested
+STORE_VERSION = 1
+RESULTS_DIRS = ["data/tennis_atp", "data/tennis_wta"]
+UNDATED = 2 ** 62  # day number of undated results; sorts after every real day
+CATEGORY_COLUMNS = ["tourney_id", "tourney_name", "surface", "tourney_level", "round", "winner_hand", "loser_hand"]
+
+# Stores loaded in this process, keyed like ResultsStore.source_key
+_STORES = {}
+
+
+def day_numbers(dates: pd.Series) -> np.ndarray:
+    """Days since 1970-01-01 of each datetime (UNDATED for NaT); tz-aware dates are taken in UTC"""
+    if getattr(dates.dt, "tz", None) is not None:
+        dates = dates.dt.tz_convert(None)
+    days = dates.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]").astype(np.int64)
+    return np.where(dates.isna().to_numpy(), UNDATED, days)
+
+
+def parse_tourney_dates(dates: pd.Series) -> pd.Series:
+    """Sackmann tourney_date (YYYYMMDD number or string) as datetime64; NaT if unparseable"""
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    raw = pd.to_numeric(dates, errors="coerce").astype("Int64").astype(str)
+    return pd.to_datetime(raw, format="%Y%m%d", errors="coerce")
+
+
+def pair_keys(a: pd.Series, b: pd.Series) -> pd.Series:
+    """Order-independent key of each (a, b) player pair"""
+    a, b = a.fillna("").astype(str), b.fillna("").astype(str)
+    first = a <= b
+    return a.where(first, b) + "\x1f" + b.where(first, a)
+
+
+def source_key(source: str | Path) -> tuple:
+    """Identifies a results file version: absolute path, mtime and size"""
+    source = Path(source)
+    stat = source.stat()
+    return str(source.resolve()), stat.st_mtime_ns, stat.st_size
+
+
+def store_path(source: str | Path) -> Path:
+    source = Path(source)
+    return RESULTS_STORE_DIR / f"{source.parent.name}_{source.stem}.joblib"
+
+
+class ResultsStore:
+    """
+    One Sackmann results file, typed and indexed:
+    frame: the results in file order (tourney_date as datetime64, low-cardinality columns as category)
+    pair index: rows sorted by (unordered player pair, tourney day, file order), so a
+        pair's results are one slice: pair_bounds[code]:pair_bounds[code + 1] of pair_days/pair_rows
+    years / tourneys: year / tourney_id → row positions
+    players: sorted distinct player names
+    Everything is arrays or pandas objects, so a saved store loads in a few ms.
+    """
+
+    def __init__(self, frame: pd.DataFrame, key: tuple):
+        self.version = STORE_VERSION
+        self.source_key = key
+        self.frame = frame
+
+        codes, uniques = pd.factorize(pair_keys(frame["winner_name"], frame["loser_name"]))
+        if "tourney_date" in frame:
+            days = day_numbers(parse_tourney_dates(frame["tourney_date"]))
+        else:
+            days = np.full(len(frame), UNDATED, dtype=np.int64)
+        order = np.lexsort((np.arange(len(frame)), days, codes))
+        self.pair_index = pd.Index(uniques)
+        self.pair_bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        self.pair_days = days[order]
+        self.pair_rows = order
+
+        self.players = sorted(set(frame["winner_name"].dropna()).union(frame["loser_name"].dropna()))
+        if "tourney_date" in frame:
+            self.years = frame.groupby(frame["tourney_date"].dt.year).indices
+        else:
+            self.years = {}
+        self.tourneys = frame.groupby("tourney_id", observed=True).indices if "tourney_id" in frame else {}
+
+    def __len__(self):
+        return len(self.frame)
+
+    def year(self, year: int) -> pd.DataFrame:
+        return self.frame.iloc[self.years.get(year, [])]
+
+    def tourney(self, tourney_id: str) -> pd.DataFrame:
+        return self.frame.iloc[self.tourneys.get(tourney_id, [])]
+
+    def pair_codes(self, p1: pd.Series, p2: pd.Series) -> np.ndarray:
+        """Pair code of each (p1, p2), in either order; -1 if the pair has no results"""
+        return self.pair_index.get_indexer(pair_keys(p1, p2))
+
+    def pair_slice(self, code: int) -> tuple:
+        """(tourney days, row positions) of a pair's results, sorted by day (undated last)"""
+        start, end = self.pair_bounds[code], self.pair_bounds[code + 1]
+        return self.pair_days[start:end], self.pair_rows[start:end]
+
+    def pair(self, p1: str, p2: str) -> pd.DataFrame:
+        code = self.pair_codes(pd.Series([p1]), pd.Series([p2]))[0]
+        return self.frame.iloc[self.pair_slice(code)[1] if code >= 0 else []]
+
+
+def ingest_results(source: str | Path) -> ResultsStore:
+    """
+    Parses a results CSV into a ResultsStore and saves it next to the other stores
+    (written to a temp file and renamed, so concurrent builders never read a partial store).
+    """
+    key = source_key(source)
+    frame = pd.read_csv(source, low_memory=False)
+    count_read(source, rows=len(frame))
+    if "tourney_date" in frame:
+        frame["tourney_date"] = parse_tourney_dates(frame["tourney_date"])
+    for col in CATEGORY_COLUMNS:
+        if col in frame:
+            frame[col] = frame[col].astype("category")
+
+    store = ResultsStore(frame, key)
+    path = store_path(source)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    joblib.dump(store, tmp)
+    os.replace(tmp, path)
+    count_write(path, rows=len(frame))
+    log_info(f"🗃️ Ingested {len(frame)} results from {source} → {path}")
+    return store
+
+
+def is_fresh(source: str | Path) -> bool:
+    """True if the saved store of source matches the file's current version"""
+    path = store_path(source)
+    if not path.exists():
+        return False
+    try:
+        store = joblib.load(path)
+    except Exception:
+        return False
+    return (store.version, store.source_key) == (STORE_VERSION, source_key(source))
+
+
+def load_results(source: str | Path, rebuild: bool = False) -> ResultsStore:
+    """
+    The ResultsStore of a results CSV, loaded once per process. The saved store is
+    used while it matches the CSV (path, mtime, size); otherwise the CSV is re-ingested.
+    """
+    key = source_key(source)
+    if not rebuild and key in _STORES:
+        return _STORES[key]
+
+    store, path = None, store_path(source)
+    if path.exists() and not rebuild:
+        try:
+            store = joblib.load(path)
+        except Exception:
+            store = None
+        if store is not None and (store.version, store.source_key) != (STORE_VERSION, key):
+            store = None
+        if store is not None:
+            count_read(path, rows=len(store))
+    if store is None:
+        store = ingest_results(source)
+    _STORES[key] = store
+    return store
+
+
+def find_results_files(dirs: list[str] = RESULTS_DIRS) -> list[Path]:
+    """Sackmann match results files (*_matches_*.csv) in the results directories"""
+    return sorted(f for d in dirs for f in Path(d).glob("*_matches_*.csv"))
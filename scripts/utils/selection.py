@@ -1,18 +1,45 @@
+from __future__ import annotations
+
 from collections import defaultdict
 from difflib import get_close_matches
 
+from scripts.utils.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+
+def clean_names(names: pd.Series) -> pd.Series:
+    """Runner/player names as they are compared: lowercased and stripped"""
+    return names.astype(str).str.lower().str.strip()
+
+
+def build_runner_table(snapshots_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Distinct (market_key, runner_key, runner_name, selection_id) rows of the snapshots:
+    market_id as str and the cleaned runner name, one row per runner in a market.
+    Deduplicating first means millions of tick rows shrink to a few per market.
+    """
+    runners = snapshots_df[["market_id", "runner_name", "selection_id"]].drop_duplicates()
+    runners = pd.DataFrame({
+        "market_key": runners["market_id"].astype(str),
+        "runner_key": clean_names(runners["runner_name"]),
+        "runner_name": runners["runner_name"],
+        "selection_id": runners["selection_id"],
+    })
+    return runners.drop_duplicates(["market_key", "runner_key"], keep="last").reset_index(drop=True)
+
+
 def build_market_runner_map(snapshots_df):
     """
     Builds a map: market_id → {runner_name_clean → selection_id}
     """
     market_runner_map = defaultdict(dict)
-    for _, row in snapshots_df.iterrows():
-        market_id = str(row["market_id"])
-        runner_name = str(row["runner_name"]).lower().strip()
-        selection_id = row["selection_id"]
+    runners = build_runner_table(snapshots_df)
+    for market_id, runner_name, selection_id in zip(runners["market_key"], runners["runner_key"], runners["selection_id"]):
         market_runner_map[market_id][runner_name] = selection_id
     return market_runner_map
 
+
 def match_player_to_selection_id(market_runner_map, market_id, player_name, cutoff=0.8):
     """
     Fuzzy matches a player_name to a runner name for a given market.
@@ -24,3 +51,53 @@ def match_player_to_selection_id(market_runner_map, market_id, player_name, cuto
     if match:
         return market_runner_map[str(market_id)].get(match[0])
     return None
+
+
+def match_players_to_selection_ids(
+    df_matches: pd.DataFrame,
+    runners: pd.DataFrame,
+    player_col: str,
+    id_col: str | None = None,
+    cutoff: float = 0.8,
+    fuzzy_cache: dict | None = None,
+) -> pd.Series:
+    """
+    Selection id of each match's player_col within its market (aligned to df_matches):
+    1. exact join on (market, cleaned name)
+    2. join on (market, player id) when id_col is set and runners has a player_id column
+    3. difflib on the remaining rows only, memoized in fuzzy_cache (market → {name → id})
+    """
+    keys = pd.DataFrame({
+        "market_key": df_matches["market_id"].astype(str).to_numpy(),
+        "runner_key": clean_names(df_matches[player_col]).to_numpy(),
+    })
+    matched = keys.merge(
+        runners[["market_key", "runner_key", "selection_id"]], on=["market_key", "runner_key"], how="left"
+    )["selection_id"]
+
+    if id_col is not None and "player_id" in runners and id_col in df_matches:
+        missing = matched.isna().to_numpy()
+        by_id = runners.dropna(subset=["player_id"])
+        # Two runners of one market resolving to one player are ambiguous
+        by_id = by_id.drop_duplicates(["market_key", "player_id"], keep=False)
+        ids = keys.loc[missing, ["market_key"]].assign(player_id=df_matches[id_col].to_numpy()[missing])
+        found = ids.merge(by_id[["market_key", "player_id", "selection_id"]], on=["market_key", "player_id"], how="left")
+        matched[missing] = found["selection_id"].to_numpy()
+
+    missing = matched.isna().to_numpy()
+    if missing.any():
+        fuzzy_cache = {} if fuzzy_cache is None else fuzzy_cache
+        residue = keys[missing]
+        candidates = {
+            market: dict(zip(group["runner_key"], group["selection_id"]))
+            for market, group in runners[runners["market_key"].isin(residue["market_key"])].groupby("market_key")
+        }
+        found = []
+        for market, name in zip(residue["market_key"], residue["runner_key"]):
+            cache = fuzzy_cache.setdefault(market, {})
+            if name not in cache:
+                cache[name] = match_player_to_selection_id(candidates, market, name, cutoff)
+            found.append(cache[name])
+        matched[missing] = pd.Series(found, dtype="float64").to_numpy()
+
+    return matched.set_axis(df_matches.index)
@@ -1,9 +1,12 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+from __future__ import annotations
+
 from tqdm import tqdm
 
+from scripts.utils.lazy import lazy_import
 from scripts.utils.betting_math import compute_kelly_stake_capped
 
+pd = lazy_import("pandas")
+
 def simulate_bankroll(
     df: pd.DataFrame,
     strategy: str = "kelly",
@@ -63,7 +66,8 @@ def simulate_bankroll(
             "bankroll": bankroll
         })
 
-    return pd.DataFrame(history), bankroll, max_drawdown
+    columns = ["match_id", "stake", "odds", "won", "payout", "bankroll"]
+    return pd.DataFrame(history, columns=columns), bankroll, max_drawdown
 
 def generate_bankroll_plot(bankroll_series: pd.Series, output_path: str = None):
     """
@@ -73,6 +77,8 @@ def generate_bankroll_plot(bankroll_series: pd.Series, output_path: str = None):
         print("⚠️ No bankroll data to plot.")
         return
 
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(10, 5))
     plt.plot(bankroll_series, color="blue")
     plt.xlabel("Bet Number")
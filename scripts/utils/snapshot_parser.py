@@ -1,15 +1,52 @@
 import bz2
 import json
-import pandas as pd
+import re
+import time
 from pathlib import Path
+from itertools import islice
+from collections import deque
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm  # ✅ Progress bar added
-from scripts.utils.logger import log_error
+from scripts.utils.lazy import lazy_import
+from scripts.utils.logger import log_error, log_info
+from scripts.utils.manifest import SnapshotManifest
+from scripts.utils.perf import count_read
+
+pd = lazy_import("pandas")
+
+try:
+    import orjson  # optional, several times faster than stdlib json
+    _json_loads = orjson.loads
+    _BINARY_LINES = True
+except ImportError:
+    # stdlib json decodes str faster than bytes, so let the text layer decode whole blocks
+    _json_loads = json.loads
+    _BINARY_LINES = False
+
+# Cheap byte-level markers checked before a line is decoded.
+# Every market change message carries '"mcm"'; lines without it (heartbeats, status) are skipped.
+MCM_MARKER = b'"mcm"'
+MODE_MARKERS = {
+    "metadata": (b"MATCH_ODDS",),
+    "ltp_only": (b'"rc"',),
+    "full": (b"MATCH_ODDS", b'"rc"'),
+    "final": (b"MATCH_ODDS", b'"rc"'),
+}
+# Files submitted ahead per pool worker; bounds parsed-but-unconsumed rows
+PENDING_PER_WORKER = 2
 
 
 class SnapshotParser:
-    def __init__(self, mode="full"):
+    def __init__(self, mode="full", pre_off=False, runner_rows=False):
+        """
+        runner_rows=True adds one row without an ltp per runner of each MATCH_ODDS
+        market definition (full and final modes), so the normalized layout lists
+        runners that never traded.
+        """
         self.mode = mode
+        self.pre_off = pre_off
+        self.runner_rows = runner_rows
 
     def should_parse_file(self, file_path, start_date, end_date):
         try:
@@ -26,20 +63,41 @@ class SnapshotParser:
                 return self._parse_metadata(file_path)
             elif self.mode == "ltp_only":
                 return self._parse_ltp_only(file_path)
+            elif self.mode == "final":
+                return self._parse_final(file_path)
             else:
                 return self._parse_full(file_path)
         except Exception as e:
             log_error(f"❌ Failed: {file_path} — {e}")
             return []
 
-    def _read_lines(self, file_path):
+    def iter_messages(self, file_path, markers=()):
+        """
+        Yields decoded stream messages from a snapshot file.
+        Only market change messages containing at least one of the given byte
+        markers are decoded (all mcm lines if none given); the rest are skipped
+        with a substring check.
+        """
         open_func = bz2.open if file_path.suffix == ".bz2" else open
-        with open_func(file_path, "rt", encoding="utf-8") as f:
+        mcm = MCM_MARKER
+        pattern = b"|".join(re.escape(m) for m in markers)
+        if _BINARY_LINES:
+            read_kwargs = {"mode": "rb"}
+        else:
+            read_kwargs = {"mode": "rt", "encoding": "utf-8"}
+            mcm, pattern = mcm.decode(), pattern.decode()
+        search = re.compile(pattern).search if markers else None
+
+        with open_func(file_path, **read_kwargs) as f:
             for line in f:
-                yield json.loads(line)
+                if mcm not in line:
+                    continue
+                if search is not None and search(line) is None:
+                    continue
+                yield _json_loads(line)
 
     def _parse_metadata(self, file_path):
-        for data in self._read_lines(file_path):
+        for data in self.iter_messages(file_path, MODE_MARKERS["metadata"]):
             if data.get("op") != "mcm":
                 continue
             for mc in data.get("mc", []):
@@ -57,7 +115,7 @@ class SnapshotParser:
 
     def _parse_ltp_only(self, file_path):
         records = []
-        for data in self._read_lines(file_path):
+        for data in self.iter_messages(file_path, MODE_MARKERS["ltp_only"]):
             if data.get("op") != "mcm":
                 continue
             pt = data.get("pt")
@@ -72,74 +130,242 @@ class SnapshotParser:
                     })
         return records
 
+    @staticmethod
+    def _market_state(md: dict):
+        """
+        Caches the fields of a MATCH_ODDS definition needed to label ticks.
+        Returns None for markets that should not produce rows.
+        """
+        if md.get("marketType") != "MATCH_ODDS":
+            return None
+        runners = md.get("runners", [])
+        if len(runners) != 2:
+            return None
+        return {
+            "market_time": md.get("marketTime"),
+            "market_name": md.get("name", ""),
+            "runner_1": runners[0]["name"],
+            "runner_2": runners[1]["name"],
+            "names": {r["id"]: r["name"] for r in runners},
+        }
+
+    @classmethod
+    def _describe(cls, markets: dict, mid, md: dict, pt) -> bool:
+        """
+        Caches a market definition, carrying over in_play_time: the pt of the first
+        definition with inPlay set. Returns True when the market is first described.
+        """
+        prev = markets.get(mid)
+        state = cls._market_state(md)
+        if state is not None:
+            state["in_play_time"] = prev["in_play_time"] if prev else None
+            if md.get("inPlay") and state["in_play_time"] is None:
+                state["in_play_time"] = pt
+        markets[mid] = state
+        return prev is None and state is not None
+
+    @staticmethod
+    def _definition_rows(mid, state: dict) -> list[dict]:
+        """
+        One row without an ltp per runner of a cached market definition.
+        """
+        return [
+            {
+                "market_id": mid,
+                "selection_id": sel_id,
+                "ltp": None,
+                "timestamp": None,
+                "market_time": state["market_time"],
+                "market_name": state["market_name"],
+                "runner_name": name,
+                "runner_1": state["runner_1"],
+                "runner_2": state["runner_2"],
+                "in_play_time": state["in_play_time"]
+            }
+            for sel_id, name in state["names"].items()
+        ]
+
     def _parse_full(self, file_path):
+        """
+        Replays the stream against a per-market state machine.
+        Definitions are only sent when they change, so the latest one is cached per
+        market and every subsequent rc delta is labelled from that cache. Rows
+        recorded after the market turned in-play carry its in_play_time.
+        """
         records = []
-        for data in self._read_lines(file_path):
+        markets = {}
+        for data in self.iter_messages(file_path, MODE_MARKERS["full"]):
             if data.get("op") != "mcm":
                 continue
             pt = data.get("pt")
             for mc in data.get("mc", []):
                 mid = mc.get("id")
-                md = mc.get("marketDefinition", {})
-                if md.get("marketType") != "MATCH_ODDS":
-                    continue
-                runners = md.get("runners", [])
-                if len(runners) != 2:
-                    continue
+                md = mc.get("marketDefinition")
+                if md is not None and self._describe(markets, mid, md, pt) and self.runner_rows:
+                    records.extend(self._definition_rows(mid, markets[mid]))
 
-                r1, r2 = runners[0]["name"], runners[1]["name"]
-                s1, s2 = runners[0]["id"], runners[1]["id"]
-                market_time = md.get("marketTime")
-                market_name = md.get("name", "")
-
-                records.append({
-                    "market_id": mid,
-                    "selection_id": s1,
-                    "ltp": None,
-                    "timestamp": pt,
-                    "market_time": market_time,
-                    "market_name": market_name,
-                    "runner_name": r1,
-                    "runner_1": r1,
-                    "runner_2": r2
-                })
-                records.append({
-                    "market_id": mid,
-                    "selection_id": s2,
-                    "ltp": None,
-                    "timestamp": pt,
-                    "market_time": market_time,
-                    "market_name": market_name,
-                    "runner_name": r2,
-                    "runner_1": r1,
-                    "runner_2": r2
-                })
+                state = markets.get(mid)
+                if state is None:
+                    continue
 
+                names = state["names"]
                 for rc in mc.get("rc", []):
-                    sel_id = rc.get("id")
                     ltp = rc.get("ltp")
-                    name = next((r["name"] for r in runners if r["id"] == sel_id), None)
+                    if ltp is None:
+                        continue
+                    sel_id = rc.get("id")
                     records.append({
                         "market_id": mid,
                         "selection_id": sel_id,
                         "ltp": ltp,
                         "timestamp": pt,
-                        "market_time": market_time,
-                        "market_name": market_name,
-                        "runner_name": name,
-                        "runner_1": r1,
-                        "runner_2": r2
+                        "market_time": state["market_time"],
+                        "market_name": state["market_name"],
+                        "runner_name": names.get(sel_id),
+                        "runner_1": state["runner_1"],
+                        "runner_2": state["runner_2"],
+                        "in_play_time": state["in_play_time"]
                     })
         return records
 
-    def parse_directory(self, input_dir: str, start: datetime, end: datetime) -> list[dict]:
+    def _parse_final(self, file_path):
         """
-        Parses all snapshot files in a directory within the given date range, with progress bar.
+        Same replay as _parse_full, but only the latest LTP per (market, selection)
+        is kept, so memory and output scale with markets rather than ticks.
+        With pre_off=True a market stops updating once its definition flips to
+        inPlay, and reading stops as soon as every market in the file is in play.
         """
+        markets = {}
+        latest = {}
+        in_play = set()
+        for data in self.iter_messages(file_path, MODE_MARKERS["final"]):
+            if data.get("op") != "mcm":
+                continue
+            pt = data.get("pt")
+            for mc in data.get("mc", []):
+                mid = mc.get("id")
+                md = mc.get("marketDefinition")
+                if md is not None:
+                    self._describe(markets, mid, md, pt)
+                    if self.pre_off and md.get("inPlay"):
+                        in_play.add(mid)
+
+                if mid in in_play or markets.get(mid) is None:
+                    continue
+                for rc in mc.get("rc", []):
+                    ltp = rc.get("ltp")
+                    if ltp is not None:
+                        latest[(mid, rc.get("id"))] = (ltp, pt)
+
+            if self.pre_off and markets and in_play.issuperset(markets):
+                break
+
+        records = []
+        if self.runner_rows:
+            for mid, state in markets.items():
+                if state is not None:
+                    records.extend(self._definition_rows(mid, state))
+        for (mid, sel_id), (ltp, pt) in latest.items():
+            state = markets[mid]
+            if state is None:
+                continue
+            records.append({
+                "market_id": mid,
+                "selection_id": sel_id,
+                "ltp": ltp,
+                "timestamp": pt,
+                "market_time": state["market_time"],
+                "market_name": state["market_name"],
+                "runner_name": state["names"].get(sel_id),
+                "runner_1": state["runner_1"],
+                "runner_2": state["runner_2"],
+                "in_play_time": state["in_play_time"]
+            })
+        return records
+
+    def list_files(self, input_dir: str, start: datetime, end: datetime, use_manifest: bool = True) -> list[Path]:
+        """
+        Returns the snapshot files under input_dir within the date range, in sorted order.
+        Uses the persisted SnapshotManifest by default, refreshed for the range by
+        directory mtimes so new days and events are picked up; use_manifest=False
+        falls back to a full rglob of the directory.
+        """
+        if use_manifest:
+            return SnapshotManifest(input_dir).query(start, end, refresh=True)
         input_path = Path(input_dir)
         all_files = list(input_path.rglob("*.bz2"))
-        filtered = [f for f in all_files if self.should_parse_file(f, start, end)]
+        return sorted(f for f in all_files if self.should_parse_file(f, start, end))
+
+    def iter_file_rows(self, files: list[Path], workers: int = 1):
+        """
+        Yields (file_path, rows) per file in file order, optionally using a process pool.
+        Logs overall throughput once all files are consumed.
+        """
+        total_bytes = sum(f.stat().st_size for f in files)
+        log_info(f"🔍 Found {len(files)} .bz2 files in range")
+
+        t0 = time.perf_counter()
+        parsed = 0
+        if workers > 1 and len(files) > 1:
+            # At most workers * PENDING_PER_WORKER files are in flight, so parsed rows
+            # never pile up in the parent faster than the consumer drains them
+            window = workers * PENDING_PER_WORKER
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                remaining = iter(files)
+                for f in islice(remaining, window):
+                    pending.append((f, pool.submit(self.parse_file, f)))
+                with tqdm(total=len(files), desc="Parsing snapshots", unit="file") as progress:
+                    while pending:
+                        f, future = pending.popleft()
+                        for nxt in islice(remaining, 1):
+                            pending.append((nxt, pool.submit(self.parse_file, nxt)))
+                        file_rows = future.result()
+                        progress.update()
+                        parsed += len(file_rows)
+                        yield f, file_rows
+        else:
+            for f in tqdm(files, desc="Parsing snapshots", unit="file"):
+                file_rows = self.parse_file(f)
+                parsed += len(file_rows)
+                yield f, file_rows
+        elapsed = max(time.perf_counter() - t0, 1e-9)
+        count_read(rows=parsed, nbytes=total_bytes)
+
+        log_info(
+            f"⏱️ Parsed {len(files)} files ({total_bytes / 1e6:.1f} MB) in {elapsed:.2f}s with {max(workers, 1)} worker(s) — "
+            f"{len(files) / elapsed:.1f} files/sec, {total_bytes / 1e6 / elapsed:.2f} MB/sec"
+        )
+
+    def parse_directory(self, input_dir: str, start: datetime, end: datetime, workers: int = 1) -> list[dict]:
+        """
+        Parses all snapshot files in a directory within the given date range, with progress bar.
+        With workers > 1, files are fanned out to a process pool; rows are still
+        merged in file order so the output is identical to a serial run.
+        """
         rows = []
-        for f in tqdm(filtered, desc="Parsing snapshots", unit="file"):
-            rows.extend(self.parse_file(f))
+        for _, file_rows in self.iter_file_rows(self.list_files(input_dir, start, end), workers=workers):
+            rows.extend(file_rows)
         return rows
+
+    def iter_directory(
+        self,
+        input_dir: str,
+        start: datetime,
+        end: datetime,
+        workers: int = 1,
+        batch_size: int = 100_000
+    ):
+        """
+        Streaming variant of parse_directory.
+        Yields DataFrame chunks of roughly batch_size rows, so memory is bounded
+        by the batch (plus the files in flight on the pool) rather than by the date range.
+        """
+        batch = []
+        for _, file_rows in self.iter_file_rows(self.list_files(input_dir, start, end), workers=workers):
+            batch.extend(file_rows)
+            if len(batch) >= batch_size:
+                yield pd.DataFrame.from_records(batch)
+                batch = []
+        if batch:
+            yield pd.DataFrame.from_records(batch)
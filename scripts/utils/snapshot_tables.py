@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from scripts.utils.lazy import lazy_import
+from scripts.utils.table_io import read_table, TableAppender
+
+pd = lazy_import("pandas")
+
+# in_play_time: pt of the first definition with inPlay set (empty if the market never went in-play)
+MARKET_COLUMNS = ["market_id", "market_time", "market_name", "runner_1", "runner_2", "in_play_time"]
+RUNNER_COLUMNS = ["market_id", "selection_id", "runner_name"]
+TICK_COLUMNS = ["market_id", "selection_id", "pt", "ltp"]
+SNAPSHOT_COLUMNS = [
+    "market_id", "selection_id", "ltp", "timestamp", "market_time",
+    "market_name", "runner_name", "runner_1", "runner_2", "in_play_time",
+]
+
+
+def get_snapshot_table_paths(snapshot_csv: str | Path) -> dict:
+    """
+    Normalized table paths for a snapshot file,
+    e.g. betfair_x_snapshots.csv → betfair_x_snapshots_{markets,runners,ticks}.csv
+    """
+    path = Path(snapshot_csv)
+    return {
+        name: path.with_name(f"{path.stem}_{name}{path.suffix}")
+        for name in ("markets", "runners", "ticks")
+    }
+
+
+def has_snapshot_tables(snapshot_csv: str | Path) -> bool:
+    return all(p.exists() for p in get_snapshot_table_paths(snapshot_csv).values())
+
+
+def snapshots_exist(snapshot_csv: str | Path) -> bool:
+    """
+    True if either the denormalized snapshot file or its normalized tables exist.
+    """
+    return Path(snapshot_csv).exists() or has_snapshot_tables(snapshot_csv)
+
+
+def assert_snapshots_exist(snapshot_csv: str | Path, name: str = "snapshots_csv"):
+    if not snapshots_exist(snapshot_csv):
+        raise FileNotFoundError(f"❌ {name} not found: {snapshot_csv} (or its _markets/_runners/_ticks tables)")
+
+
+def snapshot_frame(records: list[dict]) -> pd.DataFrame:
+    """
+    DataFrame from parser rows. in_play_time is a nullable integer, so chunks where
+    no market has gone in-play yet keep the same type (and parquet schema) as the rest.
+    """
+    df = pd.DataFrame.from_records(records)
+    if "in_play_time" in df:
+        df["in_play_time"] = df["in_play_time"].astype("Int64")
+    return df
+
+
+def split_snapshot_rows(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Splits denormalized parser rows into (markets, runners, ticks).
+    Rows without an ltp (the parser's runner_rows) only feed the markets and
+    runners tables, so runners that never traded are still listed.
+    A market's in_play_time is taken from any of its rows, since only rows
+    recorded after the transition carry it.
+    """
+    markets = df[MARKET_COLUMNS].drop_duplicates(subset=["market_id"])
+    markets = markets.assign(in_play_time=markets["market_id"].map(df.groupby("market_id")["in_play_time"].min()))
+    runners = df[RUNNER_COLUMNS].dropna(subset=["selection_id"]).drop_duplicates(subset=["market_id", "selection_id"])
+    ticks = df.rename(columns={"timestamp": "pt"})[TICK_COLUMNS].dropna(subset=["ltp"])
+    return markets, runners, ticks
+
+
+class NormalizedSnapshotWriter:
+    """
+    Streams parser chunks into markets/runners/ticks tables.
+    Runners are written once (first occurrence), ticks are appended as-is.
+    Markets are held until close(), so a market's in_play_time can still be filled
+    in by a later chunk.
+    Chunks should come from a SnapshotParser(runner_rows=True), so every runner of a
+    market definition gets a runners row whether or not it traded.
+    """
+
+    def __init__(self, snapshot_csv: str | Path):
+        self.paths = get_snapshot_table_paths(snapshot_csv)
+        self.markets = {}
+        self.seen_runners = set()
+        self.appenders = {name: TableAppender(path) for name, path in self.paths.items()}
+
+    @property
+    def counts(self) -> dict:
+        return {name: appender.rows for name, appender in self.appenders.items()}
+
+    def close(self):
+        if self.markets is not None:
+            markets = pd.DataFrame(list(self.markets.values()), columns=MARKET_COLUMNS)
+            self._append("markets", markets.astype({"in_play_time": "Int64"}))
+            self.markets = None
+        for appender in self.appenders.values():
+            appender.close()
+
+    def _append(self, name: str, df: pd.DataFrame):
+        appender = self.appenders[name]
+        if df.empty and appender.columns is not None:
+            return
+        appender.append(df)
+
+    def write(self, chunk: pd.DataFrame):
+        markets, runners, ticks = split_snapshot_rows(chunk)
+
+        for row in markets.to_dict("records"):
+            known = self.markets.setdefault(row["market_id"], row)
+            if pd.isna(known["in_play_time"]):
+                known["in_play_time"] = row["in_play_time"]
+
+        runner_keys = list(zip(runners["market_id"], runners["selection_id"]))
+        new = [k not in self.seen_runners for k in runner_keys]
+        runners = runners[new]
+        self.seen_runners.update(k for k, is_new in zip(runner_keys, new) if is_new)
+
+        self._append("runners", runners.astype({"selection_id": "int64"}))
+        self._append("ticks", ticks.astype({"selection_id": "int64", "pt": "int64"}))
+        return len(ticks)
+
+
+def load_snapshot_tables(snapshot_csv: str | Path, tick_columns: list[str] | None = None) -> dict:
+    """
+    Reads the normalized tables for a snapshot file.
+    """
+    paths = get_snapshot_table_paths(snapshot_csv)
+    return {
+        "markets": read_table(paths["markets"]),
+        "runners": read_table(paths["runners"]),
+        "ticks": read_table(paths["ticks"], columns=tick_columns),
+    }
+
+
+def read_snapshots(snapshot_csv: str | Path, columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    Reads snapshot rows in the legacy denormalized shape from either layout.
+    With normalized tables, only the tables needed for the requested columns are
+    read and joined on (market_id, selection_id).
+    """
+    if Path(snapshot_csv).exists():
+        return read_table(snapshot_csv, columns=columns)
+
+    assert_snapshots_exist(snapshot_csv)
+    wanted = columns or SNAPSHOT_COLUMNS
+    paths = get_snapshot_table_paths(snapshot_csv)
+
+    tick_cols = [c for c in ("ltp", "timestamp") if c in wanted]
+    market_cols = [c for c in MARKET_COLUMNS[1:] if c in wanted]
+    need_runners = "runner_name" in wanted
+
+    if tick_cols:
+        df = read_table(paths["ticks"], columns=["market_id", "selection_id"] + [
+            "pt" if c == "timestamp" else c for c in tick_cols
+        ]).rename(columns={"pt": "timestamp"})
+    else:
+        df = read_table(paths["runners"], columns=["market_id", "selection_id"])
+    if need_runners:
+        runners = read_table(paths["runners"])
+        df = df.merge(runners, on=["market_id", "selection_id"], how="left")
+    if market_cols:
+        markets = read_table(paths["markets"], columns=["market_id"] + market_cols)
+        df = df.merge(markets, on="market_id", how="left")
+    return df[[c for c in SNAPSHOT_COLUMNS if c in wanted]]
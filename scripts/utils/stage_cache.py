@@ -0,0 +1,145 @@
+import re
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+from scripts.utils.paths import PROCESSED_DIR
+from scripts.utils.snapshot_tables import get_snapshot_table_paths, has_snapshot_tables
+
+DEFAULT_CACHE_PATH = PROCESSED_DIR / ".stage_cache.json"
+CACHE_VERSION = 1
+
+# Flags that change how a stage runs, not what it produces
+IGNORED_FLAGS = {"--overwrite", "--dry_run"}
+
+_IMPORT_RE = re.compile(r"^\s*(?:from|import)\s+(scripts(?:\.\w+)+)", re.MULTILINE)
+
+
+def _module_file(module: str) -> Path | None:
+    base = Path(*module.split("."))
+    for candidate in (base.with_suffix(".py"), base / "__init__.py"):
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def source_files(script: str | Path) -> list[Path]:
+    """
+    The stage script plus every scripts.* module it imports, transitively.
+    Editing any of them changes the stage's code version.
+    """
+    seen, todo = set(), [Path(script)]
+    while todo:
+        path = todo.pop()
+        if path in seen or not path.exists():
+            continue
+        seen.add(path)
+        for module in _IMPORT_RE.findall(path.read_text(encoding="utf-8")):
+            found = _module_file(module)
+            if found:
+                todo.append(found)
+    return sorted(seen)
+
+
+def _arg_paths(args: list[str], exclude: Path | None = None) -> list[Path]:
+    """
+    Existing files and directories named in a stage's argument list,
+    skipping the stage's own output. A snapshot path stored as normalized
+    tables (--layout tables) stands for its _markets/_runners/_ticks files.
+    """
+    paths = []
+    for a in args:
+        if a.startswith("-"):
+            continue
+        p = Path(a)
+        if exclude is not None and p == exclude:
+            continue
+        if p.is_file():
+            paths.append(p)
+        elif p.is_dir():
+            paths.extend(sorted(f for f in p.rglob("*") if f.is_file()))
+        elif has_snapshot_tables(p):
+            paths.extend(get_snapshot_table_paths(p).values())
+    return paths
+
+
+class StageCache:
+    """
+    Fingerprints of completed pipeline stages, persisted as JSON.
+
+    A stage's fingerprint hashes its code version (script + imported scripts.* modules),
+    its arguments and the content of every input file. A stage whose fingerprint and
+    output are unchanged since its last successful run can be skipped. Content hashes
+    are memoized by (size, mtime) so unchanged inputs are not re-read on every run.
+    Safe to share between the scheduler's worker threads.
+    """
+
+    def __init__(self, cache_path: str | Path = DEFAULT_CACHE_PATH):
+        self.cache_path = Path(cache_path)
+        data = {}
+        if self.cache_path.exists():
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        if data.get("version") != CACHE_VERSION:
+            data = {}
+        self.stages = data.get("stages", {})
+        self.files = data.get("files", {})
+        self._lock = threading.RLock()
+
+    def save(self):
+        with self._lock:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "stages": self.stages, "files": self.files}, f, indent=1, sort_keys=True)
+            tmp.replace(self.cache_path)
+
+    def file_hash(self, path: Path) -> str:
+        stat = path.stat()
+        key = str(path)
+        entry = self.files.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            return entry["sha256"]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        with self._lock:
+            self.files[key] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": h.hexdigest()}
+        return h.hexdigest()
+
+    def fingerprint(self, script: str | Path, args: list[str], output: str | Path, inputs: list[str | Path] = ()) -> str:
+        """
+        Hash of the stage code, its arguments and its inputs. Inputs are the files
+        named in args (other than output) plus any extra paths, e.g. files
+        referenced from a tournaments config.
+        """
+        args = [a for a in args if a not in IGNORED_FLAGS]
+        h = hashlib.sha256()
+        for src in source_files(script):
+            h.update(f"src:{src}:{self.file_hash(src)}\n".encode())
+        h.update(("args:" + "\x00".join(args) + "\n").encode())
+        output = Path(output)
+        files = _arg_paths(args, output) + _arg_paths([str(p) for p in inputs], output)
+        for path in sorted(set(files)):
+            h.update(f"in:{path}:{self.file_hash(path)}\n".encode())
+        return h.hexdigest()
+
+    def is_fresh(self, key: str, fingerprint: str, output: str | Path) -> bool:
+        entry = self.stages.get(key)
+        return bool(entry) and entry["fingerprint"] == fingerprint and Path(output).exists()
+
+    def invalidate(self, keys: list[str]):
+        """
+        Forgets stages whose output was rewritten outside the cache (e.g. in-process runs).
+        """
+        with self._lock:
+            dropped = [k for k in keys if self.stages.pop(k, None) is not None]
+            if dropped:
+                self.save()
+
+    def record(self, key: str, fingerprint: str, output: str | Path):
+        with self._lock:
+            self.stages[key] = {"fingerprint": fingerprint, "output": str(output)}
+            self.save()
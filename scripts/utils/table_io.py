@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from scripts.utils.lazy import lazy_import
+from scripts.utils.perf import count_read, count_write
+
+pd = lazy_import("pandas")
+
+# Storage format → file suffix. CSV stays the default for compatibility;
+# parquet/feather are typed, columnar and need pyarrow.
+TABLE_FORMATS = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+    "feather": ".feather",
+}
+DEFAULT_TABLE_FORMAT = "csv"
+
+
+def table_format(path: str | Path) -> str:
+    """
+    Infers the storage format from a file suffix (unknown suffixes are read as CSV).
+    """
+    suffix = Path(path).suffix.lower()
+    for fmt, ext in TABLE_FORMATS.items():
+        if suffix == ext:
+            return fmt
+    return "csv"
+
+
+def with_format(path: str | Path, fmt: str | None) -> Path:
+    """
+    Returns path with the suffix of the given format, e.g. x_features.csv → x_features.parquet
+    """
+    path = Path(path)
+    if not fmt:
+        return path
+    if fmt not in TABLE_FORMATS:
+        raise ValueError(f"❌ Unknown table format: {fmt} (choose from {', '.join(TABLE_FORMATS)})")
+    return path.with_suffix(TABLE_FORMATS[fmt])
+
+
+def _require_pyarrow(fmt: str):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError(f"❌ {fmt} tables require pyarrow — pip install pyarrow, or use the csv format")
+
+
+def read_table(path: str | Path, columns: list[str] | None = None, **kwargs) -> pd.DataFrame:
+    """
+    Reads a table in the format implied by its suffix.
+    columns projects on read: usecols for CSV, column pruning for parquet/feather.
+    """
+    fmt = table_format(path)
+    if fmt == "csv":
+        df = pd.read_csv(path, usecols=columns, **kwargs)
+    else:
+        _require_pyarrow(fmt)
+        if fmt == "parquet":
+            df = pd.read_parquet(path, columns=columns, **kwargs)
+        else:
+            df = pd.read_feather(path, columns=columns, **kwargs)
+    count_read(path, len(df))
+    return df
+
+
+def write_table(df: pd.DataFrame, path: str | Path, **kwargs):
+    """
+    Writes a table in the format implied by its suffix, creating the parent directory.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fmt = table_format(path)
+    if fmt == "csv":
+        df.to_csv(path, index=False, **kwargs)
+    else:
+        _require_pyarrow(fmt)
+        df = df.reset_index(drop=True)
+        if fmt == "parquet":
+            df.to_parquet(path, index=False, **kwargs)
+        else:
+            df.to_feather(path, **kwargs)
+    count_write(path, len(df))
+
+
+class TableAppender:
+    """
+    Appends DataFrame chunks to one table file as they arrive.
+    CSV chunks are appended after a single header; parquet chunks become row
+    groups of one file. Later chunks are aligned to the first chunk's columns.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.format = table_format(self.path)
+        if self.format == "feather":
+            raise ValueError("❌ feather files cannot be appended to; use csv or parquet for streamed output")
+        self.columns = None
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+        self._counted = False
+
+    def append(self, df: pd.DataFrame):
+        if self.columns is None:
+            self.columns = list(df.columns)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        else:
+            df = df.reindex(columns=self.columns)
+
+        if self.format == "csv":
+            df.to_csv(self.path, mode="a" if self.rows else "w", header=not self.rows, index=False)
+        else:
+            _require_pyarrow(self.format)
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._schema = table.schema
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            else:
+                table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self.rows and not self._counted:
+            count_write(self.path, self.rows)
+            self._counted = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from scripts.utils.lazy import lazy_import
+from scripts.utils.horizons import to_utc
+from scripts.utils.perf import count_read, count_write
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# One .npy file per column, all sorted by (market_id, selection_id, pt)
+TICK_ARRAYS = {
+    "pt": "int64",
+    "selection_id": "int64",
+    "ltp": "float64",
+}
+INDEX_FILE = "index.csv"
+
+
+def _key(market_id) -> str:
+    return str(market_id)
+
+
+def _to_epoch_ms(values: pd.Series) -> np.ndarray:
+    """
+    Tick timestamps as epoch milliseconds. Parser 'pt' values pass through.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype="int64")
+    return ((to_utc(values) - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(milliseconds=1)).to_numpy(dtype="int64")
+
+
+class TickStore:
+    """
+    Binary LTP tick store opened with np.load(mmap_mode="r").
+
+    Layout of a store directory:
+        pt.npy, selection_id.npy, ltp.npy   contiguous columns sorted by (market, selection, pt)
+        index.csv                           market_id, market_time, in_play_time, offset, length
+
+    A market's ticks are rows [offset, offset + length) of every column, so
+    market() returns zero-copy slices of the memory-mapped arrays and only the
+    pages actually touched are read from disk.
+    """
+
+    def __init__(self, store_dir: str | Path):
+        self.store_dir = Path(store_dir)
+        index_path = self.store_dir / INDEX_FILE
+        if not index_path.exists():
+            raise FileNotFoundError(f"❌ Tick store not found: {self.store_dir} (build it with build_tick_store.py)")
+
+        self.index = pd.read_csv(index_path, dtype={"market_id": str, "market_time": str})
+        self._slices = {
+            m: (o, o + n) for m, o, n in zip(self.index["market_id"], self.index["offset"], self.index["length"])
+        }
+        self.arrays = {
+            name: np.load(self.store_dir / f"{name}.npy", mmap_mode="r") for name in TICK_ARRAYS
+        }
+
+    @classmethod
+    def build(cls, ticks: pd.DataFrame, store_dir: str | Path) -> "TickStore":
+        """
+        Writes a store from SnapshotParser rows (market_id, selection_id, timestamp, ltp
+        and optionally market_time and in_play_time). Rows without an LTP are dropped.
+        """
+        store_dir = Path(store_dir)
+        store_dir.mkdir(parents=True, exist_ok=True)
+
+        ticks = ticks.dropna(subset=["ltp", "selection_id"])
+        df = pd.DataFrame({
+            "market_id": ticks["market_id"].map(_key).values,
+            "selection_id": ticks["selection_id"].to_numpy(dtype="int64"),
+            "pt": _to_epoch_ms(ticks["timestamp"]),
+            "ltp": ticks["ltp"].to_numpy(dtype="float64"),
+            "market_time": ticks["market_time"].values if "market_time" in ticks else "",
+        }).sort_values(["market_id", "selection_id", "pt"], kind="stable")
+
+        for name, dtype in TICK_ARRAYS.items():
+            np.save(store_dir / f"{name}.npy", df[name].to_numpy(dtype=dtype))
+
+        markets = df["market_id"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, markets[1:] != markets[:-1]]) if len(df) else np.array([], dtype="int64")
+        in_play = (
+            ticks.dropna(subset=["in_play_time"]).groupby(ticks["market_id"].map(_key))["in_play_time"].min()
+            if "in_play_time" in ticks else pd.Series(dtype="int64")
+        )
+        index = pd.DataFrame({
+            "market_id": markets[starts],
+            "market_time": df["market_time"].to_numpy()[starts],
+            "in_play_time": pd.Series(markets[starts]).map(in_play).astype("Int64"),
+            "offset": starts,
+            "length": np.diff(np.r_[starts, len(df)]),
+        })
+        index.to_csv(store_dir / INDEX_FILE, index=False)
+        count_write(store_dir, len(df))
+        return cls(store_dir)
+
+    def __len__(self) -> int:
+        return len(self._slices)
+
+    def __contains__(self, market_id) -> bool:
+        return _key(market_id) in self._slices
+
+    @property
+    def market_ids(self) -> list[str]:
+        return list(self._slices)
+
+    def market(self, market_id) -> dict:
+        """
+        Zero-copy views of one market's pt / selection_id / ltp arrays.
+        """
+        key = _key(market_id)
+        if key not in self._slices:
+            raise KeyError(f"❌ Market not in tick store: {market_id}")
+        start, stop = self._slices[key]
+        return {name: arr[start:stop] for name, arr in self.arrays.items()}
+
+    def _rows(self, market_ids=None) -> tuple[np.ndarray | slice, np.ndarray]:
+        """
+        Row selector over the arrays plus the market_id of every selected row.
+        """
+        index = self.index
+        if market_ids is not None:
+            wanted = {_key(m) for m in market_ids}
+            index = index[index["market_id"].isin(wanted)]
+        lengths = index["length"].to_numpy()
+        labels = np.repeat(index["market_id"].to_numpy(), lengths)
+        if market_ids is None:
+            return slice(None), labels
+        offsets = index["offset"].to_numpy()
+        if not len(offsets):
+            return np.array([], dtype="int64"), labels
+        # Concatenated aranges for each [offset, offset + length)
+        rows = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(offsets, lengths)
+        return rows, labels
+
+    def frame(self, market_ids=None) -> pd.DataFrame:
+        """
+        Ticks for the given markets (all if None) in the snapshot row shape:
+        market_id, selection_id, timestamp (pt), ltp, market_time, in_play_time.
+        """
+        rows, labels = self._rows(market_ids)
+        df = pd.DataFrame({
+            "market_id": labels,
+            "selection_id": self.arrays["selection_id"][rows],
+            "timestamp": self.arrays["pt"][rows],
+            "ltp": self.arrays["ltp"][rows],
+        })
+        # Only the selected rows are paged in from the memory-mapped columns
+        count_read(rows=len(df), nbytes=sum(a.itemsize for a in self.arrays.values()) * len(df))
+        times = dict(zip(self.index["market_id"], self.index["market_time"]))
+        df["market_time"] = df["market_id"].map(times)
+        if "in_play_time" in self.index:
+            df["in_play_time"] = df["market_id"].map(self.index.set_index("market_id")["in_play_time"]).astype("Int64")
+        return df
+
+    def final_ltps(self, market_ids=None) -> pd.DataFrame:
+        """
+        Last LTP per (market_id, selection_id). Rows are already sorted by
+        selection and pt within each market, so this is the last row of each run.
+        """
+        rows, labels = self._rows(market_ids)
+        selections = self.arrays["selection_id"][rows]
+        count_read(rows=len(labels), nbytes=sum(a.itemsize for a in self.arrays.values()) * len(labels))
+        last = np.zeros(len(labels), dtype=bool)
+        if len(labels):
+            last[:-1] = (labels[1:] != labels[:-1]) | (selections[1:] != selections[:-1])
+            last[-1] = True
+        return pd.DataFrame({
+            "market_id": labels[last],
+            "selection_id": selections[last],
+            "ltp": self.arrays["ltp"][rows][last],
+        })